@@ -0,0 +1,245 @@
+"""
+卡片與圖表產生的微基準測試與回歸檢查
+
+量測 create_table_card、convert_to_card 與 ChartTool.chart_to_base64 在不同
+表格大小、圖表類型與數列長度下的每次呼叫時間 (多輪取中位數) 與尖峰記憶體
+(tracemalloc)，並與 benchmarks/baselines/cards.json 比對。
+
+不同機器的絕對時間無法互相比較，因此時間以同一次執行中量測的參考工作 (固定的
+純 Python 串列、字串與 JSON 處理，每個情境前重新量測) 為單位，比對的是「相對
+參考工作的倍數」，毫秒數只顯示供參考。即使如此，圖表繪製在共用的 CI 機器上仍會
+有數十 % 的波動，因此時間預設只列出警告，加上 --gate-time 才會以非零狀態結束；
+尖峰記憶體與機器速度無關，超過容許範圍時一律以非零狀態結束。
+
+使用方式:
+    python benchmarks/bench_cards.py [--filter table] [--rounds 7] [--gate-time]
+    python benchmarks/bench_cards.py --update-baseline
+"""
+
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+import warnings
+from typing import Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.utils.card_builder import convert_to_card, create_table_card  # noqa: E402
+from src.utils.chart_tool import ChartTool  # noqa: E402
+
+# 環境缺少中文字型時 matplotlib 每次繪圖都會警告，不影響量測
+warnings.filterwarnings("ignore", message="Glyph .* missing from font")
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "cards.json")
+
+HEADERS = ["日期", "門市", "品項", "數量", "單價", "金額"]
+CHART_TYPES = ["pie", "donut", "horizontal_bar", "vertical_bar", "line"]
+
+
+def build_rows(count: int) -> List[List[str]]:
+    return [
+        [
+            f"2024-01-{i % 28 + 1:02d}",
+            f"門市{i % 50}",
+            f"品項{i}",
+            str(i % 17),
+            f"{i * 1.5:.1f}",
+            f"{i * 25.5:.1f}",
+        ]
+        for i in range(count)
+    ]
+
+
+def build_response(rows: int) -> dict:
+    """與 agent 回應格式相同的卡片資料 (文字、SQL 與表格)"""
+    return {
+        "cards": [
+            {"card_type": "text", "content": "以下為各門市銷售明細"},
+            {"card_type": "sql", "content": "SELECT * FROM sales LIMIT 1000"},
+            {"card_type": "table", "headers": HEADERS, "rows": build_rows(rows)},
+        ]
+    }
+
+
+def build_cases() -> Dict[str, Callable[[], object]]:
+    """建立所有量測情境 (名稱 -> 無參數函式)"""
+    cases: Dict[str, Callable[[], object]] = {}
+    for rows in (10, 100, 1000):
+        table_rows = build_rows(rows)
+        cases[f"table_card/rows={rows}"] = (
+            lambda table_rows=table_rows: create_table_card(HEADERS, table_rows)
+        )
+    for rows in (10, 1000):
+        response = build_response(rows)
+        cases[f"convert_to_card/rows={rows}"] = (
+            lambda response=response: convert_to_card(response)
+        )
+    for chart_type in CHART_TYPES:
+        for points in (5, 30):
+            labels = [f"門市{i}" for i in range(points)]
+            values = [float(i * 7 % 23 + 1) for i in range(points)]
+            cases[f"chart/{chart_type}/points={points}"] = (
+                lambda values=values, labels=labels, chart_type=chart_type: (
+                    ChartTool.chart_to_base64(values, labels, chart_type)
+                )
+            )
+    return cases
+
+
+def reference_workload() -> object:
+    """時間正規化用的參考工作：與卡片建立同類的串列、字串格式化與 JSON 處理"""
+    rows = [[f"門市{i % 50}", f"品項{i}", f"{i * 25.5:.1f}"] for i in range(2000)]
+    rows.sort(key=lambda row: row[0])
+    return json.dumps({"rows": rows}, ensure_ascii=False)
+
+
+def measure_time(func: Callable[[], object], rounds: int, min_round: float) -> float:
+    """每輪重複呼叫到至少 min_round 秒，回傳各輪每次呼叫時間的中位數 (毫秒)"""
+    func()
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_round:
+            break
+        number *= 2
+
+    samples = [elapsed / number]
+    for _ in range(rounds - 1):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - started) / number)
+    return statistics.median(samples) * 1000
+
+
+def measure_peak_memory(func: Callable[[], object]) -> float:
+    """單次呼叫期間的 Python 尖峰記憶體配置 (KB)"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024
+
+
+def load_baseline() -> Dict[str, Dict[str, float]]:
+    if not os.path.exists(BASELINE_PATH):
+        return {}
+    with open(BASELINE_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(results: Dict[str, Dict[str, float]]) -> None:
+    os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+    with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False, sort_keys=True)
+        f.write("\n")
+
+
+def check_regressions(
+    name: str,
+    result: Dict[str, float],
+    expected: Dict[str, float],
+    tolerance: float,
+    key: str,
+) -> List[Tuple[str, str]]:
+    """回傳指定項目超過容許範圍的情境 (情境名稱, 說明)"""
+    failures = []
+    if key in expected:
+        limit = expected[key] * (1 + tolerance)
+        if result[key] > limit:
+            failures.append(
+                (
+                    name,
+                    f"{key} {result[key]:.2f} 超過基準值 {expected[key]} ({limit:.2f})",
+                )
+            )
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--filter", default="", help="只執行名稱包含此字串的情境")
+    parser.add_argument("--rounds", type=int, default=7, help="每個情境的量測輪數")
+    parser.add_argument(
+        "--min-round", type=float, default=0.1, help="每輪最少的量測秒數"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="時間倍數與記憶體相對基準值可容許的增加比例",
+    )
+    parser.add_argument(
+        "--gate-time",
+        action="store_true",
+        help="時間倍數超過容許範圍時也以非零狀態結束 (預設只列出警告)",
+    )
+    parser.add_argument(
+        "--update-baseline", action="store_true", help="以本次結果更新基準值"
+    )
+    args = parser.parse_args()
+
+    baseline = load_baseline()
+    results: Dict[str, Dict[str, float]] = {}
+    time_failures: List[Tuple[str, str]] = []
+    memory_failures: List[Tuple[str, str]] = []
+
+    print(
+        f"{'情境':<36}{'時間(ms)':>12}{'倍數':>10}{'基準倍數':>10}"
+        f"{'尖峰(KB)':>12}{'基準(KB)':>12}"
+    )
+    for name, func in build_cases().items():
+        if args.filter not in name:
+            continue
+        # 每個情境前重新量測參考工作，抵銷執行期間機器負載的變化
+        reference_ms = measure_time(reference_workload, args.rounds, args.min_round)
+        time_ms = measure_time(func, args.rounds, args.min_round)
+        result = {
+            "time_ms": round(time_ms, 4),
+            "time_ratio": round(time_ms / reference_ms, 4),
+            "peak_kb": round(measure_peak_memory(func), 1),
+        }
+        results[name] = result
+
+        expected = baseline.get(name) or {}
+        print(
+            f"{name:<36}{result['time_ms']:>12.3f}{result['time_ratio']:>10.3f}"
+            f"{expected.get('time_ratio', '-'):>10}"
+            f"{result['peak_kb']:>12.1f}"
+            f"{expected.get('peak_kb', '-'):>12}"
+        )
+        if expected and not args.update_baseline:
+            time_failures.extend(
+                check_regressions(name, result, expected, args.tolerance, "time_ratio")
+            )
+            memory_failures.extend(
+                check_regressions(name, result, expected, args.tolerance, "peak_kb")
+            )
+
+    if args.update_baseline:
+        baseline.update(results)
+        save_baseline(baseline)
+        print(f"已更新基準值: {BASELINE_PATH}")
+        return 0
+
+    for name, message in time_failures:
+        print(f"{'失敗' if args.gate_time else '警告'}: {name}: {message}")
+    for name, message in memory_failures:
+        print(f"失敗: {name}: {message}")
+    failed = memory_failures or (args.gate_time and time_failures)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+"""
+啟動匯入時間與記憶體回歸檢查
+
+以 `python -X importtime` 在子行程匯入各 BOT_MODE 的 Bot 模組，彙整匯入總時間、
+耗時最多的套件與最大 RSS，並檢查不屬於該模式的重量級套件 (例如 Genie 模式的
+Azure AI SDK、尚未產生圖表前的 matplotlib) 沒有在啟動時被載入。
+
+結果會與 benchmarks/baselines/import_time.json 比對，超過容許範圍時以非零狀態結束，
+可放在 CI 作為啟動時間的回歸檢查。
+
+使用方式:
+    python benchmarks/bench_import_time.py [--modes genie foundry] [--runs 3]
+    python benchmarks/bench_import_time.py --update-baseline
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+BASELINE_PATH = os.path.join(ROOT, "benchmarks", "baselines", "import_time.json")
+
+# 各模式的 Bot 模組與啟動時不應載入的套件
+MODES = {
+    "genie": {
+        "module": "src.bot.genie_bot",
+        "forbidden": [
+            "azure.ai.projects",
+            "azure.ai.agents",
+            "databricks_ai_bridge",
+            "matplotlib",
+        ],
+    },
+    "foundry": {
+        "module": "src.bot.foundry_bot",
+        "forbidden": ["matplotlib"],
+    },
+}
+
+# 子行程執行的程式：匯入模組後輸出最大 RSS 與禁止套件的載入情形
+_PROBE = """
+import json, resource, sys
+import {module}
+print(json.dumps({{
+    "maxrss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "loaded": [name for name in {forbidden!r} if name in sys.modules],
+}}))
+"""
+
+
+def parse_importtime(stderr: str) -> Tuple[float, List[Tuple[str, float]]]:
+    """解析 -X importtime 輸出
+
+    Args:
+        stderr: 子行程的 stderr
+
+    Returns:
+        (所有模組 self 時間總和毫秒, 依套件彙總 self 時間後排序的清單)
+    """
+    total_us = 0
+    packages: Dict[str, float] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:") :].split("|", 2)
+        total_us += int(self_us)
+        # 以頂層套件名稱彙總 (src 底下的模組另外細分到子套件)
+        parts = name.strip().split(".")
+        package = ".".join(parts[:2]) if parts[0] == "src" else parts[0]
+        packages[package] = packages.get(package, 0) + int(self_us) / 1000
+    ranked = sorted(packages.items(), key=lambda item: item[1], reverse=True)
+    return total_us / 1000, ranked
+
+
+def measure(mode: str) -> Dict[str, object]:
+    """在乾淨的子行程中量測一次指定模式的匯入成本"""
+    spec = MODES[mode]
+    env = dict(os.environ, PYTHONPATH=ROOT, MLFLOW_DISABLE_AGENT_HINT="1")
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            _PROBE.format(module=spec["module"], forbidden=spec["forbidden"]),
+        ],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total_ms, ranked = parse_importtime(result.stderr)
+    probe = json.loads(result.stdout.strip().splitlines()[-1])
+    return {
+        "import_ms": total_ms,
+        "maxrss_mb": probe["maxrss_kb"] / 1024,
+        "loaded_forbidden": probe["loaded"],
+        "top": ranked[:10],
+    }
+
+
+def load_baseline() -> Dict[str, Dict[str, float]]:
+    if not os.path.exists(BASELINE_PATH):
+        return {}
+    with open(BASELINE_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(results: Dict[str, Dict[str, float]]) -> None:
+    os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+    with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument(
+        "--runs", type=int, default=3, help="每個模式量測次數 (取中位數)"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="相對基準值可容許的增加比例",
+    )
+    parser.add_argument(
+        "--update-baseline", action="store_true", help="以本次結果更新基準值"
+    )
+    args = parser.parse_args()
+
+    baseline = load_baseline()
+    summary: Dict[str, Dict[str, float]] = {}
+    failed = False
+
+    for mode in args.modes:
+        samples = [measure(mode) for _ in range(args.runs)]
+        import_ms = statistics.median(s["import_ms"] for s in samples)
+        maxrss_mb = statistics.median(s["maxrss_mb"] for s in samples)
+        summary[mode] = {
+            "import_ms": round(import_ms, 1),
+            "maxrss_mb": round(maxrss_mb, 1),
+        }
+
+        print(f"== {mode} ({MODES[mode]['module']})")
+        print(f"匯入時間: {import_ms:.1f} ms  最大 RSS: {maxrss_mb:.1f} MB")
+        print("匯入耗時最多的套件:")
+        for package, ms in samples[-1]["top"]:
+            print(f"  {package:<28}{ms:>10.1f} ms")
+
+        loaded = samples[-1]["loaded_forbidden"]
+        if loaded:
+            print(f"失敗: 啟動時載入了不屬於此模式的套件: {loaded}")
+            failed = True
+
+        expected = baseline.get(mode)
+        if expected and not args.update_baseline:
+            for key in ("import_ms", "maxrss_mb"):
+                limit = expected[key] * (1 + args.tolerance)
+                if summary[mode][key] > limit:
+                    print(
+                        f"失敗: {key} {summary[mode][key]} 超過基準值 "
+                        f"{expected[key]} 的容許範圍 ({limit:.1f})"
+                    )
+                    failed = True
+        print()
+
+    if args.update_baseline:
+        baseline.update(summary)
+        save_baseline(baseline)
+        print(f"已更新基準值: {BASELINE_PATH}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+"""
+日誌輸出對事件迴圈的阻塞時間比較
+
+比較直接在 logger 掛 StreamHandler + RotatingFileHandler (舊設定) 與
+QueueHandler + QueueListener (新設定) 在大量日誌下，事件迴圈上花在 logger
+呼叫的時間與迴圈延遲 (以每 1 ms 醒來一次的監測任務量測)。
+檔案上限設得很小，讓量測期間會多次輪替檔案；--stdout-delay-ms 模擬容器日誌
+管線塞住時 stdout 寫入變慢的情況。
+
+使用方式:
+    python benchmarks/bench_logging.py [--lines 20000] [--format text|json]
+        [--stdout-delay-ms 0.05] [--burst 10]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from logging.handlers import RotatingFileHandler
+from typing import Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.core.logger_config import create_formatter, create_queue_handler  # noqa: E402
+
+
+class SlowStream:
+    """每次寫入固定延遲的輸出串流 (模擬讀取端跟不上的 stdout 管線)"""
+
+    def __init__(self, stream, delay: float):
+        self.stream = stream
+        self.delay = delay
+
+    def write(self, data: str) -> int:
+        if self.delay:
+            time.sleep(self.delay)
+        return self.stream.write(data)
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+
+MESSAGE = "使用者 29:1abcdef 的回合完成，回應內容: " + "資料列 " * 40
+
+
+def build_handlers(log_dir: str, log_format: str, stream) -> List[logging.Handler]:
+    """建立與 setup_logging 相同的輸出處理器 (檔案上限縮小以觸發輪替)"""
+    formatter = create_formatter(log_format)
+    handlers = [
+        logging.StreamHandler(stream),
+        RotatingFileHandler(
+            os.path.join(log_dir, "app.log"),
+            maxBytes=1024 * 1024,
+            backupCount=5,
+            encoding="utf-8",
+        ),
+    ]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+
+async def _monitor(lags: List[float], stop: asyncio.Event) -> None:
+    """每 1 ms 醒來一次，記錄實際醒來時間比預期晚多少"""
+    interval = 0.001
+    while not stop.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, time.perf_counter() - expected))
+
+
+async def _workload(
+    logger: logging.Logger, lines: int, burst: int, durations: List[float]
+):
+    """模擬處理中的請求：每個請求連續寫 burst 行日誌，之後等待 1 ms (模擬 I/O)"""
+    for i in range(lines):
+        started = time.perf_counter()
+        logger.info(f"{MESSAGE} #{i}")
+        durations.append(time.perf_counter() - started)
+        if i % burst == burst - 1:
+            await asyncio.sleep(0.001)
+
+
+async def run_case(logger: logging.Logger, lines: int, burst: int) -> Dict[str, float]:
+    lags: List[float] = []
+    durations: List[float] = []
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(_monitor(lags, stop))
+    await asyncio.sleep(0.01)
+
+    started = time.perf_counter()
+    await _workload(logger, lines, burst, durations)
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await monitor
+    lags.sort()
+    return {
+        "elapsed_s": elapsed,
+        "logging_on_loop_s": sum(durations),
+        "mean_call_us": statistics.mean(durations) * 1e6,
+        "max_call_ms": max(durations) * 1e3,
+        "lag_p99_ms": lags[int(len(lags) * 0.99)] * 1e3 if lags else 0.0,
+        "lag_max_ms": lags[-1] * 1e3 if lags else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="日誌輸出對事件迴圈的阻塞時間比較")
+    parser.add_argument("--lines", type=int, default=20000)
+    parser.add_argument("--format", choices=["text", "json"], default="text")
+    parser.add_argument(
+        "--stdout-delay-ms", type=float, default=0.05, help="每次寫入 stdout 的延遲"
+    )
+    parser.add_argument("--burst", type=int, default=10, help="每個請求的日誌行數")
+    args = parser.parse_args()
+
+    results = {}
+    with open(os.devnull, "w", encoding="utf-8") as devnull:
+        stream = SlowStream(devnull, args.stdout_delay_ms / 1000)
+        for mode in ("direct", "queued"):
+            with tempfile.TemporaryDirectory() as log_dir:
+                logger = logging.getLogger(f"bench.{mode}")
+                logger.propagate = False
+                logger.setLevel(logging.INFO)
+                handlers = build_handlers(log_dir, args.format, stream)
+
+                listener = None
+                if mode == "direct":
+                    for handler in handlers:
+                        logger.addHandler(handler)
+                else:
+                    queue_handler, listener = create_queue_handler(handlers)
+                    logger.addHandler(queue_handler)
+
+                results[mode] = asyncio.run(run_case(logger, args.lines, args.burst))
+
+                drain_started = time.perf_counter()
+                if listener is not None:
+                    listener.stop()
+                results[mode]["background_drain_s"] = (
+                    time.perf_counter() - drain_started
+                )
+                results[mode]["rotated_files"] = len(os.listdir(log_dir)) - 1
+                for handler in handlers:
+                    handler.close()
+
+    print(
+        f"日誌行數: {args.lines}  格式: {args.format}  "
+        f"stdout 延遲: {args.stdout_delay_ms} ms  每請求: {args.burst} 行"
+    )
+    print(
+        f"{'模式':<8}{'迴圈上日誌耗時(s)':>18}{'平均呼叫(us)':>14}{'最長呼叫(ms)':>14}"
+        f"{'延遲p99(ms)':>13}{'延遲max(ms)':>13}{'輪替檔':>8}"
+    )
+    for mode, r in results.items():
+        print(
+            f"{mode:<8}{r['logging_on_loop_s']:>18.3f}{r['mean_call_us']:>14.1f}"
+            f"{r['max_call_ms']:>14.2f}{r['lag_p99_ms']:>13.2f}{r['lag_max_ms']:>13.2f}"
+            f"{r['rotated_files']:>8}"
+        )
+    saved = (
+        results["direct"]["logging_on_loop_s"] - results["queued"]["logging_on_loop_s"]
+    )
+    print(
+        f"事件迴圈上減少 {saved:.3f} 秒的日誌處理時間 "
+        f"(背景執行緒在結束時另花 {results['queued']['background_drain_s']:.3f} 秒輸出剩餘紀錄)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+大型內容日誌的輸出量與 CPU 時間比較
+
+以含有大型表格的卡片資料 (與 convert_to_card 收到的格式相同) 與長篇助理回應，
+比較原本以 f-string 記錄完整內容與 log_payload 摘要 (含取樣) 每次呼叫的 CPU 時間
+與寫入的日誌位元組數。
+
+使用方式:
+    python benchmarks/bench_payload_logging.py [--rows 2000] [--calls 500]
+        [--sample-rate 0.1]
+"""
+
+import argparse
+import io
+import logging
+import os
+import sys
+import time
+from typing import Any, Callable, Dict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.core import payload_log  # noqa: E402
+from src.core.logger_config import create_formatter  # noqa: E402
+
+
+def build_card_payload(rows: int) -> Dict[str, Any]:
+    """建立含大型表格的卡片資料"""
+    headers = ["日期", "門市", "品項", "數量", "金額", "備註"]
+    return {
+        "cards": [
+            {"card_type": "text", "content": "以下為近期各門市銷售明細"},
+            {"card_type": "sql", "content": "SELECT * FROM sales WHERE ..."},
+            {
+                "card_type": "table",
+                "headers": headers,
+                "rows": [
+                    [
+                        f"2024-01-{i % 28 + 1:02d}",
+                        f"門市{i % 50}",
+                        f"品項{i}",
+                        i,
+                        i * 3.5,
+                        "無",
+                    ]
+                    for i in range(rows)
+                ],
+            },
+        ]
+    }
+
+
+def build_text_payload(rows: int) -> str:
+    """建立長篇助理回應 (Markdown 表格)"""
+    lines = ["| 日期 | 門市 | 金額 |", "|---|---|---|"]
+    lines.extend(
+        f"| 2024-01-{i % 28 + 1:02d} | 門市{i % 50} | {i * 3.5} |" for i in range(rows)
+    )
+    return "\n".join(lines)
+
+
+def make_logger(name: str, stream: io.StringIO) -> logging.Logger:
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(create_formatter("text"))
+    logger = logging.getLogger(name)
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger
+
+
+def run_case(
+    log: Callable[[logging.Logger, Any], None], payload: Any, calls: int, name: str
+):
+    """重複記錄同一份內容，回傳每次呼叫的 CPU 時間與總輸出位元組"""
+    stream = io.StringIO()
+    logger = make_logger(name, stream)
+    started = time.process_time()
+    for _ in range(calls):
+        log(logger, payload)
+    cpu = time.process_time() - started
+    return {
+        "cpu_us": cpu / calls * 1e6,
+        "bytes": len(stream.getvalue().encode("utf-8")),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="大型內容日誌的輸出量與 CPU 時間比較")
+    parser.add_argument("--rows", type=int, default=2000, help="表格列數")
+    parser.add_argument("--calls", type=int, default=500, help="每種情境的記錄次數")
+    parser.add_argument(
+        "--sample-rate", type=float, default=0.1, help="取樣情境的取樣率"
+    )
+    args = parser.parse_args()
+
+    payloads = {
+        "卡片資料": build_card_payload(args.rows),
+        "助理回應": build_text_payload(args.rows),
+    }
+    cases = {
+        "f-string": lambda logger, payload: logger.info(f"輸入資料: {payload}"),
+        "summary": lambda logger, payload: payload_log.log_payload(
+            logger, "輸入資料", payload
+        ),
+        "sampled": lambda logger, payload: payload_log.log_payload(
+            logger, "輸入資料", payload
+        ),
+    }
+
+    print(f"表格列數: {args.rows}  記錄次數: {args.calls}  取樣率: {args.sample_rate}")
+    print(
+        f"{'內容':<8}{'方式':<10}{'每次 CPU(us)':>14}{'輸出(KB)':>12}{'縮減倍數':>10}"
+    )
+    for payload_name, payload in payloads.items():
+        baseline = None
+        for case_name, log in cases.items():
+            logger_name = f"bench.{case_name}"
+            payload_log.configure(
+                rates={"bench.sampled": args.sample_rate}, preview_chars=200
+            )
+            result = run_case(log, payload, args.calls, logger_name)
+            baseline = baseline or result
+            ratio = baseline["bytes"] / max(1, result["bytes"])
+            print(
+                f"{payload_name:<8}{case_name:<10}{result['cpu_us']:>14.1f}"
+                f"{result['bytes'] / 1024:>12.1f}{ratio:>10.0f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
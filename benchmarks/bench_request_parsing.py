@@ -0,0 +1,107 @@
+"""
+/api/messages 請求解析效能比較
+
+比較舊流程 (端點以 json 解析並 deserialize 一次，CloudAdapter.process 再讀取、
+解析與 deserialize 一次) 與新流程 (讀取 bytes 一次、orjson 解析一次、
+deserialize 一次) 每個請求花費的 CPU 時間，並換算成指定請求速率下節省的 CPU。
+
+使用方式:
+    python benchmarks/bench_request_parsing.py [--requests 20000] [--rate 500]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+
+from botbuilder.schema import Activity
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.core import json_codec  # noqa: E402
+
+
+def build_payload() -> bytes:
+    """建立接近 Teams 訊息大小的 activity payload"""
+    activity = {
+        "type": "message",
+        "id": str(uuid.uuid4()),
+        "timestamp": "2025-01-01T00:00:00.000Z",
+        "localTimestamp": "2025-01-01T08:00:00.000+08:00",
+        "serviceUrl": "https://smba.trafficmanager.net/apac/",
+        "channelId": "msteams",
+        "from": {
+            "id": "29:1" + "x" * 80,
+            "name": "測試使用者",
+            "aadObjectId": str(uuid.uuid4()),
+        },
+        "conversation": {
+            "conversationType": "personal",
+            "tenantId": str(uuid.uuid4()),
+            "id": "a:1" + "y" * 120,
+        },
+        "recipient": {"id": "28:" + str(uuid.uuid4()), "name": "Genie Bot"},
+        "textFormat": "plain",
+        "locale": "zh-TW",
+        "text": "請問上個月各區域的營收與去年同期相比如何？",
+        "entities": [
+            {
+                "locale": "zh-TW",
+                "country": "TW",
+                "platform": "Web",
+                "timezone": "Asia/Taipei",
+                "type": "clientInfo",
+            }
+        ],
+        "channelData": {
+            "tenant": {"id": str(uuid.uuid4())},
+            "source": {"name": "message"},
+        },
+    }
+    return json.dumps(activity, ensure_ascii=False).encode("utf-8")
+
+
+def old_path(payload: bytes) -> Activity:
+    """舊流程：端點與 CloudAdapter.process 各解析一次"""
+    Activity().deserialize(json.loads(payload))
+    return Activity().deserialize(json.loads(payload))
+
+
+def new_path(payload: bytes) -> Activity:
+    """新流程：讀取、解析與 deserialize 各一次"""
+    return Activity().deserialize(json_codec.loads(payload))
+
+
+def measure(function, payload: bytes, requests: int) -> float:
+    """回傳每個請求的平均 CPU 微秒數"""
+    for _ in range(min(1000, requests)):
+        function(payload)
+    started = time.process_time()
+    for _ in range(requests):
+        function(payload)
+    return (time.process_time() - started) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20000, help="每個流程的請求數")
+    parser.add_argument("--rate", type=int, default=500, help="換算用的每秒請求數")
+    args = parser.parse_args()
+
+    payload = build_payload()
+    old_us = measure(old_path, payload, args.requests)
+    new_us = measure(new_path, payload, args.requests)
+    saved_us = old_us - new_us
+
+    print(f"payload 大小: {len(payload)} bytes")
+    print(f"JSON 解析器: {'orjson' if json_codec.orjson else 'json'}")
+    print(f"舊流程: {old_us:8.1f} µs/請求")
+    print(f"新流程: {new_us:8.1f} µs/請求")
+    print(f"節省:   {saved_us:8.1f} µs/請求 ({saved_us / old_us:.0%})")
+    print(f"在 {args.rate} req/s 時約節省 {saved_us * args.rate / 1e6:.2f} 個 CPU 核心")
+
+
+if __name__ == "__main__":
+    main()
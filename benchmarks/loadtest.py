@@ -0,0 +1,416 @@
+"""
+端到端壓力測試
+
+在本機啟動 Bot Connector、Foundry Agents API 與 Databricks Genie API 的替身
+(benchmarks/stubs)，以指定 BOT_MODE 啟動 bot 子行程，依目標速率送出 Teams
+message activity 到 /api/messages，並以 Connector 替身收到的回覆 (replyToId)
+計算端到端延遲。
+
+每個請求由一位目前沒有進行中回合的使用者送出 (避免同一使用者的訊息被合併)，
+使用者數量不足時自動增加。結果分類:
+    ok        收到卡片回覆
+    busy      收到「系統忙碌中」回覆 (准入控制拒絕)
+    error     收到其他文字回覆 (例如處理錯誤)
+    http      /api/messages 回傳錯誤狀態碼
+    timeout   在 --timeout 秒內沒有收到回覆
+
+使用方式:
+    python benchmarks/loadtest.py [--modes genie foundry] [--rate 10] [--duration 30]
+        [--fast-ack] [--genie-latency-ms 200] [--genie-error-rate 0.01]
+        [--foundry-latency-ms 100] [--tool-calls 2] [--out results.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+import uuid
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "stubs"))
+
+from bot_connector import BotConnectorHandler  # noqa: E402
+from foundry_api import FoundryApiHandler  # noqa: E402
+from genie_api import GenieApiHandler  # noqa: E402
+from stub_server import (  # noqa: E402
+    create_self_signed_cert,
+    fault_args,
+    faults_from_args,
+    serve,
+)
+
+CONNECTION_NAMES = "genie_a,genie_b"
+TENANT_ID = str(uuid.uuid4())
+QUESTIONS = [
+    "上週各門市的銷售金額是多少？",
+    "列出本月銷售前十名的商品",
+    "比較今年與去年同期的營收",
+    "哪個門市的退貨率最高？",
+]
+
+
+def build_activity(service_url: str, user_id: str, text: str) -> Dict[str, Any]:
+    """建立與 Teams 一對一對話相同結構的 message activity"""
+    return {
+        "type": "message",
+        "id": str(uuid.uuid4()),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime()),
+        "serviceUrl": service_url,
+        "channelId": "msteams",
+        "from": {"id": user_id, "name": "壓力測試使用者", "aadObjectId": user_id[3:]},
+        "conversation": {
+            "conversationType": "personal",
+            "tenantId": TENANT_ID,
+            "id": f"a:{user_id[3:]}",
+        },
+        "recipient": {"id": "28:loadtest-bot", "name": "genie-bot"},
+        "textFormat": "plain",
+        "locale": "zh-TW",
+        "text": text,
+        "entities": [{"type": "clientInfo", "locale": "zh-TW", "platform": "Web"}],
+        "channelData": {"tenant": {"id": TENANT_ID}},
+    }
+
+
+def bot_environment(
+    mode: str, port: int, args, stubs: Dict[str, str]
+) -> Dict[str, str]:
+    """Bot 子行程的環境變數 (開發模式，所有外部端點指向替身)"""
+    # 沒有 client secret 時以開發模式執行，Bot Connector 不需驗證
+    # (.env 中若設定了 AZURE_CLIENT_ID / AZURE_CLIENT_SECRET 仍會被載入)
+    env = {
+        key: value
+        for key, value in os.environ.items()
+        if key not in ("AZURE_CLIENT_ID", "AZURE_CLIENT_SECRET", "AZURE_TENANT_ID")
+    }
+    env.update(
+        PYTHONPATH=ROOT,
+        PORT=str(port),
+        HOST="127.0.0.1",
+        BOT_MODE=mode,
+        APP_FAST_ACK="true" if args.fast_ack else "false",
+        MLFLOW_DISABLE_AGENT_HINT="1",
+    )
+    if mode == "genie":
+        env.update(
+            DATABRICKS_HOST=stubs["genie"],
+            DATABRICKS_TOKEN="stub-token",
+            DATABRICKS_SPACE_ID="space-loadtest",
+        )
+    else:
+        env.update(
+            AZURE_FOUNDRY_PROJECT_ENDPOINT=f"{stubs['foundry']}/api/projects/loadtest",
+            AZURE_AI_AGENT_ID="asst_loadtest",
+            AZURE_FOUNDRY_CONNECTION_NAMES=CONNECTION_NAMES,
+            DATABRICKS_ENTRA_ID_AUDIENCE_SCOPE="stub-databricks/.default",
+            # DefaultAzureCredential 透過 App Service 受控識別向替身取得 token
+            IDENTITY_ENDPOINT=f"{stubs['foundry']}/msi/token",
+            IDENTITY_HEADER="stub",
+            REQUESTS_CA_BUNDLE=stubs["ca_bundle"],
+        )
+        if args.polling_interval is not None:
+            env["AZURE_AI_AGENT_POLLING_INTERVAL"] = str(args.polling_interval)
+    return env
+
+
+def wait_ready(base_url: str, process: subprocess.Popen, timeout: float) -> None:
+    """等待 /healthz/ready 回報就緒"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"bot 行程已結束 (exit {process.returncode})")
+        try:
+            with urllib.request.urlopen(f"{base_url}/healthz/ready", timeout=2) as r:
+                if r.status == 200:
+                    return
+        except (urllib.error.URLError, ConnectionError):
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"bot 在 {timeout} 秒內未就緒")
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+class LoadDriver:
+    """依固定速率送出 activity 並以 replyToId 對應 Connector 替身收到的回覆"""
+
+    def __init__(self, base_url: str, service_url: str, timeout: float):
+        self.base_url = base_url
+        self.service_url = service_url
+        self.timeout = timeout
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._idle_users: List[str] = []
+        self._user_count = 0
+
+    def on_activity(self, received: float, conversation_id: str, activity: dict):
+        """Connector 替身執行緒的回呼 (忽略打字指示器)"""
+        if activity.get("type") != "message" or self.loop is None:
+            return
+        self.loop.call_soon_threadsafe(
+            self._resolve, activity.get("replyToId"), received, activity
+        )
+
+    def _resolve(self, reply_to: str, received: float, activity: dict) -> None:
+        future = self._pending.pop(reply_to, None)
+        if future is not None and not future.done():
+            future.set_result((received, activity))
+
+    def _take_user(self) -> str:
+        if self._idle_users:
+            return self._idle_users.pop()
+        self._user_count += 1
+        return f"29:loadtest-{self._user_count:05d}"
+
+    async def send_one(self, session: aiohttp.ClientSession, index: int) -> dict:
+        user_id = self._take_user()
+        activity = build_activity(
+            self.service_url, user_id, QUESTIONS[index % len(QUESTIONS)]
+        )
+        reply = self.loop.create_future()
+        self._pending[activity["id"]] = reply
+
+        started = time.perf_counter()
+        result = {"outcome": "timeout", "ack_ms": None, "e2e_ms": None}
+        try:
+            async with session.post(
+                f"{self.base_url}/api/messages", json=activity
+            ) as response:
+                await response.read()
+                result["ack_ms"] = (time.perf_counter() - started) * 1000
+                if response.status >= 400:
+                    result["outcome"] = "http"
+                    return result
+
+            received, reply_activity = await asyncio.wait_for(reply, self.timeout)
+            result["e2e_ms"] = (received - started) * 1000
+            if reply_activity.get("attachments"):
+                result["outcome"] = "ok"
+            elif "忙碌" in (reply_activity.get("text") or ""):
+                result["outcome"] = "busy"
+            else:
+                result["outcome"] = "error"
+            return result
+        except (asyncio.TimeoutError, aiohttp.ClientError):
+            return result
+        finally:
+            self._pending.pop(activity["id"], None)
+            # 逾時的使用者可能仍有進行中的回合，不再重複使用
+            if result["outcome"] != "timeout":
+                self._idle_users.append(user_id)
+
+    async def run(self, rate: float, duration: float, warmup: int) -> Dict[str, Any]:
+        self.loop = asyncio.get_running_loop()
+        connector = aiohttp.TCPConnector(limit=0)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            for i in range(warmup):
+                await self.send_one(session, i)
+
+            total = int(rate * duration)
+            tasks = []
+            started = time.perf_counter()
+            for i in range(total):
+                # 開放式負載：依排定時間送出，不等待前一個請求完成
+                delay = started + i / rate - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.create_task(self.send_one(session, i)))
+            send_elapsed = time.perf_counter() - started
+            results = await asyncio.gather(*tasks)
+            elapsed = time.perf_counter() - started
+
+        return summarize(results, elapsed, send_elapsed, self._user_count)
+
+
+def summarize(
+    results: List[dict], elapsed: float, send_elapsed: float, users: int
+) -> Dict[str, Any]:
+    counts = {"ok": 0, "busy": 0, "error": 0, "http": 0, "timeout": 0}
+    for result in results:
+        counts[result["outcome"]] += 1
+    e2e = [r["e2e_ms"] for r in results if r["outcome"] == "ok"]
+    ack = [r["ack_ms"] for r in results if r["ack_ms"] is not None]
+    total = len(results) or 1
+    return {
+        "requests": len(results),
+        "users": users,
+        "offered_rps": len(results) / send_elapsed if send_elapsed else 0.0,
+        "throughput_rps": counts["ok"] / elapsed if elapsed else 0.0,
+        "outcomes": counts,
+        "error_rate": 1 - counts["ok"] / total,
+        "e2e_ms": {
+            "p50": percentile(e2e, 0.50),
+            "p95": percentile(e2e, 0.95),
+            "p99": percentile(e2e, 0.99),
+            "max": max(e2e, default=0.0),
+            "mean": statistics.mean(e2e) if e2e else 0.0,
+        },
+        "ack_ms": {
+            "p50": percentile(ack, 0.50),
+            "p95": percentile(ack, 0.95),
+            "p99": percentile(ack, 0.99),
+        },
+    }
+
+
+def run_mode(mode: str, args, stubs: Dict[str, str], log_dir: str) -> Dict[str, Any]:
+    """啟動指定模式的 bot，執行壓力測試後關閉"""
+    port = args.bot_port
+    base_url = f"http://127.0.0.1:{port}"
+    log_path = os.path.join(log_dir, f"bot-{mode}.log")
+    with open(log_path, "w", encoding="utf-8") as log_file:
+        process = subprocess.Popen(
+            [sys.executable, "-m", "src.app"],
+            cwd=ROOT,
+            env=bot_environment(mode, port, args, stubs),
+            stdout=log_file,
+            stderr=subprocess.STDOUT,
+        )
+        try:
+            wait_ready(base_url, process, args.startup_timeout)
+            driver = LoadDriver(base_url, stubs["connector"], args.timeout)
+            BotConnectorHandler.on_activity = driver.on_activity
+            # 每個模式重新計算替身的請求與注入錯誤次數
+            for handler, name in (
+                (BotConnectorHandler, "connector"),
+                (GenieApiHandler, "genie"),
+                (FoundryApiHandler, "foundry"),
+            ):
+                handler.faults = faults_from_args(args, name)
+            summary = asyncio.run(driver.run(args.rate, args.duration, args.warmup))
+        finally:
+            process.terminate()
+            try:
+                process.wait(10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    summary["backends"] = {
+        name: {
+            "requests": handler.faults.requests,
+            "injected_errors": handler.faults.injected_errors,
+        }
+        for name, handler in (
+            ("connector", BotConnectorHandler),
+            ("genie", GenieApiHandler),
+            ("foundry", FoundryApiHandler),
+        )
+    }
+    summary["bot_log"] = log_path
+    return summary
+
+
+def print_summary(mode: str, summary: Dict[str, Any]) -> None:
+    e2e, ack, outcomes = summary["e2e_ms"], summary["ack_ms"], summary["outcomes"]
+    print(f"== BOT_MODE={mode}")
+    print(
+        f"請求數: {summary['requests']}  實際送出速率: {summary['offered_rps']:.1f}/s  "
+        f"成功吞吐量: {summary['throughput_rps']:.1f}/s  使用者: {summary['users']}"
+    )
+    print(
+        f"端到端延遲 (ms): p50 {e2e['p50']:.0f}  p95 {e2e['p95']:.0f}  "
+        f"p99 {e2e['p99']:.0f}  max {e2e['max']:.0f}"
+    )
+    print(
+        f"/api/messages 回應 (ms): p50 {ack['p50']:.1f}  p95 {ack['p95']:.1f}  "
+        f"p99 {ack['p99']:.1f}"
+    )
+    print(f"結果: {outcomes}  錯誤率: {summary['error_rate']:.2%}")
+    backends = "  ".join(
+        f"{name} {value['requests']} 次 (注入錯誤 {value['injected_errors']})"
+        for name, value in summary["backends"].items()
+        if value["requests"]
+    )
+    print(f"後端請求: {backends}")
+    print(f"bot 日誌: {summary['bot_log']}")
+    print()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="端到端壓力測試")
+    parser.add_argument(
+        "--modes", nargs="+", choices=["genie", "foundry"], default=["genie", "foundry"]
+    )
+    parser.add_argument("--rate", type=float, default=10, help="每秒送出的請求數")
+    parser.add_argument("--duration", type=float, default=30, help="送出請求的秒數")
+    parser.add_argument("--warmup", type=int, default=3, help="量測前依序送出的請求數")
+    parser.add_argument("--timeout", type=float, default=60, help="等待回覆的秒數")
+    parser.add_argument("--fast-ack", action="store_true", help="啟用 APP_FAST_ACK")
+    parser.add_argument("--bot-port", type=int, default=3978)
+    parser.add_argument("--startup-timeout", type=float, default=120)
+    parser.add_argument(
+        "--polling-interval",
+        type=float,
+        help="Foundry run 輪詢間隔秒數 (預設使用 bot 的設定)",
+    )
+    parser.add_argument("--rows", type=int, default=50, help="查詢結果的資料列數")
+    parser.add_argument(
+        "--tool-calls", type=int, default=1, help="Foundry 每個 run 的工具呼叫數"
+    )
+    parser.add_argument("--out", help="將結果寫入 JSON 檔案")
+    fault_args(parser, "connector", latency_ms=20)
+    fault_args(parser, "foundry", latency_ms=100)
+    fault_args(parser, "genie", latency_ms=200)
+    args = parser.parse_args()
+
+    log_dir = tempfile.mkdtemp(prefix="loadtest-")
+    certfile, keyfile = create_self_signed_cert(log_dir)
+
+    GenieApiHandler.rows = args.rows
+    genie = serve(GenieApiHandler)
+    genie_url = f"http://127.0.0.1:{genie.server_address[1]}"
+
+    FoundryApiHandler.genie_url = genie_url
+    FoundryApiHandler.connection_names = CONNECTION_NAMES.split(",")
+    FoundryApiHandler.tool_calls = args.tool_calls
+    FoundryApiHandler.rows = args.rows
+    foundry = serve(FoundryApiHandler, certfile=certfile, keyfile=keyfile)
+    connector = serve(BotConnectorHandler)
+
+    stubs = {
+        "genie": genie_url,
+        "foundry": f"https://127.0.0.1:{foundry.server_address[1]}",
+        "connector": f"http://127.0.0.1:{connector.server_address[1]}",
+        "ca_bundle": certfile,
+    }
+    print(
+        f"速率: {args.rate}/s  時間: {args.duration}s  fast_ack: {args.fast_ack}  "
+        f"後端延遲 (ms): connector {args.connector_latency_ms} "
+        f"foundry {args.foundry_latency_ms} genie {args.genie_latency_ms}"
+    )
+    print()
+
+    results = {}
+    for mode in args.modes:
+        results[mode] = run_mode(mode, args, stubs, log_dir)
+        print_summary(mode, results[mode])
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(
+                {"args": vars(args), "results": results},
+                f,
+                indent=2,
+                ensure_ascii=False,
+            )
+        print(f"結果已寫入 {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""
+Bot Framework Connector 替身
+
+接收 bot 以 activity.serviceUrl 送出的回覆 (POST /v3/conversations/{id}/activities
+[/{replyToId}])，每則回覆呼叫 on_activity 回呼，讓壓力測試的 driver 以 replyToId
+對應原始請求計算端到端延遲。單獨執行時印出收到的回覆。
+
+使用方式:
+    python benchmarks/stubs/bot_connector.py [--port 9100] [--connector-latency-ms 20]
+"""
+
+import argparse
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from stub_server import JsonHandler, fault_args, faults_from_args, new_id, serve
+
+_CONVERSATION = r"/v3/conversations/(?P<conversation_id>[^/]+)/activities"
+
+
+class BotConnectorHandler(JsonHandler):
+    ROUTES = [
+        ("POST", _CONVERSATION, "send_to_conversation"),
+        ("POST", _CONVERSATION + r"/(?P<activity_id>[^/]+)", "reply_to_activity"),
+    ]
+
+    # 收到回覆時的回呼: (收到時間 perf_counter, 對話 ID, activity 內容)
+    on_activity: Optional[Callable[[float, str, Dict[str, Any]], None]] = None
+
+    def _record(self, conversation_id: str, activity: Dict[str, Any]):
+        callback = type(self).on_activity
+        if callback is not None:
+            callback(time.perf_counter(), conversation_id, activity)
+        return 200, {"id": new_id("reply")}
+
+    def send_to_conversation(self, body, query, conversation_id):
+        return self._record(conversation_id, body)
+
+    def reply_to_activity(self, body, query, conversation_id, activity_id):
+        body.setdefault("replyToId", activity_id)
+        return self._record(conversation_id, body)
+
+
+def _print_activity(received: float, conversation_id: str, activity: Dict[str, Any]):
+    if activity.get("type") != "message":
+        return
+    text = activity.get("text") or (
+        f"[{len(activity.get('attachments') or [])} 個附件]"
+    )
+    print(f"{conversation_id} <- {activity.get('replyToId')}: {text[:80]}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bot Framework Connector 替身")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    fault_args(parser, "connector", latency_ms=20)
+    args = parser.parse_args()
+
+    BotConnectorHandler.faults = faults_from_args(args, "connector")
+    BotConnectorHandler.on_activity = staticmethod(_print_activity)
+    server = serve(BotConnectorHandler, args.host, args.port)
+    print(
+        f"Bot Connector 替身已啟動: http://{args.host}:{server.server_address[1]}",
+        flush=True,
+    )
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+"""
+Azure AI Foundry 專案與 Agents API 替身
+
+以 https 提供 FoundryBot 使用的端點 (agents / threads / messages / runs /
+connections)，並兼作 App Service 受控識別的 token 端點，讓 DefaultAzureCredential
+不需真實的 Entra ID 即可取得 token。
+
+每個 run 在第一次查詢時進入 requires_action 並要求 --tool-calls 個 ask_genie
+工具呼叫 (輪流使用各連線)，送出工具輸出後完成，最後一則助理訊息為符合回應格式的
+卡片 JSON。Genie 連線的 target 指向 --genie-url 的 Genie 替身。
+
+使用方式:
+    python benchmarks/stubs/foundry_api.py [--port 8443] [--tool-calls 1]
+        [--genie-url http://127.0.0.1:8081] [--foundry-latency-ms 100]
+    REQUESTS_CA_BUNDLE=<印出的憑證路徑> IDENTITY_ENDPOINT=https://127.0.0.1:8443/msi/token \\
+        IDENTITY_HEADER=stub AZURE_FOUNDRY_PROJECT_ENDPOINT=https://127.0.0.1:8443/api/projects/loadtest \\
+        BOT_MODE=foundry python -m src.app
+"""
+
+import argparse
+import json
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List
+
+from stub_server import (
+    JsonHandler,
+    create_self_signed_cert,
+    fault_args,
+    faults_from_args,
+    new_id,
+    serve,
+)
+
+_PROJECT = r"(?:/api/projects/[^/]+)?"
+_THREAD = _PROJECT + r"/threads/(?P<thread_id>[^/]+)"
+_RUN = _THREAD + r"/runs/(?P<run_id>[^/]+)"
+
+
+class FoundryApiHandler(JsonHandler):
+    ROUTES = [
+        ("GET", r"/msi/token", "get_token"),
+        ("GET", _PROJECT + r"/connections/(?P<name>[^/]+)", "get_connection"),
+        ("GET", _PROJECT + r"/assistants/(?P<agent_id>[^/]+)", "get_agent"),
+        ("POST", _PROJECT + r"/threads", "create_thread"),
+        ("DELETE", _THREAD, "delete_thread"),
+        ("POST", _THREAD + r"/messages", "create_message"),
+        ("GET", _THREAD + r"/messages", "list_messages"),
+        ("POST", _THREAD + r"/runs", "create_run"),
+        ("GET", _THREAD + r"/runs", "list_runs"),
+        ("GET", _RUN, "get_run"),
+        ("POST", _RUN + r"/submit_tool_outputs", "submit_tool_outputs"),
+        ("POST", _RUN + r"/cancel", "cancel_run"),
+    ]
+    NO_FAULT = ("get_token",)
+
+    genie_url = "http://127.0.0.1:8081"
+    connection_names = ["genie_a", "genie_b"]
+    tool_calls = 1
+    rows = 20
+    _runs: Dict[str, Dict[str, Any]] = {}
+    _lock = threading.Lock()
+
+    def get_token(self, body, query):
+        return 200, {
+            "access_token": "stub-token",
+            "expires_on": str(int(time.time()) + 3600),
+            "resource": query.get("resource", ""),
+            "token_type": "Bearer",
+        }
+
+    def get_connection(self, body, query, name):
+        return 200, {
+            "name": name,
+            "id": f"/connections/{name}",
+            "type": "CustomKeys",
+            "target": self.genie_url,
+            "isDefault": False,
+            "credentials": {"type": "None"},
+            "metadata": {
+                "azure_databricks_connection_type": "genie",
+                "genie_space_id": f"space-{name}",
+            },
+        }
+
+    def get_agent(self, body, query, agent_id):
+        return 200, {
+            "id": agent_id,
+            "object": "assistant",
+            "created_at": int(time.time()),
+            "name": "load-test-agent",
+            "model": "gpt-4o",
+            "tools": [],
+        }
+
+    def create_thread(self, body, query):
+        return 200, {
+            "id": new_id("thread"),
+            "object": "thread",
+            "created_at": int(time.time()),
+            "metadata": {},
+        }
+
+    def delete_thread(self, body, query, thread_id):
+        return 200, {"id": thread_id, "object": "thread.deleted", "deleted": True}
+
+    def _message(self, thread_id: str, role: str, text: str, run_id=None):
+        return {
+            "id": new_id("msg"),
+            "object": "thread.message",
+            "created_at": int(time.time()),
+            "thread_id": thread_id,
+            "run_id": run_id,
+            "status": "completed",
+            "role": role,
+            "content": [{"type": "text", "text": {"value": text, "annotations": []}}],
+            "attachments": [],
+            "metadata": {},
+        }
+
+    def create_message(self, body, query, thread_id):
+        content = body.get("content")
+        text = content if isinstance(content, str) else json.dumps(content)
+        return 200, self._message(thread_id, body.get("role", "user"), text)
+
+    def _run_payload(self, run: Dict[str, Any]) -> Dict[str, Any]:
+        payload = {
+            "id": run["id"],
+            "object": "thread.run",
+            "thread_id": run["thread_id"],
+            "assistant_id": run["agent_id"],
+            "status": run["status"],
+            "created_at": run["created_at"],
+            "model": "gpt-4o",
+            "instructions": "",
+            "tools": [],
+            "metadata": {},
+            "last_error": None,
+            "required_action": None,
+        }
+        if run["status"] == "completed":
+            prompt_tokens = 800 + 600 * len(run["tool_outputs"])
+            payload["usage"] = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": 150 + 10 * self.rows,
+                "total_tokens": prompt_tokens + 150 + 10 * self.rows,
+            }
+        if run["status"] == "requires_action":
+            payload["required_action"] = {
+                "type": "submit_tool_outputs",
+                "submit_tool_outputs": {"tool_calls": run["tool_calls"]},
+            }
+        return payload
+
+    def create_run(self, body, query, thread_id):
+        connections = self.connection_names
+        run = {
+            "id": new_id("run"),
+            "thread_id": thread_id,
+            "agent_id": body.get("assistant_id", ""),
+            "status": "queued",
+            "created_at": int(time.time()),
+            "tool_calls": [
+                {
+                    "id": new_id("call"),
+                    "type": "function",
+                    "function": {
+                        "name": "ask_genie",
+                        "arguments": json.dumps(
+                            {
+                                "connection_name": connections[i % len(connections)],
+                                "question": "各門市上週銷售金額",
+                            }
+                        ),
+                    },
+                }
+                for i in range(self.tool_calls)
+            ],
+            "tool_outputs": [],
+        }
+        with self._lock:
+            self._runs[run["id"]] = run
+        return 200, self._run_payload(run)
+
+    def get_run(self, body, query, thread_id, run_id):
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run is None:
+                return 404, {"error": {"code": "NotFound", "message": run_id}}
+            # queued → requires_action (有工具呼叫時) → in_progress → completed
+            if run["status"] == "queued":
+                run["status"] = "requires_action" if run["tool_calls"] else "completed"
+            elif run["status"] == "in_progress":
+                run["status"] = "completed"
+            return 200, self._run_payload(run)
+
+    def list_runs(self, body, query, thread_id):
+        with self._lock:
+            runs = [
+                self._run_payload(run)
+                for run in self._runs.values()
+                if run["thread_id"] == thread_id
+            ]
+        return 200, {"object": "list", "data": runs[-5:], "has_more": False}
+
+    def submit_tool_outputs(self, body, query, thread_id, run_id):
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run is None or run["status"] != "requires_action":
+                return 400, {"error": {"code": "InvalidState", "message": run_id}}
+            run["tool_outputs"] = body.get("tool_outputs", [])
+            run["status"] = "in_progress"
+            return 200, self._run_payload(run)
+
+    def cancel_run(self, body, query, thread_id, run_id):
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run is None:
+                return 404, {"error": {"code": "NotFound", "message": run_id}}
+            run["status"] = "cancelled"
+            return 200, self._run_payload(run)
+
+    def list_messages(self, body, query, thread_id):
+        run_id = query.get("run_id")
+        with self._lock:
+            run = self._runs.pop(run_id, None) if run_id else None
+        if query.get("after") or run is None:
+            return 200, {"object": "list", "data": [], "has_more": False}
+
+        outputs: List[str] = [
+            output.get("output", "") for output in run["tool_outputs"]
+        ]
+        cards = {
+            "cards": [
+                {
+                    "card_type": "text",
+                    "content": f"已彙整 {len(outputs)} 個 Genie 查詢結果 "
+                    f"(共 {sum(len(output) for output in outputs)} 字元)",
+                },
+                {
+                    "card_type": "table",
+                    "headers": ["門市", "銷售金額"],
+                    "rows": [
+                        [f"門市{i}", f"{i * 1234.5:.1f}"] for i in range(self.rows)
+                    ],
+                },
+            ]
+        }
+        message = self._message(
+            thread_id, "assistant", json.dumps(cards, ensure_ascii=False), run_id
+        )
+        return 200, {
+            "object": "list",
+            "data": [message],
+            "first_id": message["id"],
+            "last_id": message["id"],
+            "has_more": False,
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Azure AI Foundry Agents API 替身")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8443)
+    parser.add_argument("--genie-url", default="http://127.0.0.1:8081")
+    parser.add_argument(
+        "--connections",
+        default="genie_a,genie_b",
+        help="工具呼叫輪流使用的連線名稱 (與 AZURE_FOUNDRY_CONNECTION_NAMES 相同)",
+    )
+    parser.add_argument(
+        "--tool-calls", type=int, default=1, help="每個 run 要求的工具呼叫數"
+    )
+    parser.add_argument("--rows", type=int, default=20, help="回應表格的資料列數")
+    fault_args(parser, "foundry", latency_ms=100)
+    args = parser.parse_args()
+
+    FoundryApiHandler.genie_url = args.genie_url
+    FoundryApiHandler.connection_names = args.connections.split(",")
+    FoundryApiHandler.tool_calls = args.tool_calls
+    FoundryApiHandler.rows = args.rows
+    FoundryApiHandler.faults = faults_from_args(args, "foundry")
+
+    certfile, keyfile = create_self_signed_cert(
+        tempfile.mkdtemp(prefix="foundry-stub-")
+    )
+    server = serve(FoundryApiHandler, args.host, args.port, certfile, keyfile)
+    print(
+        f"Foundry API 替身已啟動: https://{args.host}:{server.server_address[1]}",
+        flush=True,
+    )
+    print(f"自簽憑證 (設定 REQUESTS_CA_BUNDLE): {certfile}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Databricks Genie 與 Statement Execution API 替身
+
+支援 Genie 模式 (databricks-sdk 的 GenieAPI 與 statement_execution) 與 Foundry
+模式 (databricks_ai_bridge.Genie) 使用的端點：每則訊息直接以 COMPLETED 狀態回傳，
+附件包含一個查詢，查詢結果為 --rows 列的銷售資料表。
+
+使用方式:
+    python benchmarks/stubs/genie_api.py [--port 8081] [--rows 50]
+        [--genie-latency-ms 200] [--genie-error-rate 0.01]
+    DATABRICKS_HOST=http://127.0.0.1:8081 BOT_MODE=genie python -m src.app
+"""
+
+import argparse
+import threading
+import time
+from typing import Any, Dict
+
+from stub_server import JsonHandler, fault_args, faults_from_args, new_id, serve
+
+_SPACE = r"/api/2.0/genie/spaces/(?P<space_id>[^/]+)"
+_MESSAGE = (
+    _SPACE + r"/conversations/(?P<conversation_id>[^/]+)/messages/(?P<message_id>[^/]+)"
+)
+
+COLUMNS = [("order_date", "DATE"), ("store", "STRING"), ("amount", "DOUBLE")]
+
+
+class GenieApiHandler(JsonHandler):
+    ROUTES = [
+        ("GET", _SPACE, "get_space"),
+        ("POST", _SPACE + r"/start-conversation", "start_conversation"),
+        (
+            "POST",
+            _SPACE + r"/conversations/(?P<conversation_id>[^/]+)/messages",
+            "create_message",
+        ),
+        ("GET", _MESSAGE, "get_message"),
+        (
+            "GET",
+            _MESSAGE + r"/attachments/(?P<attachment_id>[^/]+)/query-result",
+            "get_query_result",
+        ),
+        ("GET", r"/api/2.0/sql/statements/(?P<statement_id>[^/]+)", "get_statement"),
+    ]
+
+    rows = 50
+    _messages: Dict[str, Dict[str, Any]] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def statement(cls, statement_id: str) -> Dict[str, Any]:
+        data = [
+            [f"2024-01-{i % 28 + 1:02d}", f"門市{i % 20}", f"{i * 12.5:.2f}"]
+            for i in range(cls.rows)
+        ]
+        return {
+            "statement_id": statement_id,
+            "status": {"state": "SUCCEEDED"},
+            "manifest": {
+                "format": "JSON_ARRAY",
+                "schema": {
+                    "column_count": len(COLUMNS),
+                    "columns": [
+                        {"name": name, "type_name": type_name, "position": i}
+                        for i, (name, type_name) in enumerate(COLUMNS)
+                    ],
+                },
+                "total_row_count": cls.rows,
+            },
+            "result": {"row_count": cls.rows, "data_array": data},
+        }
+
+    def _new_message(self, space_id: str, conversation_id: str, content: str):
+        message_id = new_id("msg")
+        message = {
+            "id": message_id,
+            "message_id": message_id,
+            "conversation_id": conversation_id,
+            "space_id": space_id,
+            "content": content,
+            "status": "COMPLETED",
+            "created_timestamp": int(time.time() * 1000),
+            "attachments": [
+                {
+                    "attachment_id": new_id("att"),
+                    "query": {
+                        "description": f"依門市彙總銷售金額 ({content[:20]})",
+                        "query": "SELECT order_date, store, amount FROM sales LIMIT 50",
+                        "statement_id": new_id("stmt"),
+                    },
+                }
+            ],
+        }
+        with self._lock:
+            self._messages[message_id] = message
+        return message
+
+    def get_space(self, body, query, space_id):
+        return 200, {
+            "space_id": space_id,
+            "title": "Load test space",
+            "description": "銷售資料 (壓力測試替身)",
+        }
+
+    def start_conversation(self, body, query, space_id):
+        conversation_id = new_id("conv")
+        message = self._new_message(space_id, conversation_id, body.get("content", ""))
+        return 200, {
+            "conversation_id": conversation_id,
+            "message_id": message["message_id"],
+            "message": message,
+            "conversation": {"id": conversation_id, "space_id": space_id},
+        }
+
+    def create_message(self, body, query, space_id, conversation_id):
+        return 200, self._new_message(
+            space_id, conversation_id, body.get("content", "")
+        )
+
+    def get_message(self, body, query, space_id, conversation_id, message_id):
+        with self._lock:
+            message = self._messages.get(message_id)
+        if message is None:
+            return 404, {"error_code": "NOT_FOUND", "message": message_id}
+        return 200, message
+
+    def get_query_result(
+        self, body, query, space_id, conversation_id, message_id, attachment_id
+    ):
+        statement = self.statement(new_id("stmt"))
+        statement["conversation_id"] = conversation_id
+        return 200, {"statement_response": statement}
+
+    def get_statement(self, body, query, statement_id):
+        return 200, self.statement(statement_id)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Databricks Genie API 替身")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--rows", type=int, default=50, help="查詢結果的資料列數")
+    fault_args(parser, "genie", latency_ms=200)
+    args = parser.parse_args()
+
+    GenieApiHandler.rows = args.rows
+    GenieApiHandler.faults = faults_from_args(args, "genie")
+    server = serve(GenieApiHandler, args.host, args.port)
+    print(
+        f"Genie API 替身已啟動: http://{args.host}:{server.server_address[1]}",
+        flush=True,
+    )
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
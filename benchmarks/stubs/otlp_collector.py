@@ -0,0 +1,133 @@
+"""
+本機 OTLP/HTTP JSON Collector 替身
+
+接收 bot 以 OTLP/JSON 送出的 span (POST /v1/traces)，依 trace 彙整後以樹狀
+格式印出各 span 的耗時，並可將原始 payload 逐行寫入檔案供後續分析。
+GET /traces 回傳目前收到的所有 span (JSON)，方便在腳本中驗證。
+
+使用方式:
+    python benchmarks/stubs/otlp_collector.py [--port 4318] [--out spans.jsonl]
+    OTEL_EXPORTER_OTLP_ENDPOINT=http://localhost:4318 python -m src.app
+"""
+
+import argparse
+import json
+import threading
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+_spans: List[dict] = []
+_lock = threading.Lock()
+_out_path: Optional[str] = None
+
+
+def _duration_ms(span: dict) -> float:
+    return (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e6
+
+
+def _attributes(span: dict) -> Dict[str, object]:
+    values = {}
+    for attribute in span.get("attributes", []):
+        value = attribute["value"]
+        values[attribute["key"]] = next(iter(value.values())) if value else None
+    return values
+
+
+def format_trace(spans: List[dict]) -> List[str]:
+    """將同一條 trace 的 span 依父子關係排成樹狀文字"""
+    by_id = {span["spanId"]: span for span in spans}
+    children = defaultdict(list)
+    roots = []
+    for span in spans:
+        parent = span.get("parentSpanId")
+        if parent and parent in by_id:
+            children[parent].append(span)
+        else:
+            roots.append(span)
+
+    lines = []
+
+    def visit(span: dict, depth: int) -> None:
+        status = " ERROR" if span.get("status", {}).get("code") == 2 else ""
+        attrs = _attributes(span)
+        attr_text = f" {attrs}" if attrs else ""
+        lines.append(
+            f"{'  ' * depth}{span['name']} {_duration_ms(span):.1f} ms{status}{attr_text}"
+        )
+        for child in sorted(
+            children[span["spanId"]], key=lambda s: int(s["startTimeUnixNano"])
+        ):
+            visit(child, depth + 1)
+
+    for root in sorted(roots, key=lambda s: int(s["startTimeUnixNano"])):
+        visit(root, 0)
+    return lines
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        if self.path != "/v1/traces":
+            self.send_error(404)
+            return
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        payload = json.loads(body)
+
+        received = []
+        for resource_spans in payload.get("resourceSpans", []):
+            for scope_spans in resource_spans.get("scopeSpans", []):
+                received.extend(scope_spans.get("spans", []))
+
+        with _lock:
+            _spans.extend(received)
+            if _out_path:
+                with open(_out_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(payload, ensure_ascii=False) + "\n")
+
+        by_trace = defaultdict(list)
+        for span in received:
+            by_trace[span["traceId"]].append(span)
+        for trace_id, spans in by_trace.items():
+            print(f"trace {trace_id} ({len(spans)} spans)")
+            for line in format_trace(spans):
+                print(f"  {line}")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def do_GET(self):
+        if self.path != "/traces":
+            self.send_error(404)
+            return
+        with _lock:
+            body = json.dumps(_spans, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main() -> None:
+    global _out_path
+    parser = argparse.ArgumentParser(description="本機 OTLP/HTTP JSON Collector 替身")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4318)
+    parser.add_argument("--out", help="將收到的 payload 逐行寫入此檔案")
+    args = parser.parse_args()
+    _out_path = args.out
+
+    server = ThreadingHTTPServer((args.host, args.port), _Handler)
+    print(f"OTLP collector 替身已啟動: http://{args.host}:{args.port}/v1/traces")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+後端替身伺服器的共用元件
+
+提供可設定延遲與錯誤注入的 JSON HTTP handler，以及 Foundry 替身使用的自簽
+TLS 憑證 (Azure SDK 只允許以 https 傳送 bearer token)。
+"""
+
+import datetime
+import ipaddress
+import json
+import os
+import random
+import re
+import ssl
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+
+class FaultInjector:
+    """為每個請求加上固定延遲與隨機錯誤"""
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 500,
+    ):
+        """
+        Args:
+            latency_ms: 每個請求的基本延遲毫秒數
+            jitter_ms: 額外加上 0 ~ jitter_ms 的隨機延遲
+            error_rate: 回傳錯誤的機率 (0 ~ 1)
+            error_status: 注入錯誤時的 HTTP 狀態碼
+        """
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.requests = 0
+        self.injected_errors = 0
+        self._lock = threading.Lock()
+
+    def apply(self) -> Optional[int]:
+        """等待模擬延遲，需要注入錯誤時回傳狀態碼"""
+        delay = self.latency_ms + random.uniform(0, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+        failed = random.random() < self.error_rate
+        with self._lock:
+            self.requests += 1
+            if failed:
+                self.injected_errors += 1
+        return self.error_status if failed else None
+
+
+class JsonHandler(BaseHTTPRequestHandler):
+    """依 ROUTES 分派 JSON 請求的 handler 基底類別
+
+    子類別以 (HTTP 方法, 路徑正規表示式, 方法名稱) 設定 ROUTES，處理方法收到
+    body、query 與路徑中的具名群組，回傳 (狀態碼, JSON 內容)。
+    NO_FAULT 中的方法不套用延遲與錯誤注入 (例如取得 token)。
+    """
+
+    protocol_version = "HTTP/1.1"
+    ROUTES: List[Tuple[str, str, str]] = []
+    NO_FAULT: Tuple[str, ...] = ()
+    faults = FaultInjector()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._compiled = [
+            (method, re.compile(pattern), name) for method, pattern, name in cls.ROUTES
+        ]
+
+    def _dispatch(self, method: str) -> None:
+        url = urlsplit(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+
+        for route_method, pattern, name in self._compiled:
+            match = pattern.fullmatch(url.path)
+            if route_method == method and match:
+                break
+        else:
+            self.send_json(404, {"error": {"code": "NotFound", "message": url.path}})
+            return
+
+        if name not in self.NO_FAULT:
+            status = self.faults.apply()
+            if status:
+                self.send_json(
+                    status,
+                    {"error": {"code": "InjectedFault", "message": "模擬的後端錯誤"}},
+                )
+                return
+
+        body = json.loads(raw) if raw else {}
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        status, payload = getattr(self, name)(body, query, **match.groupdict())
+        self.send_json(status, payload)
+
+    def send_json(self, status: int, payload: Any) -> None:
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def serve(
+    handler: type,
+    host: str = "127.0.0.1",
+    port: int = 0,
+    certfile: Optional[str] = None,
+    keyfile: Optional[str] = None,
+) -> ThreadingHTTPServer:
+    """在背景執行緒啟動替身伺服器
+
+    Args:
+        handler: JsonHandler 子類別
+        host: 監聽位址
+        port: 監聽埠號 (0 表示自動選擇)
+        certfile: TLS 憑證路徑 (不指定則使用 http)
+        keyfile: TLS 私鑰路徑
+
+    Returns:
+        已啟動的伺服器，server.server_address 為實際監聽位址
+    """
+    server = _Server((host, port), handler)
+    if certfile:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(certfile, keyfile)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+    threading.Thread(
+        target=server.serve_forever, name=f"stub-{handler.__name__}", daemon=True
+    ).start()
+    return server
+
+
+def create_self_signed_cert(directory: str) -> Tuple[str, str]:
+    """建立 localhost / 127.0.0.1 的自簽憑證
+
+    Bot 行程需以 REQUESTS_CA_BUNDLE 指向此憑證才會信任 Foundry 替身。
+
+    Args:
+        directory: 寫入憑證與私鑰的目錄
+
+    Returns:
+        (憑證路徑, 私鑰路徑)
+    """
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(minutes=5))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(
+            x509.SubjectAlternativeName(
+                [
+                    x509.DNSName("localhost"),
+                    x509.IPAddress(ipaddress.ip_address("127.0.0.1")),
+                ]
+            ),
+            critical=False,
+        )
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(key, hashes.SHA256())
+    )
+
+    certfile = os.path.join(directory, "stub-cert.pem")
+    keyfile = os.path.join(directory, "stub-key.pem")
+    with open(certfile, "wb") as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(keyfile, "wb") as f:
+        f.write(
+            key.private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.PKCS8,
+                serialization.NoEncryption(),
+            )
+        )
+    return certfile, keyfile
+
+
+def new_id(prefix: str) -> str:
+    return f"{prefix}_{os.urandom(8).hex()}"
+
+
+def fault_args(parser, name: str, latency_ms: float) -> None:
+    """為命令列加入某個替身的延遲與錯誤注入參數
+
+    Args:
+        parser: argparse.ArgumentParser
+        name: 參數前綴，例如 genie 會產生 --genie-latency-ms
+        latency_ms: 預設延遲毫秒數
+    """
+    parser.add_argument(f"--{name}-latency-ms", type=float, default=latency_ms)
+    parser.add_argument(f"--{name}-jitter-ms", type=float, default=latency_ms / 2)
+    parser.add_argument(f"--{name}-error-rate", type=float, default=0.0)
+    parser.add_argument(f"--{name}-error-status", type=int, default=500)
+
+
+def faults_from_args(args, name: str) -> FaultInjector:
+    """依 fault_args 加入的參數建立 FaultInjector"""
+    values: Dict[str, Any] = vars(args)
+    key = name.replace("-", "_")
+    return FaultInjector(
+        latency_ms=values[f"{key}_latency_ms"],
+        jitter_ms=values[f"{key}_jitter_ms"],
+        error_rate=values[f"{key}_error_rate"],
+        error_status=values[f"{key}_error_status"],
+    )
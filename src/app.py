@@ -1,35 +1,99 @@
+import asyncio
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 import uvicorn
 from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from botbuilder.core import (
     TurnContext,
-    BotFrameworkAdapter,
     BotFrameworkAdapterSettings,
+    serializer_helper,
 )
 from botbuilder.schema import Activity, ActivityTypes
-from botbuilder.integration.aiohttp import (
-    CloudAdapter,
-    ConfigurationBotFrameworkAuthentication,
-)
+from botbuilder.integration.aiohttp import CloudAdapter
+from msrest.serialization import Model
 
-from src.bot.foundry_bot import FoundryBot
-from src.bot.genie_bot import GenieBot
-from src.core.logger_config import setup_logging, get_logger
+from src.core.admin import create_admin_router
+from src.core.connector_pool import (
+    ConnectorSessionPool,
+    PooledBotFrameworkAdapter,
+    PooledBotFrameworkAuthentication,
+)
+from src.core.dedup import ActivityDeduplicator
+from src.core.fair_queue import get_fair_key
+from src.core import json_codec, payload_log, tracing
+from src.core.logger_config import dropped_records, setup_logging, get_logger
+from src.core.loop_monitor import LoopMonitor
+from src.core.metrics import REGISTRY, counter, gauge
 from src.core.settings import init_settings, get_settings
+from src.core.turn_queue import TurnQueue
+from src.core.warmup import WarmupManager, prestart_executor
+from src.utils.command_handler import CommandHandler
 
 # 初始化日誌系統
 setup_logging()
 logger = get_logger(__name__)
 
+
+# 應用程式生命週期 - 啟動背景任務與預熱，關閉時釋放資源
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 固定大小的預設執行緒池，供 run_in_executor 使用並可預先建立執行緒
+    # (提交工作時帶入呼叫端的 context，SDK 呼叫的 span 會接在目前的 trace 之下)
+    default_executor = tracing.ContextThreadPoolExecutor(
+        max_workers=settings.app["executor_workers"],
+        thread_name_prefix="default-executor",
+    )
+    asyncio.get_running_loop().set_default_executor(default_executor)
+
+    LOOP_MONITOR.start()
+    BOT.start_cleanup_task()
+    if settings.app["fast_ack"]:
+        TURN_QUEUE.start()
+
+    WARMUP.add(
+        "default_executor",
+        prestart_executor(default_executor, settings.app["executor_workers"]),
+    )
+    for name, task in BOT.warmup_tasks().items():
+        WARMUP.add(name, task)
+    warmup_task = asyncio.create_task(WARMUP.run())
+    logger.info("應用啟動完成，清理任務已啟動，預熱進行中")
+
+    yield
+
+    warmup_task.cancel()
+    if settings.app["fast_ack"]:
+        await TURN_QUEUE.stop()
+    await LOOP_MONITOR.stop()
+    CONNECTOR_POOL.close()
+    tracing.shutdown()
+    logger.info("應用已關閉")
+
+
 # 建立 FastAPI 應用程式
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # 初始化設定
 init_settings(app)
 settings = get_settings(app)
 
-# 建立適配器
+# 分散式追蹤 (未設定 OTEL_EXPORTER_OTLP_ENDPOINT 時停用)
+tracing.configure(settings.app["otlp_endpoint"], settings.app["service_name"])
+
+# 大型內容日誌的取樣率與摘要長度
+payload_log.configure(
+    settings.app["log_payload_sample_rate"],
+    settings.app["log_payload_sample_rates"],
+    settings.app["log_payload_preview_chars"],
+)
+
+# 建立適配器 (兩種適配器共用 Bot Connector 的 keep-alive 連線池)
+CONNECTOR_POOL = ConnectorSessionPool(
+    pool_connections=settings.app["connector_pool_connections"],
+    pool_maxsize=settings.app["connector_pool_maxsize"],
+)
+
 if settings.bot["app_id"] != "" and settings.bot["app_password"] != "":
     # Production: Use CloudAdapter
     class BotConfig:
@@ -38,12 +102,14 @@ if settings.bot["app_id"] != "" and settings.bot["app_password"] != "":
         APP_TYPE = settings.bot["app_type"]
         APP_TENANTID = settings.bot["app_tenantid"]
 
-    ADAPTER = CloudAdapter(ConfigurationBotFrameworkAuthentication(BotConfig()))
+    ADAPTER = CloudAdapter(
+        PooledBotFrameworkAuthentication(BotConfig(), pool=CONNECTOR_POOL)
+    )
     logger.info("CloudAdapter 已建立 (生產環境)")
 else:
     # Local testing: Use BotFrameworkAdapter with empty credentials
     SETTINGS = BotFrameworkAdapterSettings("", "")
-    ADAPTER = BotFrameworkAdapter(SETTINGS)
+    ADAPTER = PooledBotFrameworkAdapter(SETTINGS, pool=CONNECTOR_POOL)
     logger.info("BotFrameworkAdapter 已建立 (本地開發)")
 
 
@@ -67,11 +133,15 @@ async def on_error(context: TurnContext, error: Exception):
 
 ADAPTER.on_turn_error = on_error
 
-# 建立機器人
+# 建立機器人 (只匯入目前模式使用的 Bot，另一個模式的 SDK 不會被載入)
 if settings.app["bot_mode"] == "foundry":
+    from src.bot.foundry_bot import FoundryBot
+
     BOT = FoundryBot(app)
     logger.info("FoundryBot 實例已建立")
 elif settings.app["bot_mode"] == "genie":
+    from src.bot.genie_bot import GenieBot
+
     BOT = GenieBot(app)
     logger.info("GenieBot 實例已建立")
 else:
@@ -79,42 +149,198 @@ else:
     raise ValueError(f"未知的 BOT_MODE: {settings.app['bot_mode']}")
 
 
-# 啟動事件 - 啟動背景清理任務
-@app.on_event("startup")
-async def startup_event():
-    BOT.start_cleanup_task()
-    logger.info("應用啟動完成，清理任務已啟動")
+# 背景回合佇列 (僅快速回應模式使用)
+TURN_QUEUE = TurnQueue(
+    workers=settings.app["turn_workers"],
+    max_size=settings.app["turn_queue_size"],
+    fair_weights=settings.app["fair_weights"],
+)
+gauge("turn_queue_depth", "背景回合佇列中等待的回合數").set_function(TURN_QUEUE.qsize)
+gauge("log_records_dropped", "日誌佇列已滿而丟棄的紀錄數").set_function(dropped_records)
+TURN_QUEUE_REJECTED = counter("turn_queue_rejected", "背景回合佇列已滿而拒絕的回合數")
+
+# 重複投遞抑制 (Bot Connector 重送同一個 activity 時不重複處理)
+DEDUP = ActivityDeduplicator(
+    ttl=settings.app["dedup_ttl"], max_entries=settings.app["dedup_max_entries"]
+)
+
+
+# 啟動預熱：完成後 /healthz/ready 才回報就緒
+WARMUP = WarmupManager(timeout=settings.app["warmup_timeout"])
+
+# 事件迴圈延遲監控與管理端點 (未設定 ADMIN_TOKEN 時管理端點回傳 404)
+LOOP_MONITOR = LoopMonitor(
+    interval=settings.app["loop_monitor_interval"],
+    stall_threshold=settings.app["loop_stall_threshold"],
+)
+app.include_router(create_admin_router(settings.app["admin_token"], LOOP_MONITOR))
+
+
+async def authenticate_activity(activity: Activity, auth_header: str):
+    """驗證請求並取得主動回覆所需的身分資訊
+
+    Args:
+        activity: 收到的 activity
+        auth_header: HTTP authorization 標頭
+
+    Returns:
+        tuple: (claims_identity, audience)
+
+    Raises:
+        PermissionError: 驗證失敗時
+    """
+    if hasattr(ADAPTER, "process"):
+        # CloudAdapter
+        result = await ADAPTER.bot_framework_authentication.authenticate_request(
+            activity, auth_header
+        )
+        return result.claims_identity, result.audience
+
+    # BotFrameworkAdapter
+    claims_identity = await ADAPTER._authenticate_request(activity, auth_header)
+    return claims_identity, None
+
+
+async def enqueue_turn(activity: Activity, auth_header: str) -> JSONResponse:
+    """快速回應模式：驗證並排入背景佇列，立即回傳 202
+
+    回合完成後透過 continue_conversation 以儲存的 ConversationReference 主動回覆。
+    """
+    try:
+        claims_identity, audience = await authenticate_activity(activity, auth_header)
+    except PermissionError as e:
+        logger.warning(f"請求驗證失敗: {e}")
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+    reference = TurnContext.get_conversation_reference(activity)
+
+    async def callback(turn_context: TurnContext):
+        # continue_conversation 產生的是延續事件，換回原始訊息再交給 bot 處理
+        turn_context.activity = activity
+        await BOT.on_turn(turn_context)
+
+    # 背景 worker 不會繼承請求的 context，明確以請求的 span 作為父 span
+    request_span = tracing.current_span()
+
+    async def job():
+        with tracing.start_span("turn_queue.job", parent=request_span):
+            await ADAPTER.continue_conversation(
+                reference, callback, claims_identity=claims_identity, audience=audience
+            )
+
+    fair_key = get_fair_key(activity, settings.app["fair_key"])
+    # 同一使用者的後續訊息在前一回合結束前不佔用 worker；
+    # 指令 (例如重置) 需要在回合執行中立即處理，不加入序列
+    serial_key = None
+    if activity.from_property and not CommandHandler.is_command(activity.text):
+        serial_key = activity.from_property.id
+    if not TURN_QUEUE.submit(job, fair_key, serial_key):
+        TURN_QUEUE_REJECTED.inc()
+        return JSONResponse(
+            content={"error": "busy, please retry"},
+            status_code=503,
+            headers={"Retry-After": "5"},
+        )
+    return JSONResponse(content={}, status_code=202)
+
+
+# 就緒檢查端點：預熱完成前回傳 503，負載平衡器不會導入流量
+@app.get("/healthz/ready")
+async def readiness():
+    status = WARMUP.status()
+    return JSONResponse(content=status, status_code=200 if WARMUP.ready else 503)
+
+
+# Prometheus 指標端點
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(
+        REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
 
 
 # 主要訊息處理端點
 @app.post("/api/messages")
 async def messages(request: Request):
+    content_type = request.headers.get("content-type", "")
+    if "application/json" not in content_type:
+        raise HTTPException(status_code=415, detail="Unsupported Media Type")
+
+    # 只讀取與解析一次 body，之後直接把 Activity 交給適配器
     try:
-        content_type = request.headers.get("content-type", "")
-        if "application/json" not in content_type:
-            raise HTTPException(status_code=415, detail="Unsupported Media Type")
+        body = json_codec.loads(await request.body())
+        activity = Activity().deserialize(body)
+    except Exception as e:
+        logger.warning(f"無法解析請求內容: {e}")
+        raise HTTPException(status_code=400, detail="Bad Request")
+    if not activity.type:
+        raise HTTPException(status_code=400, detail="Bad Request")
 
-        body = await request.json()
-        auth_header = request.headers.get("authorization", "")
+    auth_header = request.headers.get("authorization", "")
 
-        activity = Activity().deserialize(body)
+    # 每個 activity 一條 trace (有 traceparent 標頭時延續上游的 trace)
+    with tracing.start_span(
+        "POST /api/messages",
+        kind="server",
+        attributes={
+            "activity.type": activity.type,
+            "activity.id": activity.id,
+            "channel.id": activity.channel_id,
+            "conversation.id": (
+                activity.conversation.id if activity.conversation else None
+            ),
+        },
+        traceparent=request.headers.get("traceparent"),
+    ) as span:
+        # 重送的 activity 直接回應成功，不再執行後端工作
+        if await DEDUP.check_and_mark(activity):
+            tracing.set_attribute("activity.duplicate", True)
+            return JSONResponse(content={}, status_code=200)
 
-        # 根據適配器類型使用不同的處理方式
+        try:
+            response = await process_activity(activity, auth_header)
+        except Exception:
+            # 處理失敗時移除記錄，讓 Bot Connector 的重送可以再處理一次
+            await DEDUP.forget(activity)
+            raise
+        if span is not None:
+            span.set_attribute("http.status_code", response.status_code)
+        if response.status_code >= 400:
+            await DEDUP.forget(activity)
+        return response
+
+
+async def process_activity(activity: Activity, auth_header: str) -> JSONResponse:
+    """將已解析的 activity 交給適配器處理"""
+    try:
+        # 快速回應模式：訊息回合交由背景 worker 處理
+        if settings.app["fast_ack"] and activity.type == ActivityTypes.message:
+            return await enqueue_turn(activity, auth_header)
+
+        # 根據適配器類型使用不同的參數順序
         if hasattr(ADAPTER, "process"):
-            # CloudAdapter - 直接使用 process 方法
-            response = await ADAPTER.process(request, BOT)
-            if response:
-                return JSONResponse(content=response.body, status_code=response.status)
-            return JSONResponse(content={}, status_code=201)
+            # CloudAdapter
+            response = await ADAPTER.process_activity(
+                auth_header, activity, BOT.on_turn
+            )
         else:
-            # BotFrameworkAdapter - 使用 process_activity
+            # BotFrameworkAdapter
             response = await ADAPTER.process_activity(
                 activity, auth_header, BOT.on_turn
             )
-            if response:
-                return JSONResponse(content=response.body, status_code=response.status)
-            return JSONResponse(content={}, status_code=201)
 
+        if response:
+            body = response.body
+            if isinstance(body, Model):
+                body = serializer_helper(body)
+            return JSONResponse(content=body, status_code=response.status)
+        return JSONResponse(content={}, status_code=201)
+
+    except HTTPException:
+        raise
+    except PermissionError as e:
+        logger.warning(f"請求驗證失敗: {e}")
+        raise HTTPException(status_code=401, detail="Unauthorized")
     except Exception as e:
         logger.error(f"處理請求時發生錯誤: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail="Internal Server Error")
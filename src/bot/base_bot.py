@@ -1,15 +1,20 @@
-from typing import List
+from typing import Callable, List
 from botbuilder.core import ActivityHandler, TurnContext
-from botbuilder.schema import ChannelAccount
+from botbuilder.schema import ActivityTypes, ChannelAccount
 from fastapi import FastAPI
 from typing import Dict
 from collections import OrderedDict
 from datetime import datetime, timedelta
 import asyncio
 
+from src.core.admission import AdmissionController, AdmissionRejected
+from src.core.fair_queue import get_fair_key
 from src.core.logger_config import get_logger
 from src.core.settings import get_settings
+from src.utils.chart_tool import ChartTool
 from src.utils.command_handler import CommandHandler
+from src.utils.outbound_buffer import OutboundBuffer
+from src.utils.turn_scheduler import TurnScheduler
 
 # 取得 logger 實例
 logger = get_logger(__name__)
@@ -29,11 +34,25 @@ class BaseBot(ActivityHandler):
         self.bot_mode = self.settings.app["bot_mode"]
         self.command_handler = CommandHandler(bot_mode=self.bot_mode)
 
+        # 依使用者序列化對話回合，並合併執行期間的後續訊息
+        self.turn_scheduler = TurnScheduler(
+            coalesce_window=self.settings.app["turn_coalesce_window"]
+        )
+
         # 儲存使用者執行緒字典
         # 使用 OrderedDict 追蹤最後使用時間
         self.thread_dict: Dict[str, str] = OrderedDict()
         self.thread_last_used: Dict[str, datetime] = {}
 
+        # 准入控制：限制同時執行的回合數，過載時快速回覆忙碌訊息
+        self.admission = AdmissionController(
+            max_in_flight=self.settings.app["admission_max_in_flight"],
+            max_per_user=self.settings.app["admission_max_per_user"],
+            max_queue=self.settings.app["admission_max_queue"],
+            queue_timeout=self.settings.app["admission_queue_timeout"],
+            fair_weights=self.settings.app["fair_weights"],
+        )
+
         # 設定參數 TODO: 可移至設定檔
         self.MAX_IDLE_TIME = timedelta(hours=24)  # 24小時未使用即清理
         self.MAX_THREADS = 100  # 最多保留100個執行緒
@@ -44,6 +63,14 @@ class BaseBot(ActivityHandler):
 
         logger.info("BaseBot 已初始化")
 
+    def warmup_tasks(self) -> Dict[str, Callable[[], object]]:
+        """回傳應用啟動時要平行執行的預熱工作
+
+        Returns:
+            工作名稱對應同步函式的字典，子類別可擴充
+        """
+        return {"chart_font": ChartTool.warm_up}
+
     def start_cleanup_task(self):
         """啟動背景清理任務 - 應在應用啟動時調用"""
 
@@ -54,6 +81,53 @@ class BaseBot(ActivityHandler):
             except RuntimeError as e:
                 logger.warning(f"無可用的事件迴圈，清理任務啟動失敗: {e}")
 
+    async def on_turn(self, turn_context: TurnContext):
+        """處理回合
+
+        回合中加入 OutboundBuffer 的狀態訊息會合併到正式回覆，
+        沒有正式回覆時於回合結束一次送出。
+        """
+        if turn_context.activity.type != ActivityTypes.message:
+            await super().on_turn(turn_context)
+            return
+
+        outbound = OutboundBuffer.for_turn(turn_context)
+        try:
+            await super().on_turn(turn_context)
+        finally:
+            await outbound.flush()
+
+    async def submit_turn(
+        self, turn_context: TurnContext, user_id: str, message: str
+    ) -> None:
+        """交給回合排程器執行，回合實際開始時才通過准入控制
+
+        在 TurnScheduler 中等待同一使用者前一個回合結束的訊息不佔用執行名額，
+        否則每位使用者的一則後續訊息就會在整個前一回合期間多佔一個名額。
+
+        Args:
+            turn_context: 對話上下文
+            user_id: 使用者 ID
+            message: 使用者訊息內容
+        """
+        fair_key = get_fair_key(turn_context.activity, self.settings.app["fair_key"])
+
+        async def run_admitted(content: str) -> None:
+            try:
+                async with self.admission.admit(user_id, fair_key):
+                    await self._process_turn(turn_context, user_id, content)
+            except AdmissionRejected as e:
+                logger.warning(f"使用者 {user_id} 的回合未獲准入: {e.reason}")
+                await turn_context.send_activity("系統忙碌中，請稍後再試。")
+
+        await self.turn_scheduler.submit(user_id, message, run_admitted)
+
+    async def _process_turn(
+        self, turn_context: TurnContext, user_id: str, message: str
+    ):
+        """執行單一回合 - 子類別應該 override 此方法"""
+        raise NotImplementedError("子類別必須實作 _process_turn 方法")
+
     async def on_message_activity(self, turn_context: TurnContext):
         """處理使用者訊息 - 子類別應該 override 此方法"""
 
@@ -1,14 +1,25 @@
 from botbuilder.core import TurnContext, MessageFactory
-from botbuilder.schema import Activity, ActivityTypes
 from azure.identity import DefaultAzureCredential
 from azure.ai.projects import AIProjectClient
-from azure.ai.agents.models import FunctionTool, ToolSet
+from azure.ai.agents.models import RunStatus
 from fastapi import FastAPI
 from datetime import datetime
+from functools import partial
+from typing import Callable, Dict
+import asyncio
 
 from src.bot.base_bot import BaseBot
 from src.core.logger_config import get_logger
+from src.core.metrics import stage_timer
+from src.core.payload_log import log_payload
+from src.core.trace_propagation import TraceparentPolicy
+from src.core.turn_telemetry import TurnTelemetry
+from src.utils.agent_runner import AgentRunner, AgentRunResult
+from src.utils.command_handler import CommandHandler
 from src.utils.genie_manager import GenieManager
+from src.utils.outbound_buffer import OutboundBuffer
+from src.utils.token_manager import TokenManager
+from src.utils.typing_indicator import typing_heartbeat
 from src.utils.response_format import get_agent_response_format
 from src.utils.card_builder import convert_to_card
 from src.utils.file_handler import (
@@ -21,6 +32,14 @@ import json
 # 取得 logger 實例
 logger = get_logger(__name__)
 
+# 回合各階段的耗時、執行中數量與錯誤次數
+TURN_STAGE = stage_timer("foundry_bot", "turn")
+THREAD_CREATE_STAGE = stage_timer("foundry_bot", "thread_create", kind="client")
+MESSAGE_CREATE_STAGE = stage_timer("foundry_bot", "message_create", kind="client")
+AGENT_RUN_STAGE = stage_timer("foundry_bot", "agent_run", kind="client")
+MESSAGES_LIST_STAGE = stage_timer("foundry_bot", "messages_list", kind="client")
+REPLY_STAGE = stage_timer("foundry_bot", "reply", kind="client")
+
 
 class FoundryBot(BaseBot):
     def __init__(self, app: FastAPI):
@@ -39,17 +58,44 @@ class FoundryBot(BaseBot):
         )
         logger.info("Azure 認證已初始化")
 
+        # Token 管理器：依 scope 快取 token 並在到期前於背景更新
+        self.token_manager = TokenManager(self.credential)
+        self.token_manager.start()
+
         # 初始化 AI Project Client
         logger.info("======STEP 2: 正在初始化 AI Project Client======")
         self.project_client = AIProjectClient(
-            self.settings.azure_foundry["project_endpoint"], self.credential
+            self.settings.azure_foundry["project_endpoint"],
+            self.credential,
+            per_call_policies=[TraceparentPolicy()],
         )
         logger.info("AI Project Client 已初始化")
 
         self.agent_id = self.settings.azure_foundry["agent_id"]
 
         # Genie 管理器（由 Bot 實例持有，避免全域狀態）
-        self.genie_manager = GenieManager()
+        self.genie_manager = GenieManager(
+            max_concurrency_per_space=self.settings.databricks[
+                "genie_max_concurrency_per_space"
+            ],
+            fanout_timeout=self.settings.databricks["genie_fanout_timeout"],
+            space_wait_timeout=self.settings.databricks["genie_space_wait_timeout"],
+        )
+
+        # run 執行器：由 Bot 自行輪詢 run，並平行執行同一步驟的工具呼叫
+        self.agent_runner = AgentRunner(
+            self.project_client,
+            functions=[self.genie_manager.ask_genie, self.genie_manager.ask_genies],
+            max_workers=self.settings.azure_foundry["tool_max_workers"],
+            polling_interval=self.settings.azure_foundry["run_polling_interval"],
+        )
+
+        # 回合用量記錄：token、工具呼叫與 run 耗時
+        self.turn_telemetry = TurnTelemetry(
+            self.settings.azure_foundry["turn_telemetry_path"],
+            prompt_price=self.settings.azure_foundry["prompt_token_price"],
+            completion_price=self.settings.azure_foundry["completion_token_price"],
+        )
 
         # 設定工具集
         logger.info("======STEP 3: 正在初始化 AI Agent 工具集======")
@@ -59,6 +105,21 @@ class FoundryBot(BaseBot):
             logger.error(f"工具集設定失敗: {e}", exc_info=True)
             # 不要讓整個 Bot 初始化失敗，但要記錄錯誤
 
+    def warmup_tasks(self) -> Dict[str, Callable[[], object]]:
+        """預熱回應格式、Foundry 連線與 token、工具執行緒與 Genie 連線"""
+        tasks = super().warmup_tasks()
+        tasks.update(
+            {
+                "response_format": get_agent_response_format,
+                "foundry_agent": lambda: self.project_client.agents.get_agent(
+                    self.agent_id
+                ),
+                "agent_tool_threads": self.agent_runner.warm_up,
+                "genie": self.genie_manager.warm_up,
+            }
+        )
+        return tasks
+
     def _setup_toolset(self):
         """設定 AI Agent 工具集"""
         try:
@@ -66,23 +127,57 @@ class FoundryBot(BaseBot):
             logger.info("開始初始化 Genie...")
             genies = self.genie_manager.initialize(
                 self.project_client,
-                self.credential,
+                self.token_manager,
                 self.settings.azure_foundry["connection_names"],
                 self.settings.databricks["entra_id_audience_scope"],
+                startup_timeout=self.settings.databricks["genie_startup_timeout"],
+            )
+            logger.info(f"Genie 初始化完成，已就緒連線數量: {len(genies)}")
+            logger.info(
+                f"工具函式已註冊: {list(self.agent_runner.functions)}，"
+                f"可用的 Genie 連線: {list(genies.keys())}"
             )
-            logger.info(f"Genie 初始化成功，連線數量: {len(genies)}")
-
-            # 設定工具集
-            logger.info("開始設定 ToolSet...")
-            toolset = ToolSet()
-            toolset.add(FunctionTool(functions={self.genie_manager.ask_genie}))
-            self.project_client.agents.enable_auto_function_calls(toolset)
-            logger.info(f"工具集設定完成,可用的 Genie 連線: {list(genies.keys())}")
 
         except Exception as e:
             logger.error(f"工具集設定過程中發生錯誤: {e}", exc_info=True)
             raise
 
+    def _record_turn(
+        self, user_id: str, thread_id: str, result: AgentRunResult
+    ) -> None:
+        """記錄回合的 token 用量、工具呼叫次數與 run 耗時
+
+        Args:
+            user_id: 使用者 ID
+            thread_id: 執行緒 ID
+            result: agent run 的執行結果
+        """
+        run = result.run
+        usage = run.usage
+        prompt_tokens = (usage.prompt_tokens if usage else 0) or 0
+        completion_tokens = (usage.completion_tokens if usage else 0) or 0
+        logger.info(
+            f"run 用量: prompt {prompt_tokens} tokens, completion "
+            f"{completion_tokens} tokens, 工具呼叫 {result.tool_calls} 次, "
+            f"耗時 {result.duration:.1f} 秒"
+        )
+        self.turn_telemetry.record(
+            user_id=user_id,
+            agent_id=self.agent_id,
+            thread_id=thread_id,
+            run_id=run.id,
+            status=getattr(run.status, "value", str(run.status)),
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            tool_calls=result.tool_calls,
+            tool_output_chars=result.tool_output_chars,
+            run_seconds=result.duration,
+        )
+
+    def _thread_reset(self, user_id: str, thread_id: str) -> bool:
+        """回合使用的執行緒是否已因重置命令與使用者解除對應"""
+        return bool(thread_id) and self.thread_dict.get(user_id) != thread_id
+
     async def _handle_file_attachments(
         self, turn_context: TurnContext, user_id: str, question: str
     ) -> list:
@@ -104,11 +199,14 @@ class FoundryBot(BaseBot):
 
         supported, unsupported = validate_attachments(attachments)
 
+        # 檔案處理結果先放入緩衝區，與回覆合併送出
+        outbound = OutboundBuffer.for_turn(turn_context)
+
         # 處理不支援的檔案
         if unsupported:
             for file_info in unsupported:
                 error_msg = f"File type not supported: {file_info.name}. Supported types are PDF, DOC, DOCX."
-                await turn_context.send_activity(error_msg)
+                outbound.add_status(error_msg)
                 logger.warning(
                     f"Unsupported file type: {file_info.name} (type: {file_info.file_type})"
                 )
@@ -118,7 +216,7 @@ class FoundryBot(BaseBot):
             for file_info in supported:
                 log_attachment(file_info, user_id)
                 success_msg = f"Successfully received: {file_info.name}"
-                await turn_context.send_activity(success_msg)
+                outbound.add_status(success_msg)
 
         return supported
 
@@ -139,102 +237,173 @@ class FoundryBot(BaseBot):
 
         # 檢查並處理特殊命令
         if await self.command_handler.handle_special_command(
-            question, turn_context, user_id, self.thread_dict, self.project_client
+            question,
+            turn_context,
+            user_id,
+            self.thread_dict,
+            self.project_client,
+            self.turn_scheduler,
         ):
             return
 
-        # 顯示打字指示器
-        await turn_context.send_activity(Activity(type=ActivityTypes.typing))
-
-        try:
-            # 組合訊息內容：如果有附件，加入附件資訊
-            message_content = question
-            if supported_files:
-                file_info_text = "\n\nAttached files:\n" + "\n".join(
-                    [f"- {f.name}: {f.download_url}" for f in supported_files]
-                )
-                message_content = question + file_info_text
-
-            logger.info(f"使用者 {user_id}: {message_content}")
-
-            # 建立或取得既有的執行緒
-            thread_id = None
-            if user_id not in self.thread_dict or not self.thread_dict[user_id]:
-                thread = self.project_client.agents.threads.create()
-                self.thread_dict[user_id] = thread.id
-                thread_id = thread.id
-                logger.info(f"建立新執行緒: {thread.id}")
-            else:
-                thread_id = self.thread_dict[user_id]
-                logger.info(f"使用既有執行緒: {thread_id}")
-
-            # 更新最後使用時間
-            self.thread_last_used[user_id] = datetime.now()
-
-            # 發送訊息前再次顯示打字指示器
-            await turn_context.send_activity(Activity(type=ActivityTypes.typing))
-
-            # 發送訊息（包含附件資訊）
-            self.project_client.agents.messages.create(
-                thread_id=thread_id, role="user", content=message_content
+        # 組合訊息內容：如果有附件，加入附件資訊
+        message_content = question
+        if supported_files:
+            file_info_text = "\n\nAttached files:\n" + "\n".join(
+                [f"- {f.name}: {f.download_url}" for f in supported_files]
             )
+            message_content = question + file_info_text
 
-            # 取得回應格式定義
-            response_format = get_agent_response_format()
+        # 同一使用者同時間只執行一個回合，執行期間的後續訊息會併入下一個回合
+        if self.turn_scheduler.is_busy(user_id):
+            logger.info(f"使用者 {user_id} 已有執行中的回合，訊息將排入下一個回合")
 
-            # 執行代理程式前再次顯示打字指示器
-            await turn_context.send_activity(Activity(type=ActivityTypes.typing))
+        await self.submit_turn(turn_context, user_id, message_content)
 
-            # 執行代理程式
-            run = self.project_client.agents.runs.create_and_process(
-                thread_id=thread_id,
-                agent_id=self.agent_id,
-                response_format=response_format,
-            )
-            logger.info(f"執行完成,狀態: {run.status}")
-
-            # 取得回應
-            messages = self.project_client.agents.messages.list(thread_id=thread_id)
-
-            for msg in messages:
-                if msg.role == "assistant":
-                    if hasattr(msg, "content") and msg.content:
-                        content_text = ""
-                        if isinstance(msg.content, list):  # 如果內容是列表,提取文字部分
-                            for content_item in msg.content:
-                                if hasattr(content_item, "text"):
-                                    if hasattr(content_item.text, "value"):
-                                        content_text += content_item.text.value
-                                    else:
-                                        content_text += str(content_item.text)
-                        else:
-                            content_text = str(msg.content)
-
-                        if content_text:
-                            logger.info(f"助理回應: {content_text}")
-                            try:
-                                response_data = json.loads(content_text)
-                                attachment = convert_to_card(response_data)
-                                message = MessageFactory.attachment(attachment)
-                                await turn_context.send_activity(message)
-                                return
-                            except json.JSONDecodeError as e:
-                                logger.error(f"回應解析失敗: {e}")
-                                await turn_context.send_activity(
-                                    "回應內容格式錯誤，請聯絡系統管理員。"
-                                )
-                                return
-                            except ValueError as e:
-                                logger.error(f"卡片建立失敗: {e}")
-                                await turn_context.send_activity(
-                                    f"卡片建立錯誤，請聯絡系統管理員。"
-                                )
-                                return
-
-            await turn_context.send_activity("抱歉,我無法取得回應。")
-            return
+    @TURN_STAGE
+    async def _process_turn(
+        self, turn_context: TurnContext, user_id: str, message_content: str
+    ):
+        """執行單一回合：送出訊息、執行代理程式並回覆結果
 
-        except Exception as e:
-            logger.error(f"處理訊息錯誤: {e}")
-            await turn_context.send_activity(f"處理請求時發生錯誤: {e}")
-            return
+        Args:
+            turn_context: 對話上下文
+            user_id: 使用者 ID
+            message_content: 合併後的使用者訊息內容
+        """
+        # 後端處理期間於背景持續顯示打字指示器，送出回覆時停止
+        async with typing_heartbeat(turn_context, self.settings.app["typing_interval"]):
+            loop = asyncio.get_running_loop()
+            thread_id = None
+            try:
+                logger.info(f"使用者 {user_id}: {message_content}")
+
+                # 建立或取得既有的執行緒
+                if user_id not in self.thread_dict or not self.thread_dict[user_id]:
+                    with THREAD_CREATE_STAGE.track():
+                        thread = await loop.run_in_executor(
+                            None, self.project_client.agents.threads.create
+                        )
+                    self.thread_dict[user_id] = thread.id
+                    thread_id = thread.id
+                    logger.info(f"建立新執行緒: {thread.id}")
+                else:
+                    thread_id = self.thread_dict[user_id]
+                    logger.info(f"使用既有執行緒: {thread_id}")
+
+                # 更新最後使用時間
+                self.thread_last_used[user_id] = datetime.now()
+
+                # 發送訊息（包含附件資訊）
+                with MESSAGE_CREATE_STAGE.track():
+                    await loop.run_in_executor(
+                        None,
+                        partial(
+                            self.project_client.agents.messages.create,
+                            thread_id=thread_id,
+                            role="user",
+                            content=message_content,
+                        ),
+                    )
+
+                if self._thread_reset(user_id, thread_id):
+                    await turn_context.send_activity("先前的問題已取消。")
+                    return
+
+                # 取得回應格式定義
+                response_format = get_agent_response_format()
+
+                # 執行代理程式
+                with AGENT_RUN_STAGE.track():
+                    result = await loop.run_in_executor(
+                        None,
+                        partial(
+                            self.agent_runner.run,
+                            thread_id=thread_id,
+                            agent_id=self.agent_id,
+                            response_format=response_format,
+                        ),
+                    )
+                run = result.run
+                logger.info(f"執行完成,狀態: {run.status}")
+                self._record_turn(user_id, thread_id, result)
+
+                if run.status == RunStatus.CANCELLED or self._thread_reset(
+                    user_id, thread_id
+                ):
+                    await turn_context.send_activity("先前的問題已取消。")
+                    return
+                if run.status != RunStatus.COMPLETED:
+                    AGENT_RUN_STAGE.record_error()
+                    logger.error(
+                        f"執行未完成,狀態: {run.status}, 錯誤: {run.last_error}"
+                    )
+                    await turn_context.send_activity("抱歉,我無法取得回應。")
+                    return
+
+                # 取得此次 run 的回應
+                with MESSAGES_LIST_STAGE.track():
+                    messages = await loop.run_in_executor(
+                        None,
+                        lambda: list(
+                            self.project_client.agents.messages.list(
+                                thread_id=thread_id, run_id=run.id
+                            )
+                        ),
+                    )
+
+                for msg in messages:
+                    if msg.role == "assistant":
+                        if hasattr(msg, "content") and msg.content:
+                            content_text = ""
+                            if isinstance(
+                                msg.content, list
+                            ):  # 如果內容是列表,提取文字部分
+                                for content_item in msg.content:
+                                    if hasattr(content_item, "text"):
+                                        if hasattr(content_item.text, "value"):
+                                            content_text += content_item.text.value
+                                        else:
+                                            content_text += str(content_item.text)
+                            else:
+                                content_text = str(msg.content)
+
+                            if content_text:
+                                log_payload(logger, "助理回應", content_text)
+                                try:
+                                    response_data = json.loads(content_text)
+                                    attachment = convert_to_card(response_data)
+                                    message = MessageFactory.attachment(attachment)
+                                    with REPLY_STAGE.track():
+                                        await turn_context.send_activity(message)
+                                    return
+                                except json.JSONDecodeError as e:
+                                    logger.error(f"回應解析失敗: {e}")
+                                    await turn_context.send_activity(
+                                        "回應內容格式錯誤，請聯絡系統管理員。"
+                                    )
+                                    return
+                                except ValueError as e:
+                                    logger.error(f"卡片建立失敗: {e}")
+                                    await turn_context.send_activity(
+                                        f"卡片建立錯誤，請聯絡系統管理員。"
+                                    )
+                                    return
+
+                await turn_context.send_activity("抱歉,我無法取得回應。")
+                return
+
+            except Exception as e:
+                TURN_STAGE.record_error()
+                logger.error(f"處理訊息錯誤: {e}")
+                await turn_context.send_activity(f"處理請求時發生錯誤: {e}")
+                return
+            finally:
+                # 回合期間使用者重置了對話：run 已結束，由本回合刪除舊的執行緒
+                if self._thread_reset(user_id, thread_id):
+                    await loop.run_in_executor(
+                        None,
+                        CommandHandler.delete_thread,
+                        self.project_client,
+                        thread_id,
+                    )
@@ -8,20 +8,34 @@ FIXME:
 """
 
 import asyncio
-from typing import Optional
+from typing import Callable, Dict, Optional
 from botbuilder.core import TurnContext, MessageFactory
-from botbuilder.schema import Activity, ActivityTypes
 from databricks.sdk import WorkspaceClient
+from databricks.sdk.credentials_provider import DefaultCredentials
 from databricks.sdk.service.dashboards import GenieAPI
 from fastapi import FastAPI
 from datetime import datetime
 
 from src.bot.base_bot import BaseBot
+from src.core import tracing
+from src.core.admission import AdmissionRejected, GENIE_SPACE_REJECTED
 from src.core.logger_config import get_logger
+from src.core.metrics import stage_timer
+from src.core.payload_log import log_payload
+from src.core.trace_propagation import TraceparentCredentialsStrategy
 from src.utils.card_builder import convert_to_card
+from src.utils.typing_indicator import typing_heartbeat
 
 logger = get_logger(__name__)
 
+# 回合各階段的耗時、執行中數量與錯誤次數
+TURN_STAGE = stage_timer("genie_bot", "turn")
+SPACE_WAIT_STAGE = stage_timer("genie_bot", "space_wait")
+GENIE_MESSAGE_STAGE = stage_timer("genie_bot", "genie_message", kind="client")
+GET_MESSAGE_STAGE = stage_timer("genie_bot", "get_message", kind="client")
+STATEMENT_FETCH_STAGE = stage_timer("genie_bot", "statement_fetch", kind="client")
+REPLY_STAGE = stage_timer("genie_bot", "reply", kind="client")
+
 
 class GenieBot(BaseBot):
     def __init__(self, app: FastAPI):
@@ -37,11 +51,24 @@ class GenieBot(BaseBot):
         self.workspace_client = WorkspaceClient(
             host=self.settings.databricks["host"],
             token=self.settings.databricks["token"],
+            credentials_strategy=TraceparentCredentialsStrategy(DefaultCredentials()),
         )
         self.genie_api = GenieAPI(self.workspace_client.api_client)
         self.genie_space_id = self.settings.databricks["genie_space_id"]
+
+        # 限制同時對 Genie space 執行的查詢數
+        self._space_slots = asyncio.Semaphore(
+            self.settings.databricks["genie_max_concurrency_per_space"]
+        )
+        self.space_wait_timeout = self.settings.databricks["genie_space_wait_timeout"]
         logger.info("Databricks Genie 客戶端已初始化")
 
+    def warmup_tasks(self) -> Dict[str, Callable[[], object]]:
+        """預熱 Databricks 連線並確認 Genie space 可存取"""
+        tasks = super().warmup_tasks()
+        tasks["genie_space"] = lambda: self.genie_api.get_space(self.genie_space_id)
+        return tasks
+
     async def ask_genie(
         self, question: str, conversation_id: Optional[str] = None
     ) -> tuple[str, str, str]:
@@ -53,36 +80,51 @@ class GenieBot(BaseBot):
 
         Returns:
             tuple: (message_content, conversation_id, message_id)
+
+        Raises:
+            AdmissionRejected: 等待 Genie space 執行名額逾時
         """
+        try:
+            with SPACE_WAIT_STAGE.track():
+                await asyncio.wait_for(
+                    self._space_slots.acquire(), self.space_wait_timeout
+                )
+        except asyncio.TimeoutError:
+            GENIE_SPACE_REJECTED.labels(self.genie_space_id).inc()
+            raise AdmissionRejected("space_busy")
+
         try:
             loop = asyncio.get_running_loop()
 
-            if conversation_id is None:
-                initial_message = await loop.run_in_executor(
-                    None,
-                    self.genie_api.start_conversation_and_wait,
-                    self.genie_space_id,
-                    question,
-                )
-            else:
-                initial_message = await loop.run_in_executor(
+            with GENIE_MESSAGE_STAGE.track():
+                tracing.set_attribute("genie.space_id", self.genie_space_id)
+                if conversation_id is None:
+                    initial_message = await loop.run_in_executor(
+                        None,
+                        self.genie_api.start_conversation_and_wait,
+                        self.genie_space_id,
+                        question,
+                    )
+                else:
+                    initial_message = await loop.run_in_executor(
+                        None,
+                        self.genie_api.create_message_and_wait,
+                        self.genie_space_id,
+                        conversation_id,
+                        question,
+                    )
+
+            # 取得訊息內容
+            with GET_MESSAGE_STAGE.track():
+                message_content = await loop.run_in_executor(
                     None,
-                    self.genie_api.create_message_and_wait,
+                    self.genie_api.get_message,
                     self.genie_space_id,
-                    conversation_id,
-                    question,
+                    initial_message.conversation_id,
+                    initial_message.message_id,
                 )
 
-            # 取得訊息內容
-            message_content = await loop.run_in_executor(
-                None,
-                self.genie_api.get_message,
-                self.genie_space_id,
-                initial_message.conversation_id,
-                initial_message.message_id,
-            )
-
-            logger.info(f"Genie 回應: attachments={message_content.attachments}")
+            log_payload(logger, "Genie 回應 attachments", message_content.attachments)
 
             return (
                 message_content,
@@ -92,6 +134,8 @@ class GenieBot(BaseBot):
         except Exception as e:
             logger.error(f"Error in ask_genie: {e}")
             raise
+        finally:
+            self._space_slots.release()
 
     async def on_message_activity(self, turn_context: TurnContext):
         """處理使用者訊息"""
@@ -100,145 +144,163 @@ class GenieBot(BaseBot):
         question = (turn_context.activity.text or "").strip()
 
         if await self.command_handler.handle_special_command(
-            question, turn_context, user_id, self.thread_dict, None
+            question, turn_context, user_id, self.thread_dict, None, self.turn_scheduler
         ):
             return
 
-        # 顯示打字指示器
-        await turn_context.send_activity(Activity(type=ActivityTypes.typing))
-
-        try:
-            logger.info(f"使用者 {user_id}: {question}")
-
-            # 取得或建立對話
-            conversation_id = self.thread_dict.get(user_id)
-            logger.info(f"使用對話 ID: {conversation_id}")
+        # 同一使用者同時間只執行一個回合，執行期間的後續訊息會併入下一個回合
+        await self.submit_turn(turn_context, user_id, question)
 
-            # 呼叫 Genie API 前再次顯示打字指示器
-            await turn_context.send_activity(Activity(type=ActivityTypes.typing))
+    @TURN_STAGE
+    async def _process_turn(
+        self, turn_context: TurnContext, user_id: str, question: str
+    ):
+        """執行單一回合：呼叫 Genie 並回覆結果
 
-            # 呼叫 Genie API
-            message_content, new_conversation_id, message_id = await self.ask_genie(
-                question, conversation_id
-            )
+        Args:
+            turn_context: 對話上下文
+            user_id: 使用者 ID
+            question: 合併後的使用者問題
+        """
+        # 後端處理期間於背景持續顯示打字指示器，送出回覆時停止
+        async with typing_heartbeat(turn_context, self.settings.app["typing_interval"]):
+            try:
+                logger.info(f"使用者 {user_id}: {question}")
+
+                # 取得或建立對話
+                conversation_id = self.thread_dict.get(user_id)
+                logger.info(f"使用對話 ID: {conversation_id}")
+
+                # 呼叫 Genie API
+                message_content, new_conversation_id, message_id = await self.ask_genie(
+                    question, conversation_id
+                )
 
-            # 儲存對話 ID
-            self.thread_dict[user_id] = new_conversation_id
-
-            # 準備卡片資料
-            cards = []
-
-            # 處理附件
-            if message_content.attachments:
-                for attachment in message_content.attachments:
-                    # 優先處理文字回應
-                    if hasattr(attachment, "text") and attachment.text:
-                        if (
-                            hasattr(attachment.text, "content")
-                            and attachment.text.content
-                        ):
-                            cards.append(
-                                {
-                                    "card_type": "text",
-                                    "content": attachment.text.content,
-                                }
-                            )
-
-                    # 處理查詢結果
-                    elif hasattr(attachment, "query") and attachment.query:
-                        query = attachment.query
-
-                        # 顯示查詢描述
-                        if hasattr(query, "description") and query.description:
-                            cards.append(
-                                {
-                                    "card_type": "text",
-                                    "content": f"**查詢說明**: {query.description}",
-                                }
-                            )
-
-                        # 顯示 SQL 查詢
-                        if hasattr(query, "query") and query.query:
-                            cards.append(
-                                {
-                                    "card_type": "sql",
-                                    "content": query.query,
-                                }
-                            )
-
-                        # 取得並顯示查詢結果
-                        if hasattr(query, "statement_id") and query.statement_id:
-                            try:
-                                # 處理查詢結果前再次顯示打字指示器
-                                await turn_context.send_activity(
-                                    Activity(type=ActivityTypes.typing)
+                # 儲存對話 ID
+                self.thread_dict[user_id] = new_conversation_id
+
+                # 準備卡片資料
+                cards = []
+
+                # 處理附件
+                if message_content.attachments:
+                    for attachment in message_content.attachments:
+                        # 優先處理文字回應
+                        if hasattr(attachment, "text") and attachment.text:
+                            if (
+                                hasattr(attachment.text, "content")
+                                and attachment.text.content
+                            ):
+                                cards.append(
+                                    {
+                                        "card_type": "text",
+                                        "content": attachment.text.content,
+                                    }
                                 )
 
-                                loop = asyncio.get_running_loop()
-                                statement_result = await loop.run_in_executor(
-                                    None,
-                                    self.workspace_client.statement_execution.get_statement,
-                                    query.statement_id,
-                                )
+                        # 處理查詢結果
+                        elif hasattr(attachment, "query") and attachment.query:
+                            query = attachment.query
 
-                                if statement_result and statement_result.result:
-                                    result = statement_result.result
-                                    manifest = statement_result.manifest
-
-                                    # 從 manifest.schema 取得欄位名稱
-                                    if (
-                                        manifest
-                                        and manifest.schema
-                                        and manifest.schema.columns
-                                    ):
-                                        headers = [
-                                            col.name for col in manifest.schema.columns
-                                        ]
-
-                                        # 從 result.data_array 取得資料列
-                                        rows = []
-                                        if (
-                                            hasattr(result, "data_array")
-                                            and result.data_array
-                                        ):
-                                            for row_data in result.data_array:
-                                                row = [
-                                                    (
-                                                        str(cell)
-                                                        if cell is not None
-                                                        else ""
-                                                    )
-                                                    for cell in row_data
-                                                ]
-                                                rows.append(row)
-
-                                        if headers and rows:
-                                            cards.append(
-                                                {
-                                                    "card_type": "table",
-                                                    "headers": headers,
-                                                    "rows": rows,
-                                                }
-                                            )
-                            except Exception as e:
-                                logger.error(f"取得查詢結果失敗: {e}", exc_info=True)
+                            # 顯示查詢描述
+                            if hasattr(query, "description") and query.description:
                                 cards.append(
                                     {
                                         "card_type": "text",
-                                        "content": f"查詢執行成功，但無法取得結果: {e}",
+                                        "content": f"**查詢說明**: {query.description}",
                                     }
                                 )
 
-            # 如果沒有任何 attachment，才使用 message_content.content
-            if not cards and message_content.content:
-                cards.append({"card_type": "text", "content": message_content.content})
-
-            # 使用 convert_to_card 建立卡片
-            response_data = {"cards": cards}
-            attachment = convert_to_card(response_data)
-            message = MessageFactory.attachment(attachment)
-            await turn_context.send_activity(message)
+                            # 顯示 SQL 查詢
+                            if hasattr(query, "query") and query.query:
+                                cards.append(
+                                    {
+                                        "card_type": "sql",
+                                        "content": query.query,
+                                    }
+                                )
 
-        except Exception as e:
-            logger.error(f"處理訊息錯誤: {e}", exc_info=True)
-            await turn_context.send_activity(f"處理請求時發生錯誤: {e}")
+                            # 取得並顯示查詢結果
+                            if hasattr(query, "statement_id") and query.statement_id:
+                                try:
+                                    loop = asyncio.get_running_loop()
+                                    with STATEMENT_FETCH_STAGE.track():
+                                        tracing.set_attribute(
+                                            "genie.statement_id", query.statement_id
+                                        )
+                                        statement_result = await loop.run_in_executor(
+                                            None,
+                                            self.workspace_client.statement_execution.get_statement,
+                                            query.statement_id,
+                                        )
+
+                                    if statement_result and statement_result.result:
+                                        result = statement_result.result
+                                        manifest = statement_result.manifest
+
+                                        # 從 manifest.schema 取得欄位名稱
+                                        if (
+                                            manifest
+                                            and manifest.schema
+                                            and manifest.schema.columns
+                                        ):
+                                            headers = [
+                                                col.name
+                                                for col in manifest.schema.columns
+                                            ]
+
+                                            # 從 result.data_array 取得資料列
+                                            rows = []
+                                            if (
+                                                hasattr(result, "data_array")
+                                                and result.data_array
+                                            ):
+                                                for row_data in result.data_array:
+                                                    row = [
+                                                        (
+                                                            str(cell)
+                                                            if cell is not None
+                                                            else ""
+                                                        )
+                                                        for cell in row_data
+                                                    ]
+                                                    rows.append(row)
+
+                                            if headers and rows:
+                                                cards.append(
+                                                    {
+                                                        "card_type": "table",
+                                                        "headers": headers,
+                                                        "rows": rows,
+                                                    }
+                                                )
+                                except Exception as e:
+                                    logger.error(
+                                        f"取得查詢結果失敗: {e}", exc_info=True
+                                    )
+                                    cards.append(
+                                        {
+                                            "card_type": "text",
+                                            "content": f"查詢執行成功，但無法取得結果: {e}",
+                                        }
+                                    )
+
+                # 如果沒有任何 attachment，才使用 message_content.content
+                if not cards and message_content.content:
+                    cards.append(
+                        {"card_type": "text", "content": message_content.content}
+                    )
+
+                # 使用 convert_to_card 建立卡片
+                response_data = {"cards": cards}
+                attachment = convert_to_card(response_data)
+                message = MessageFactory.attachment(attachment)
+                with REPLY_STAGE.track():
+                    await turn_context.send_activity(message)
+
+            except AdmissionRejected:
+                await turn_context.send_activity("系統忙碌中，請稍後再試。")
+            except Exception as e:
+                TURN_STAGE.record_error()
+                logger.error(f"處理訊息錯誤: {e}", exc_info=True)
+                await turn_context.send_activity(f"處理請求時發生錯誤: {e}")
@@ -0,0 +1,119 @@
+"""
+管理端點模組
+
+提供線上診斷用的 /admin 端點 (CPU 取樣、記憶體配置差異、事件迴圈延遲)，
+以 ADMIN_TOKEN 驗證；未設定 ADMIN_TOKEN 時所有端點回傳 404。
+剖析結果為 collapsed stack 文字，可直接產生火焰圖，例如:
+
+    curl -X POST -H "Authorization: Bearer $ADMIN_TOKEN" .../admin/profile/start
+    curl -X POST -H "Authorization: Bearer $ADMIN_TOKEN" .../admin/profile/stop \\
+        | flamegraph.pl > cpu.svg
+"""
+
+import asyncio
+import hmac
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from src.core.loop_monitor import LoopMonitor
+from src.core.profiling import MemorySnapshots, SamplingProfiler
+
+
+def create_admin_router(token: str, loop_monitor: LoopMonitor) -> APIRouter:
+    """建立管理端點
+
+    Args:
+        token: 管理 token (空字串表示停用所有管理端點)
+        loop_monitor: 事件迴圈延遲監控
+
+    Returns:
+        掛載於 /admin 的 APIRouter
+    """
+    profiler = SamplingProfiler()
+    memory = MemorySnapshots()
+
+    def require_token(request: Request) -> None:
+        if not token:
+            raise HTTPException(status_code=404, detail="Not Found")
+        supplied = request.headers.get("x-admin-token", "")
+        authorization = request.headers.get("authorization", "")
+        if authorization.lower().startswith("bearer "):
+            supplied = authorization[7:].strip()
+        if not hmac.compare_digest(supplied.encode(), token.encode()):
+            raise HTTPException(status_code=401, detail="Unauthorized")
+
+    router = APIRouter(prefix="/admin", dependencies=[Depends(require_token)])
+
+    @router.post("/profile/start")
+    async def profile_start(
+        interval_ms: float = 10, max_seconds: float = 300, include_idle: bool = False
+    ):
+        # start() 需在事件迴圈中呼叫以記錄迴圈執行緒，只建立取樣執行緒不會阻塞
+        try:
+            started = profiler.start(interval_ms / 1000, max_seconds, include_idle)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if not started:
+            raise HTTPException(status_code=409, detail="Profiler already running")
+        return JSONResponse(
+            content={"status": "started", "interval_ms": interval_ms},
+        )
+
+    @router.post("/profile/stop")
+    async def profile_stop():
+        if not profiler.running:
+            raise HTTPException(status_code=409, detail="Profiler not running")
+        # 等待取樣執行緒結束時不佔用事件迴圈
+        text = await asyncio.to_thread(profiler.stop)
+        return PlainTextResponse(
+            text,
+            headers={
+                "X-Profile-Samples": str(profiler.samples),
+                "X-Profile-Duration": f"{profiler.duration:.3f}",
+            },
+        )
+
+    @router.post("/memory/start")
+    async def memory_start(frames: int = 25):
+        # 基準快照與 diff 相同，交給執行緒池
+        try:
+            await asyncio.to_thread(memory.start, frames)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return JSONResponse(content={"status": "tracing", "frames": frames})
+
+    @router.post("/memory/diff")
+    async def memory_diff(
+        format: str = "collapsed", limit: int = 30, reset: bool = True
+    ):
+        if not memory.tracing:
+            raise HTTPException(status_code=409, detail="Memory tracing not started")
+        # 快照與比較在大量配置時需要數百毫秒，交給執行緒池
+        stats, elapsed = await asyncio.to_thread(memory.diff, reset)
+        if format == "top":
+            text = memory.render_top(stats, limit)
+        else:
+            text = memory.render_collapsed(stats)
+        return PlainTextResponse(
+            text, headers={"X-Snapshot-Interval": f"{elapsed:.3f}"}
+        )
+
+    @router.post("/memory/stop")
+    async def memory_stop():
+        memory.stop()
+        return JSONResponse(content={"status": "stopped"})
+
+    @router.get("/loop-lag")
+    async def loop_lag():
+        return JSONResponse(content=loop_monitor.stats())
+
+    @router.get("/loop-lag/slow")
+    async def loop_lag_slow():
+        return JSONResponse(content=loop_monitor.slow_callbacks())
+
+    @router.get("/loop-lag/stacks")
+    async def loop_lag_stacks(reset: bool = False):
+        return PlainTextResponse(loop_monitor.stall_stacks(reset))
+
+    return router
@@ -0,0 +1,162 @@
+"""
+回合准入控制
+
+限制每個 worker 同時處理的回合數與每位使用者的回合數，
+超過上限的回合在有上限的等待佇列中等待，逾時或佇列已滿時立即拒絕，
+讓系統過載時快速回應「忙碌中」而不是無限制地建立 Foundry run 與 Genie 查詢。
+等待中的回合依公平排程鍵以加權 Deficit Round Robin 取得釋放的名額，
+大量發問的使用者不會讓其他使用者的等待時間無限拉長。
+"""
+
+import asyncio
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+from src.core.fair_queue import DeficitRoundRobin
+from src.core.logger_config import get_logger
+from src.core.metrics import counter, gauge
+
+logger = get_logger(__name__)
+
+ADMISSION_IN_FLIGHT = gauge("admission_in_flight", "目前執行中的回合數")
+ADMISSION_WAITING = gauge("admission_waiting", "等待執行名額的回合數")
+ADMISSION_ADMITTED = counter("admission_admitted", "已准入的回合數")
+ADMISSION_REJECTED = counter(
+    "admission_rejected", "被拒絕的回合數", labelnames=("reason",)
+)
+ADMISSION_WAIT_SECONDS = counter("admission_wait_seconds", "准入前累計等待秒數")
+GENIE_SPACE_REJECTED = counter(
+    "genie_space_rejected",
+    "等待 Genie space 執行名額逾時的查詢數",
+    labelnames=("connection",),
+)
+
+
+class AdmissionRejected(Exception):
+    """回合未獲准入
+
+    Attributes:
+        reason: 拒絕原因 (user_limit, queue_full, timeout, space_busy)
+    """
+
+    def __init__(self, reason: str):
+        super().__init__(f"回合未獲准入: {reason}")
+        self.reason = reason
+
+
+class AdmissionController:
+    """依 worker 與使用者限制同時執行的回合數"""
+
+    def __init__(
+        self,
+        max_in_flight: int = 16,
+        max_per_user: int = 3,
+        max_queue: int = 50,
+        queue_timeout: float = 30.0,
+        fair_weights: Optional[Dict[str, float]] = None,
+    ):
+        """
+        Args:
+            max_in_flight: 每個 worker 同時執行的回合上限
+            max_per_user: 每位使用者同時執行或等待的回合上限
+            max_queue: 等待執行名額的回合上限
+            queue_timeout: 等待執行名額的最長秒數
+            fair_weights: 公平排程鍵的權重，未列出者權重為 1
+        """
+        self.max_in_flight = max_in_flight
+        self.max_per_user = max_per_user
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+        self._in_flight = 0
+        self._waiters: DeficitRoundRobin[asyncio.Future] = DeficitRoundRobin(
+            weights=fair_weights
+        )
+        self._user_counts: Dict[str, int] = defaultdict(int)
+
+    def _reject(self, reason: str) -> AdmissionRejected:
+        ADMISSION_REJECTED.labels(reason).inc()
+        logger.warning(f"拒絕回合: {reason}")
+        return AdmissionRejected(reason)
+
+    @asynccontextmanager
+    async def admit(
+        self, user_id: str, fair_key: Optional[str] = None
+    ) -> AsyncIterator[None]:
+        """取得執行名額，離開 context 時釋放
+
+        Args:
+            user_id: 使用者 ID
+            fair_key: 公平排程鍵 (使用者、租戶或對話)，未提供時使用 user_id
+
+        Raises:
+            AdmissionRejected: 超過使用者上限、等待佇列已滿或等待逾時
+        """
+        if self._user_counts[user_id] >= self.max_per_user:
+            raise self._reject("user_limit")
+
+        has_free_slot = self._in_flight < self.max_in_flight and not self._waiters
+        if not has_free_slot and len(self._waiters) >= self.max_queue:
+            raise self._reject("queue_full")
+
+        self._user_counts[user_id] += 1
+        try:
+            if has_free_slot:
+                self._in_flight += 1
+            else:
+                await self._wait_for_slot(fair_key or user_id)
+
+            ADMISSION_ADMITTED.inc()
+            ADMISSION_IN_FLIGHT.inc()
+            try:
+                yield
+            finally:
+                ADMISSION_IN_FLIGHT.dec()
+                self._release_slot()
+        finally:
+            self._user_counts[user_id] -= 1
+            if self._user_counts[user_id] <= 0:
+                del self._user_counts[user_id]
+
+    def _release_slot(self) -> None:
+        """釋放執行名額，有等待者時依公平順序直接移交給下一個回合"""
+        while self._waiters:
+            waiter = self._waiters.pop()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._in_flight -= 1
+
+    async def _wait_for_slot(self, fair_key: str) -> None:
+        """在公平等待佇列中等待執行名額
+
+        Args:
+            fair_key: 公平排程鍵
+
+        Raises:
+            AdmissionRejected: 等待逾時
+        """
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.push(fair_key, waiter)
+        ADMISSION_WAITING.inc()
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            # 逾時的同時可能剛好被移交名額，此時視為已取得
+            if not (waiter.done() and not waiter.cancelled()):
+                self._waiters.remove(fair_key, waiter)
+                waiter.cancel()
+                raise self._reject("timeout")
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release_slot()
+            else:
+                self._waiters.remove(fair_key, waiter)
+                waiter.cancel()
+            raise
+        finally:
+            ADMISSION_WAITING.dec()
+            ADMISSION_WAIT_SECONDS.inc(time.monotonic() - started)
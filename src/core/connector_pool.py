@@ -0,0 +1,243 @@
+"""
+Bot Connector 連線池
+
+Bot Framework 的 ConnectorClient 透過 msrest 以 requests 送出回覆。
+CloudAdapter 每個回合都會建立新的 ConnectorClient (也就是新的 requests.Session)，
+每次回覆都要重新建立 TCP/TLS 連線。此模組讓兩種適配器共用以憑證區分的
+keep-alive Session 與有上限的連線池，並快取 ConnectorClient 供後續回合重複使用。
+"""
+
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from botbuilder.core import BotFrameworkAdapter
+from botbuilder.integration.aiohttp import ConfigurationBotFrameworkAuthentication
+from botframework.connector.aio import ConnectorClient
+from botframework.connector.auth import (
+    AppCredentials,
+    ClaimsIdentity,
+    ConnectorFactory,
+)
+from msrest.async_client import AsyncPipeline
+from msrest.pipeline import SansIOHTTPPolicy
+from msrest.pipeline.async_abc import AsyncHTTPPolicy
+from msrest.pipeline.async_requests import (
+    AsyncPipelineRequestsHTTPSender,
+    AsyncRequestsCredentialsPolicy,
+)
+from msrest.pipeline.universal import RawDeserializer
+from msrest.universal_http.async_requests import AsyncRequestsHTTPSender
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from src.core import tracing
+from src.core.logger_config import get_logger
+from src.core.metrics import counter
+
+logger = get_logger(__name__)
+
+CONNECTOR_HTTP_REQUESTS = counter(
+    "connector_http_requests", "送往 Bot Connector 的 HTTP 請求數"
+)
+CONNECTOR_CONNECTIONS_OPENED = counter(
+    "connector_http_connections_opened", "新建立的 Bot Connector HTTP 連線數"
+)
+CONNECTOR_CLIENT_CACHE = counter(
+    "connector_client_cache", "ConnectorClient 快取查詢次數", labelnames=("result",)
+)
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    def _new_conn(self):
+        CONNECTOR_CONNECTIONS_OPENED.inc()
+        return super()._new_conn()
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    def _new_conn(self):
+        CONNECTOR_CONNECTIONS_OPENED.inc()
+        return super()._new_conn()
+
+
+class _CountingHTTPAdapter(HTTPAdapter):
+    """記錄新建連線數的 requests HTTPAdapter"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool,
+        }
+
+
+class _TraceparentPolicy(SansIOHTTPPolicy):
+    """在送往 Bot Connector 的請求加上目前 span 的 traceparent 標頭"""
+
+    def on_request(self, request, **kwargs):
+        tracing.inject_traceparent(request.http_request.headers)
+
+
+class _PooledRequestsHTTPSender(AsyncRequestsHTTPSender):
+    """使用共用 Session 的 msrest requests sender"""
+
+    def __init__(self, config: Any, session: requests.Session):
+        super().__init__(config)
+        self._shared_session = session
+
+    @property
+    def session(self) -> requests.Session:
+        return self._shared_session
+
+    @session.setter
+    def session(self, value: requests.Session) -> None:
+        self._shared_session = value
+
+    def close(self) -> None:
+        # 共用 Session 由 ConnectorSessionPool 管理，不隨 client 關閉
+        pass
+
+    async def send(self, request, **kwargs):
+        CONNECTOR_HTTP_REQUESTS.inc()
+        return await super().send(request, **kwargs)
+
+
+class ConnectorSessionPool:
+    """依憑證共用的 keep-alive requests Session 與 ConnectorClient 快取"""
+
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = 32):
+        """
+        Args:
+            pool_connections: 保留連線池的主機數量
+            pool_maxsize: 每個主機保留的 keep-alive 連線上限
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self._sessions: Dict[Tuple[Optional[str], Optional[str]], requests.Session] = {}
+        self._clients: Dict[Tuple[Any, ...], ConnectorClient] = {}
+        self._lock = threading.Lock()
+
+    def _session_for(self, credentials: Any, config: Any) -> requests.Session:
+        """取得指定憑證使用的共用 Session
+
+        Authorization 標頭由 msrest 寫在 Session 上，因此不同憑證不可共用 Session。
+        """
+        key = (
+            getattr(credentials, "microsoft_app_id", None),
+            getattr(credentials, "oauth_scope", None),
+        )
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = requests.Session()
+                adapter = _CountingHTTPAdapter(
+                    pool_connections=self.pool_connections,
+                    pool_maxsize=self.pool_maxsize,
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                # 套用 msrest 的重導向與重試設定 (只需設定一次)
+                AsyncRequestsHTTPSender(config)._init_session(session)
+                self._sessions[key] = session
+            return session
+
+    def _create_pipeline(self, config: Any) -> AsyncPipeline:
+        """建立與 msrest 預設相同、但使用共用 Session 的 pipeline"""
+        credentials = config.credentials
+        policies = [
+            config.user_agent_policy,
+            _TraceparentPolicy(),
+            RawDeserializer(),
+            config.http_logger_policy,
+        ]
+        if credentials:
+            if isinstance(credentials, (AsyncHTTPPolicy, SansIOHTTPPolicy)):
+                policies.insert(1, credentials)
+            else:
+                policies.insert(1, AsyncRequestsCredentialsPolicy(credentials))
+
+        session = self._session_for(credentials, config)
+        return AsyncPipeline(
+            policies,
+            AsyncPipelineRequestsHTTPSender(_PooledRequestsHTTPSender(config, session)),
+        )
+
+    def attach(self, client: ConnectorClient) -> ConnectorClient:
+        """讓 ConnectorClient 改用共用 Session 送出請求"""
+        client.config.pipeline = self._create_pipeline(client.config)
+        return client
+
+    def get_client(self, key: Tuple[Any, ...]) -> Optional[ConnectorClient]:
+        """從快取取得 ConnectorClient，並記錄命中與否"""
+        client = self._clients.get(key)
+        CONNECTOR_CLIENT_CACHE.labels("hit" if client else "miss").inc()
+        return client
+
+    def put_client(self, key: Tuple[Any, ...], client: ConnectorClient) -> None:
+        """將已套用共用 Session 的 ConnectorClient 放入快取"""
+        self._clients[key] = self.attach(client)
+
+    def close(self) -> None:
+        """關閉所有共用 Session"""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+            self._clients.clear()
+
+
+class _PooledConnectorFactory(ConnectorFactory):
+    """以 ConnectorSessionPool 快取 ConnectorClient 的 ConnectorFactory"""
+
+    def __init__(self, inner: ConnectorFactory, pool: ConnectorSessionPool):
+        self._inner = inner
+        self._pool = pool
+
+    async def create(self, service_url: str, audience: str = None) -> ConnectorClient:
+        # 同一個 bot 的 factory 只差在 claims，app id 與預設 scope 決定使用的憑證
+        key = (
+            getattr(self._inner, "_app_id", None),
+            service_url,
+            audience or getattr(self._inner, "_to_channel_from_bot_oauth_scope", None),
+        )
+        client = self._pool.get_client(key)
+        if client is None:
+            client = await self._inner.create(service_url, audience)
+            self._pool.put_client(key, client)
+        return client
+
+
+class PooledBotFrameworkAuthentication(ConfigurationBotFrameworkAuthentication):
+    """CloudAdapter 使用的 authentication，建立的 ConnectorClient 會跨回合重複使用"""
+
+    def __init__(self, configuration: Any, pool: ConnectorSessionPool, **kwargs):
+        super().__init__(configuration, **kwargs)
+        self._pool = pool
+
+    def create_connector_factory(
+        self, claims_identity: ClaimsIdentity
+    ) -> ConnectorFactory:
+        return _PooledConnectorFactory(
+            super().create_connector_factory(claims_identity), self._pool
+        )
+
+
+class PooledBotFrameworkAdapter(BotFrameworkAdapter):
+    """BotFrameworkAdapter 的 ConnectorClient 改用共用的 keep-alive Session"""
+
+    def __init__(self, settings, pool: ConnectorSessionPool):
+        super().__init__(settings)
+        self._pool = pool
+
+    def _get_or_create_connector_client(
+        self, service_url: str, credentials: AppCredentials
+    ) -> ConnectorClient:
+        cached = len(self._connector_client_cache)
+        client = super()._get_or_create_connector_client(service_url, credentials)
+        if len(self._connector_client_cache) != cached:
+            # 新建立的 client：改用共用 Session
+            CONNECTOR_CLIENT_CACHE.labels("miss").inc()
+            self._pool.attach(client)
+        else:
+            CONNECTOR_CLIENT_CACHE.labels("hit").inc()
+        return client
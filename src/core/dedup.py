@@ -0,0 +1,129 @@
+"""
+重複投遞抑制
+
+Bot Connector 在回合處理較慢時會重送同一個 activity 到 /api/messages，
+此模組以 activity.id + conversation.id 記錄近期已收到的 activity，
+重送的請求直接回應成功而不再執行 Foundry run 或 Genie 查詢。
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from botbuilder.core import Storage
+from botbuilder.schema import Activity
+
+from src.core.logger_config import get_logger
+from src.core.metrics import counter
+
+logger = get_logger(__name__)
+
+DUPLICATE_ACTIVITIES = counter("duplicate_activities", "被抑制的重複投遞 activity 數")
+
+
+class ActivityDeduplicator:
+    """以 TTL 限制的近期 activity 集合
+
+    本機只保存 8 bytes 的摘要與到期時間；提供 botbuilder Storage 時，
+    多個 worker 會透過同一個儲存體共用已收到的 activity。
+    """
+
+    def __init__(
+        self,
+        ttl: float = 600.0,
+        max_entries: int = 100000,
+        storage: Optional[Storage] = None,
+    ):
+        """
+        Args:
+            ttl: 記錄保留秒數 (應大於 Bot Connector 的重送時間)
+            max_entries: 本機最多保留的記錄數
+            storage: 跨 worker 共用的 botbuilder Storage (選用)
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.storage = storage
+        # 摘要 -> 到期時間，插入順序即到期順序
+        self._seen: "OrderedDict[bytes, float]" = OrderedDict()
+
+    @staticmethod
+    def _digest(activity: Activity) -> Optional[bytes]:
+        """計算 activity 的摘要，沒有 activity.id 時回傳 None"""
+        if not activity.id:
+            return None
+        conversation_id = activity.conversation.id if activity.conversation else ""
+        return hashlib.blake2b(
+            f"{conversation_id}\n{activity.id}".encode("utf-8"), digest_size=8
+        ).digest()
+
+    def _prune(self, now: float) -> None:
+        """移除已過期或超過數量上限的記錄"""
+        while self._seen:
+            digest, expires_at = next(iter(self._seen.items()))
+            if expires_at > now and len(self._seen) <= self.max_entries:
+                break
+            self._seen.popitem(last=False)
+
+    async def check_and_mark(self, activity: Activity) -> bool:
+        """檢查 activity 是否為重複投遞，若否則記錄為已收到
+
+        Args:
+            activity: 收到的 activity
+
+        Returns:
+            bool: 是否為重複投遞
+        """
+        digest = self._digest(activity)
+        if digest is None:
+            return False
+
+        now = time.monotonic()
+        self._prune(now)
+        if digest in self._seen:
+            DUPLICATE_ACTIVITIES.inc()
+            logger.info(f"忽略重複投遞的 activity: {activity.id}")
+            return True
+        self._seen[digest] = now + self.ttl
+
+        if self.storage is not None:
+            try:
+                if await self._check_and_mark_shared(digest):
+                    DUPLICATE_ACTIVITIES.inc()
+                    logger.info(f"忽略其他 worker 已收到的 activity: {activity.id}")
+                    return True
+            except Exception as e:
+                # 共用儲存體無法使用時仍以本機記錄為準
+                logger.warning(f"讀寫重複投遞記錄失敗: {e}")
+        return False
+
+    async def forget(self, activity: Activity) -> None:
+        """移除 activity 的記錄，讓處理失敗的投遞可以被重送
+
+        Args:
+            activity: 收到的 activity
+        """
+        digest = self._digest(activity)
+        if digest is None:
+            return
+        self._seen.pop(digest, None)
+        if self.storage is not None:
+            try:
+                await self.storage.delete([self._storage_key(digest)])
+            except Exception as e:
+                logger.warning(f"刪除重複投遞記錄失敗: {e}")
+
+    @staticmethod
+    def _storage_key(digest: bytes) -> str:
+        return f"dedup-{digest.hex()}"
+
+    async def _check_and_mark_shared(self, digest: bytes) -> bool:
+        """在共用儲存體檢查並記錄 activity (以 epoch 秒記錄到期時間)"""
+        key = self._storage_key(digest)
+        items = await self.storage.read([key])
+        record = items.get(key)
+        now = time.time()
+        if record and record.get("expires_at", 0) > now:
+            return True
+        await self.storage.write({key: {"expires_at": now + self.ttl}})
+        return False
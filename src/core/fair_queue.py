@@ -0,0 +1,168 @@
+"""
+加權公平排程 (Deficit Round Robin)
+
+依使用者、Teams 租戶或對話分組排隊，每一輪依權重分配可取出的份額，
+避免單一大量發問的使用者佔滿 worker 與 Genie warehouse，
+讓輕量使用者的等待時間在高負載時仍然有上限。
+"""
+
+from collections import deque
+from typing import Deque, Dict, Generic, Optional, Tuple, TypeVar
+
+from botbuilder.schema import Activity
+
+T = TypeVar("T")
+
+# 支援的公平排程分組方式
+FAIR_KEY_TYPES = ("user", "tenant", "conversation")
+
+
+class DeficitRoundRobin(Generic[T]):
+    """加權 Deficit Round Robin 佇列
+
+    每個分組有自己的 FIFO 佇列；輪到某分組時，只要累積的額度 (deficit)
+    足夠支付佇首項目的成本就取出，不足時補上 quantum * 權重 並換下一個分組。
+    """
+
+    def __init__(
+        self, quantum: float = 1.0, weights: Optional[Dict[str, float]] = None
+    ):
+        """
+        Args:
+            quantum: 每一輪補給的基本額度
+            weights: 分組權重，未列出的分組權重為 1
+
+        Raises:
+            ValueError: quantum 或權重不是正數時 (額度永遠不會增加，pop 將無法結束)
+        """
+        if quantum <= 0:
+            raise ValueError(f"quantum 必須大於 0: {quantum}")
+        for key, weight in (weights or {}).items():
+            if weight <= 0:
+                raise ValueError(f"分組 {key} 的權重必須大於 0: {weight}")
+        self.quantum = quantum
+        self.weights = weights or {}
+        self._queues: Dict[str, Deque[Tuple[T, float]]] = {}
+        self._deficits: Dict[str, float] = {}
+        self._active: Deque[str] = deque()
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def push(self, key: str, item: T, cost: float = 1.0) -> None:
+        """將項目加入指定分組的佇列
+
+        Args:
+            key: 分組鍵 (使用者 ID、租戶 ID 等)
+            item: 項目
+            cost: 取出此項目需消耗的額度
+        """
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = deque()
+            self._queues[key] = queue
+            self._deficits[key] = 0.0
+            self._active.append(key)
+        queue.append((item, cost))
+        self._size += 1
+
+    def pop(self) -> T:
+        """依加權公平順序取出下一個項目
+
+        Raises:
+            IndexError: 佇列為空時
+        """
+        if not self._size:
+            raise IndexError("pop from empty DeficitRoundRobin")
+
+        while True:
+            key = self._active[0]
+            queue = self._queues[key]
+            item, cost = queue[0]
+            if self._deficits[key] >= cost:
+                self._deficits[key] -= cost
+                queue.popleft()
+                self._size -= 1
+                if not queue:
+                    self._drop_key(key)
+                return item
+
+            self._deficits[key] += self.quantum * self.weights.get(key, 1.0)
+            self._active.rotate(-1)
+
+    def remove(self, key: str, item: T) -> bool:
+        """移除尚未取出的項目 (例如等待逾時)
+
+        Returns:
+            bool: 是否找到並移除
+        """
+        queue = self._queues.get(key)
+        if queue is None:
+            return False
+        for index, (queued, _) in enumerate(queue):
+            if queued is item:
+                del queue[index]
+                self._size -= 1
+                if not queue:
+                    self._drop_key(key)
+                return True
+        return False
+
+    def _drop_key(self, key: str) -> None:
+        # 佇列清空的分組不保留剩餘額度，避免閒置後累積過多份額
+        del self._queues[key]
+        del self._deficits[key]
+        self._active.remove(key)
+
+
+def parse_weights(value: str) -> Dict[str, float]:
+    """解析權重設定字串
+
+    Args:
+        value: 格式為 "key1:2,key2:0.5" 的字串
+
+    Returns:
+        分組權重字典
+
+    Raises:
+        ValueError: 權重不是正數時
+    """
+    weights = {}
+    for pair in (value or "").split(","):
+        if ":" not in pair:
+            continue
+        key, weight = pair.rsplit(":", 1)
+        key, weight = key.strip(), float(weight)
+        if weight <= 0:
+            raise ValueError(f"分組 {key} 的權重必須大於 0: {weight}")
+        weights[key] = weight
+    return weights
+
+
+def get_fair_key(activity: Activity, key_type: str = "user") -> str:
+    """依分組方式取得 activity 的公平排程鍵
+
+    Args:
+        activity: 收到的 activity
+        key_type: 分組方式 (user, tenant, conversation)
+
+    Returns:
+        分組鍵，無法取得時退回使用者 ID
+    """
+    user_id = activity.from_property.id if activity.from_property else ""
+
+    if key_type == "tenant":
+        tenant_id = activity.conversation.tenant_id if activity.conversation else None
+        if not tenant_id and isinstance(activity.channel_data, dict):
+            tenant_id = (activity.channel_data.get("tenant") or {}).get("id")
+        return tenant_id or user_id
+
+    if key_type == "conversation":
+        if isinstance(activity.channel_data, dict):
+            channel_id = (activity.channel_data.get("channel") or {}).get("id")
+            if channel_id:
+                return channel_id
+        return activity.conversation.id if activity.conversation else user_id
+
+    return user_id
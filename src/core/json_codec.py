@@ -0,0 +1,25 @@
+"""
+JSON 解析模組
+
+以 orjson 直接解析 bytes，省去解碼為 str 與標準函式庫 json 的解析成本。
+orjson 為必要相依套件 (requirements.txt)，未安裝時於匯入時即失敗。
+"""
+
+from typing import Any
+
+import orjson
+
+
+def loads(data: bytes) -> Any:
+    """將 JSON bytes 解析為 Python 物件
+
+    Args:
+        data: JSON 內容
+
+    Returns:
+        解析後的物件
+
+    Raises:
+        ValueError: 內容不是合法的 JSON 時
+    """
+    return orjson.loads(data)
@@ -3,20 +3,159 @@
 
 提供統一的日誌設定和 logger 實例建立函式。
 確保整個應用程式使用一致的日誌格式和設定。
+
+根 logger 只掛一個 QueueHandler，呼叫端 (通常是事件迴圈) 只把紀錄放入佇列，
+格式化、寫入 stdout 與檔案 (含檔案輪替) 都由 QueueListener 的背景執行緒處理。
+佇列有上限 (LOG_QUEUE_SIZE)，輸出跟不上時丟棄新的紀錄並計數，不讓記憶體無限成長。
+設定 LOG_FORMAT=json 時以單行 JSON 輸出，方便日誌平台解析。
 """
 
+import atexit
+import json
 import logging
+import os
+import queue
 import sys
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional
-from logging.handlers import RotatingFileHandler
+from typing import List, Optional, Tuple
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+DEFAULT_QUEUE_SIZE = 10000
 
 # 全域變數，確保 setup_logging 只執行一次
 _logging_configured = False
+_queue_listener: Optional[QueueListener] = None
+_queue_handler: Optional["NonBlockingQueueHandler"] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """將日誌紀錄輸出為單行 JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc)
+            .isoformat(timespec="milliseconds")
+            .replace("+00:00", "Z"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        trace_id = getattr(record, "trace_id", None)
+        if trace_id:
+            entry["trace_id"] = trace_id
+            entry["span_id"] = record.span_id
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """只在呼叫端合併訊息參數，格式化與 I/O 交給 QueueListener
+
+    標準 QueueHandler.prepare 會在呼叫端完整格式化紀錄 (含時間)，
+    此處只做必要的處理：合併 msg 與 args (避免參數物件之後被修改)，
+    將例外堆疊轉為文字 (traceback 與其 frame 不跨執行緒傳遞)，
+    並記下目前的 trace / span ID (contextvars 無法在背景執行緒取得)。
+    佇列已滿時丟棄紀錄並累計於 dropped。
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._exception_formatter = logging.Formatter()
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
 
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = self._exception_formatter.formatException(
+                    record.exc_info
+                )
+            record.exc_info = None
 
-def setup_logging(level: int = logging.INFO, log_file: Optional[str] = None) -> None:
+        # tracing 會匯入此模組，因此不在模組層級匯入；尚未載入時不會有 span
+        tracing = sys.modules.get("src.core.tracing")
+        span = tracing.current_span() if tracing is not None else None
+        if span is not None:
+            record.trace_id = span.trace_id
+            record.span_id = span.span_id
+        return record
+
+
+class BoundedQueueListener(QueueListener):
+    """搭配有上限佇列的 QueueListener：停止時等待佇列有空位再放入結束標記"""
+
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+
+
+def create_formatter(log_format: str = "text") -> logging.Formatter:
+    """依格式名稱建立 formatter
+
+    Args:
+        log_format: text 或 json
+
+    Returns:
+        logging.Formatter
+    """
+    if log_format == "json":
+        return JsonFormatter()
+    return logging.Formatter(TEXT_FORMAT)
+
+
+def create_queue_handler(
+    handlers: List[logging.Handler],
+    max_size: int = DEFAULT_QUEUE_SIZE,
+) -> Tuple[NonBlockingQueueHandler, QueueListener]:
+    """建立 QueueHandler 與在背景執行緒處理實際輸出的 QueueListener
+
+    Args:
+        handlers: 實際輸出的處理器 (由背景執行緒呼叫)
+        max_size: 佇列中等待輸出的紀錄上限
+
+    Returns:
+        (QueueHandler, 已啟動的 QueueListener)
+    """
+    log_queue = queue.Queue(maxsize=max_size)
+    listener = BoundedQueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return NonBlockingQueueHandler(log_queue), listener
+
+
+def dropped_records() -> int:
+    """佇列已滿而丟棄的日誌紀錄數 (尚未呼叫 setup_logging 時為 0)"""
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
+def _stop_queue_listener() -> None:
+    """停止背景執行緒並輸出佇列中剩餘的紀錄"""
+    global _queue_listener
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        _queue_listener = None
+
+
+def setup_logging(
+    level: int = logging.INFO,
+    log_file: Optional[str] = None,
+    log_format: Optional[str] = None,
+    queue_size: Optional[int] = None,
+) -> None:
     """
     設定全域日誌記錄設定
 
@@ -26,13 +165,16 @@ def setup_logging(level: int = logging.INFO, log_file: Optional[str] = None) ->
     Args:
         level: 日誌記錄層級，預設為 INFO
         log_file: 日誌檔案路徑，如果為 None 則使用預設路徑 'logs/app.log'
+        log_format: text 或 json，如果為 None 則使用 LOG_FORMAT 環境變數 (預設 text)
+        queue_size: 等待輸出的紀錄上限，如果為 None 則使用 LOG_QUEUE_SIZE 環境變數
 
     Examples:
         >>> from src.core.logger_config import setup_logging
         >>> setup_logging()  # 在應用程式進入點呼叫
         >>> setup_logging(log_file='logs/custom.log')  # 自訂日誌檔案路徑
+        >>> setup_logging(log_format='json')  # 以 JSON 格式輸出
     """
-    global _logging_configured
+    global _logging_configured, _queue_listener, _queue_handler
 
     if _logging_configured:
         return
@@ -40,12 +182,17 @@ def setup_logging(level: int = logging.INFO, log_file: Optional[str] = None) ->
     # 設定日誌檔案路徑
     if log_file is None:
         log_file = "logs/app.log"
+    if log_format is None:
+        log_format = (os.getenv("LOG_FORMAT") or "text").lower()
+    if queue_size is None:
+        queue_size = int(os.getenv("LOG_QUEUE_SIZE") or str(DEFAULT_QUEUE_SIZE))
 
     # 建立 logs 目錄（如果不存在）
     log_path = Path(log_file)
     log_path.parent.mkdir(parents=True, exist_ok=True)
 
-    # 建立處理器列表
+    # 建立處理器列表 (由 QueueListener 的背景執行緒輸出)
+    formatter = create_formatter(log_format)
     handlers = [
         logging.StreamHandler(sys.stdout),  # 輸出到控制台
         RotatingFileHandler(
@@ -55,14 +202,20 @@ def setup_logging(level: int = logging.INFO, log_file: Optional[str] = None) ->
             encoding="utf-8",
         ),
     ]
+    for handler in handlers:
+        handler.setFormatter(formatter)
 
-    # 設定根 logger
-    logging.basicConfig(
-        level=level,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=handlers,
-        force=True,  # 強制重新設定，覆蓋任何現有設定
-    )
+    queue_handler, _queue_listener = create_queue_handler(handlers, queue_size)
+    _queue_handler = queue_handler
+    atexit.register(_stop_queue_listener)
+
+    # 設定根 logger (移除任何現有設定)
+    root_logger = logging.getLogger()
+    for handler in root_logger.handlers[:]:
+        root_logger.removeHandler(handler)
+        handler.close()
+    root_logger.addHandler(queue_handler)
+    root_logger.setLevel(level)
 
     _logging_configured = True
 
@@ -73,8 +226,7 @@ def setup_logging(level: int = logging.INFO, log_file: Optional[str] = None) ->
     logging.getLogger("azure.identity").setLevel(logging.WARNING)
 
     # 記錄日誌系統已初始化
-    root_logger = logging.getLogger()
-    root_logger.info(f"日誌系統已初始化，日誌檔案: {log_file}")
+    root_logger.info(f"日誌系統已初始化，日誌檔案: {log_file}，格式: {log_format}")
 
 
 def get_logger(name: Optional[str] = None) -> logging.Logger:
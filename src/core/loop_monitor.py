@@ -0,0 +1,236 @@
+"""
+事件迴圈延遲監控模組
+
+背景 task 以固定間隔 sleep，實際醒來時間與預期時間的差即為排程延遲 (其他
+callback 佔用事件迴圈的時間)。另以看門狗執行緒檢查迴圈是否超過門檻仍未醒來，
+卡住期間取樣迴圈執行緒的呼叫堆疊，記錄是哪個 task 或 callback 阻塞了事件迴圈。
+
+uvicorn 預設使用 uvloop，無法替換 asyncio.Handle 逐一計時 callback，因此由看門狗
+在迴圈延遲期間以 asyncio.current_task() 取得執行中的 task 歸因；不屬於任何 task
+的 callback 則以事件迴圈 (asyncio / uvloop 模組) 直接呼叫的 frame 歸因。
+"""
+
+import asyncio
+import statistics
+import sys
+import threading
+import time
+from collections import Counter, deque
+from types import FrameType
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.core.logger_config import get_logger
+from src.core.metrics import counter, gauge, histogram
+from src.core.profiling import format_stack, render_collapsed, task_label
+
+logger = get_logger(__name__)
+
+LOOP_LAG = histogram(
+    "event_loop_lag_seconds",
+    "事件迴圈排程延遲 (秒)",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+LOOP_LAG_QUANTILE = gauge(
+    "event_loop_lag_quantile_seconds",
+    "最近量測視窗的事件迴圈排程延遲百分位數 (秒)",
+    labelnames=("quantile",),
+)
+SLOW_CALLBACKS = counter(
+    "event_loop_slow_callbacks",
+    "阻塞事件迴圈超過門檻的次數",
+    labelnames=("callback",),
+)
+
+# 寫入日誌的堆疊層數 (完整堆疊可由 /admin/loop-lag/slow 取得)
+_LOG_FRAMES = 8
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    """已排序數列的百分位數 (最近秩法)"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+# 事件迴圈本身的模組，callback 歸因時略過
+_LOOP_MODULES = ("asyncio", "uvloop")
+
+
+def callback_label(frame: Optional[FrameType]) -> str:
+    """不屬於 task 的 callback 名稱：由內而外第一個被事件迴圈模組呼叫的 frame"""
+    label = None
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.partition(".")[0] in _LOOP_MODULES:
+            if label is not None:
+                return label
+        else:
+            label = frame.f_code.co_qualname
+        frame = frame.f_back
+    return label or "unknown"
+
+
+class LoopMonitor:
+    """量測事件迴圈排程延遲並記錄阻塞事件迴圈的 task 與呼叫堆疊"""
+
+    def __init__(
+        self,
+        interval: float = 0.1,
+        stall_threshold: float = 0.1,
+        window: int = 3000,
+        max_events: int = 100,
+    ):
+        """
+        Args:
+            interval: 量測間隔秒數
+            stall_threshold: 迴圈超過此秒數未醒來時視為阻塞並記錄堆疊
+            window: 保留最近幾筆延遲量測 (預設 3000 筆，約 5 分鐘)
+            max_events: 保留最近幾筆阻塞記錄
+        """
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.stalls = 0
+        self._lags: deque = deque(maxlen=window)
+        self._events: deque = deque(maxlen=max_events)
+        self._stall_stacks: Counter = Counter()
+        # 看門狗在目前這次延遲期間取樣到的 (task 或 callback 名稱, 堆疊)
+        self._samples: List[Tuple[str, List[str]]] = []
+        # 保護 _samples 與 _last_tick，確保取樣只歸入取樣當下的那次延遲
+        self._lock = threading.Lock()
+        self._last_tick = time.monotonic()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        """在目前的事件迴圈啟動量測 task 與看門狗執行緒"""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_tick = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._run(), name="loop-monitor")
+        self._watchdog = threading.Thread(
+            target=self._watch, name="loop-watchdog", daemon=True
+        )
+        self._watchdog.start()
+        for quantile in (0.5, 0.95, 0.99):
+            LOOP_LAG_QUANTILE.labels(str(quantile)).set_function(
+                lambda quantile=quantile: percentile(sorted(self._lags), quantile)
+            )
+        logger.info(
+            f"事件迴圈延遲監控已啟動 (間隔 {self.interval * 1000:.0f} ms, "
+            f"阻塞門檻 {self.stall_threshold * 1000:.0f} ms)"
+        )
+
+    async def stop(self) -> None:
+        """停止量測"""
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._watchdog = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            with self._lock:
+                self._last_tick = time.monotonic()
+                samples, self._samples = self._samples, []
+            self._lags.append(lag)
+            LOOP_LAG.observe(lag)
+            if lag >= self.stall_threshold:
+                self._record_slow(lag, samples)
+
+    def _record_slow(self, lag: float, samples: List[Tuple[str, List[str]]]) -> None:
+        """記錄一次阻塞，歸因於取樣次數最多的 task 或 callback
+
+        Args:
+            lag: 排程延遲秒數
+            samples: 看門狗在這次延遲期間取樣到的 (名稱, 堆疊)
+        """
+        self.stalls += 1
+        callback, stack = "unknown", []
+        if samples:
+            callback = Counter(name for name, _ in samples).most_common(1)[0][0]
+            stack = next(sampled for name, sampled in samples if name == callback)
+            for _, sampled in samples:
+                self._stall_stacks[tuple(sampled)] += 1
+        SLOW_CALLBACKS.labels(callback).inc()
+        self._events.append(
+            {
+                "time": time.time(),
+                "duration_ms": round(lag * 1000, 1),
+                "callback": callback,
+                "stack": stack,
+            }
+        )
+        frames = "\n".join(f"    {name}" for name in stack[-_LOG_FRAMES:])
+        logger.warning(
+            f"事件迴圈阻塞 {lag * 1000:.0f} ms: {callback}"
+            + (f"\n{frames}" if frames else "")
+        )
+
+    def _watch(self) -> None:
+        """迴圈延遲期間每隔一段時間取樣一次迴圈執行緒執行中的 task 與堆疊
+
+        延遲超過一個取樣週期就開始取樣，延遲達到阻塞門檻時至少已取樣數次，
+        不會因為看門狗晚一步醒來而漏掉較短的阻塞。
+        """
+        period = min(self.interval, self.stall_threshold) / 4
+        while not self._stop.wait(period):
+            last_tick = self._last_tick
+            if time.monotonic() - last_tick - self.interval < period:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            task = asyncio.current_task(self._loop)
+            name = task_label(task) if task is not None else callback_label(frame)
+            stack = format_stack(frame)
+            del frame
+            with self._lock:
+                # 取樣期間迴圈已醒來時，這筆取樣不屬於這次延遲
+                if self._last_tick == last_tick:
+                    self._samples.append((name, stack))
+
+    def stats(self) -> Dict[str, Any]:
+        """最近量測視窗的延遲統計 (毫秒)"""
+        lags = sorted(self._lags)
+        return {
+            "samples": len(lags),
+            "interval_ms": self.interval * 1000,
+            "mean_ms": statistics.fmean(lags) * 1000 if lags else 0.0,
+            "p50_ms": percentile(lags, 0.50) * 1000,
+            "p95_ms": percentile(lags, 0.95) * 1000,
+            "p99_ms": percentile(lags, 0.99) * 1000,
+            "max_ms": (lags[-1] if lags else 0.0) * 1000,
+            "stalls": self.stalls,
+            "stall_threshold_ms": self.stall_threshold * 1000,
+        }
+
+    def slow_callbacks(self) -> List[Dict[str, Any]]:
+        """最近的阻塞記錄 (時間、阻塞毫秒數、task 或 callback 名稱與堆疊)"""
+        return list(self._events)
+
+    def stall_stacks(self, reset: bool = False) -> str:
+        """阻塞期間取樣到的迴圈執行緒堆疊 (collapsed stack 格式)
+
+        Args:
+            reset: 輸出後是否清除已累積的堆疊
+        """
+        text = render_collapsed(self._stall_stacks)
+        if reset:
+            self._stall_stacks = Counter()
+        return text
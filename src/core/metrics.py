@@ -0,0 +1,351 @@
+"""
+輕量 Prometheus 指標模組
+
+提供 Counter、Gauge、Histogram 與統一的註冊表，並輸出 Prometheus text format，
+供 /metrics 端點使用。標籤組合在第一次使用時建立並快取，Histogram 的 bucket
+計數在建立時就配置好，之後的更新不再配置物件。
+"""
+
+import asyncio
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from src.core import tracing
+
+# 預設延遲 bucket (秒)，涵蓋毫秒級的卡片建立到數分鐘的 agent run
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+    300.0,
+)
+
+
+def _format_labels(labelnames: Sequence[str], labelvalues: Sequence[str]) -> str:
+    """將標籤轉為 Prometheus 格式字串，例如 {reason="timeout"}"""
+    if not labelnames:
+        return ""
+    pairs = []
+    for name, value in zip(labelnames, labelvalues):
+        escaped = (
+            str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        )
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class _Metric:
+    """指標基底類別，負責標籤子指標的建立與快取"""
+
+    metric_type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], "_Metric"] = {}
+
+    def labels(self, *labelvalues: str) -> "_Metric":
+        """取得指定標籤值的子指標 (同一組標籤只會建立一次)"""
+        if len(labelvalues) != len(self.labelnames):
+            raise ValueError(
+                f"指標 {self.name} 需要 {len(self.labelnames)} 個標籤值: {self.labelnames}"
+            )
+        key = tuple(str(value) for value in labelvalues)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._new_child()
+                    self._children[key] = child
+        return child
+
+    def _new_child(self) -> "_Metric":
+        return type(self)(self.name, self.documentation)
+
+    def _samples(self) -> List[Tuple[str, str, float]]:
+        """回傳 (名稱後綴, 標籤字串, 數值) 列表"""
+        raise NotImplementedError
+
+    def collect(self) -> List[str]:
+        """輸出此指標的 Prometheus text format 行"""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        if self.labelnames:
+            for key, child in list(self._children.items()):
+                label_str = _format_labels(self.labelnames, key)
+                for suffix, extra, value in child._samples():
+                    labels = label_str
+                    if extra:
+                        labels = (
+                            label_str[:-1] + "," + extra[1:] if label_str else extra
+                        )
+                    lines.append(f"{self.name}{suffix}{labels} {value}")
+        else:
+            for suffix, extra, value in self._samples():
+                lines.append(f"{self.name}{suffix}{extra} {value}")
+        return lines
+
+
+class Counter(_Metric):
+    """只增不減的計數器"""
+
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def _samples(self) -> List[Tuple[str, str, float]]:
+        return [("_total", "", self._value)]
+
+
+class Gauge(_Metric):
+    """可增可減的量測值，也可綁定函式在輸出時即時取值"""
+
+    metric_type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._value = 0.0
+        self._function: Optional[Callable[[], float]] = None
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value -= amount
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """設定輸出時呼叫的取值函式 (例如佇列長度)"""
+        self._function = function
+
+    @property
+    def value(self) -> float:
+        return self._function() if self._function is not None else self._value
+
+    def _samples(self) -> List[Tuple[str, str, float]]:
+        return [("", "", self.value)]
+
+
+class Histogram(_Metric):
+    """固定 bucket 的分布統計，bucket 計數於建立時預先配置"""
+
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 最後一格為 +Inf
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+
+    def _new_child(self) -> "Histogram":
+        return Histogram(self.name, self.documentation, buckets=self.buckets)
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def sum(self) -> float:
+        return self._sum
+
+    def _samples(self) -> List[Tuple[str, str, float]]:
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        samples = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            samples.append(("_bucket", f'{{le="{bound}"}}', cumulative))
+        samples.append(("_bucket", '{le="+Inf"}', count))
+        samples.append(("_sum", "", total))
+        samples.append(("_count", "", count))
+        return samples
+
+
+class MetricsRegistry:
+    """指標註冊表，同名指標只會註冊一次"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def render(self) -> str:
+        """輸出所有指標的 Prometheus text format"""
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+# 行程內共用的指標註冊表
+REGISTRY = MetricsRegistry()
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    """建立並註冊 Counter (同名時回傳既有指標)"""
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+    """建立並註冊 Gauge (同名時回傳既有指標)"""
+    return REGISTRY.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(
+    name: str,
+    documentation: str,
+    labelnames: Sequence[str] = (),
+    buckets: Sequence[float] = DEFAULT_BUCKETS,
+) -> Histogram:
+    """建立並註冊 Histogram (同名時回傳既有指標)"""
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+STAGE_DURATION = histogram(
+    "turn_stage_duration_seconds",
+    "回合處理各階段耗時 (秒)",
+    labelnames=("component", "stage"),
+)
+STAGE_IN_FLIGHT = gauge(
+    "turn_stage_in_flight", "執行中的回合處理階段數", labelnames=("component", "stage")
+)
+STAGE_ERRORS = counter(
+    "turn_stage_errors", "回合處理階段失敗次數", labelnames=("component", "stage")
+)
+
+
+class StageTimer:
+    """回合處理階段的耗時、執行中數量與錯誤次數
+
+    建立時即取得 (component, stage) 對應的子指標，量測時不再查找或建立標籤。
+    啟用追蹤時每次量測同時建立名為 component.stage 的 span。
+    可作為 context manager (timer.track()) 或同步 / 非同步函式的 decorator 使用。
+    """
+
+    __slots__ = (
+        "component",
+        "stage",
+        "span_name",
+        "span_kind",
+        "duration",
+        "in_flight",
+        "errors",
+    )
+
+    def __init__(self, component: str, stage: str, kind: str = "internal"):
+        """
+        Args:
+            component: 元件名稱，例如 foundry_bot、genie_manager
+            stage: 階段名稱，例如 agent_run、statement_fetch
+            kind: span 類型，呼叫外部服務的階段使用 client
+        """
+        self.component = component
+        self.stage = stage
+        self.span_name = f"{component}.{stage}"
+        self.span_kind = kind
+        self.duration = STAGE_DURATION.labels(component, stage)
+        self.in_flight = STAGE_IN_FLIGHT.labels(component, stage)
+        self.errors = STAGE_ERRORS.labels(component, stage)
+
+    def record_error(self, message: str = "") -> None:
+        """記錄一次失敗 (用於例外已在階段內處理的情況)"""
+        self.errors.inc()
+        span = tracing.current_span()
+        if span is not None and span.name == self.span_name:
+            span.status_code = tracing.STATUS_ERROR
+            span.status_message = message
+
+    @contextmanager
+    def track(self) -> Iterator[None]:
+        """量測 with 區塊的耗時，區塊拋出例外時計入錯誤次數"""
+        self.in_flight.inc()
+        started = time.perf_counter()
+        try:
+            with tracing.start_span(self.span_name, self.span_kind):
+                yield
+        except Exception:
+            self.errors.inc()
+            raise
+        finally:
+            self.duration.observe(time.perf_counter() - started)
+            self.in_flight.dec()
+
+    def __call__(self, func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with self.track():
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.track():
+                return func(*args, **kwargs)
+
+        return wrapper
+
+
+def stage_timer(component: str, stage: str, kind: str = "internal") -> StageTimer:
+    """建立回合處理階段的量測器 (通常於模組層級建立)"""
+    return StageTimer(component, stage, kind)
@@ -0,0 +1,185 @@
+"""
+大型內容的日誌記錄
+
+Agent 回應、卡片資料與 Genie 附件可能包含數千列資料，直接以 f-string 記錄會在
+每個回合產生大量字串格式化與寫檔。log_payload 只在日誌層級啟用且通過取樣時，
+才產生有上限的摘要 (型別、元素數、字元數與截斷的預覽)；完整內容只在 DEBUG 輸出。
+"""
+
+import logging
+import reprlib
+import threading
+from typing import Any, Dict, Optional
+
+# 計算大小時最多走訪的節點數，避免摘要本身變成 O(n) 的成本
+_MAX_WALK_NODES = 1000
+
+_default_rate = 1.0
+_rates: Dict[str, float] = {}
+_credits: Dict[str, float] = {}
+_credits_lock = threading.Lock()
+_preview_chars = 200
+
+
+def configure(
+    default_rate: float = 1.0,
+    rates: Optional[Dict[str, float]] = None,
+    preview_chars: int = 200,
+) -> None:
+    """設定取樣率與預覽長度
+
+    Args:
+        default_rate: 未個別設定的 logger 使用的取樣率 (1 表示每次都記錄)
+        rates: 各 logger 的取樣率，以最長的名稱前綴比對
+        preview_chars: 摘要中預覽文字的最大字元數
+    """
+    global _default_rate, _rates, _preview_chars
+    _default_rate = min(1.0, max(0.0, default_rate))
+    _rates = {name: min(1.0, max(0.0, rate)) for name, rate in (rates or {}).items()}
+    _preview_chars = preview_chars
+    with _credits_lock:
+        _credits.clear()
+
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    """解析各 logger 取樣率設定字串
+
+    Args:
+        value: 格式為 "src.utils.card_builder:0.1,src.bot:0" 的字串 (0 表示不記錄摘要)
+
+    Returns:
+        logger 名稱對應取樣率的字典
+
+    Raises:
+        ValueError: 取樣率不在 0 ~ 1 之間時
+    """
+    rates = {}
+    for pair in (value or "").split(","):
+        if ":" not in pair:
+            continue
+        name, rate = pair.rsplit(":", 1)
+        name, rate = name.strip(), float(rate)
+        if not 0.0 <= rate <= 1.0:
+            raise ValueError(f"logger {name} 的取樣率必須介於 0 與 1: {rate}")
+        rates[name] = rate
+    return rates
+
+
+def _rate_for(name: str) -> float:
+    """依 logger 名稱取得取樣率 (例如 src.bot 的設定也套用到 src.bot.genie_bot)"""
+    while name:
+        rate = _rates.get(name)
+        if rate is not None:
+            return rate
+        name = name.rpartition(".")[0]
+    return _default_rate
+
+
+def _should_sample(name: str) -> bool:
+    """以累積額度決定是否記錄，取樣率 0.1 代表每 10 次記錄 1 次 (第一次一定記錄)"""
+    rate = _rate_for(name)
+    if rate >= 1.0:
+        return True
+    if rate <= 0.0:
+        return False
+    with _credits_lock:
+        credit = _credits.get(name, 1.0)
+        if credit >= 1.0:
+            _credits[name] = credit - 1.0 + rate
+            return True
+        _credits[name] = credit + rate
+        return False
+
+
+class _PreviewRepr(reprlib.Repr):
+    """有長度上限的 repr，SDK 物件以欄位展開而非呼叫完整 repr"""
+
+    def __init__(self, max_chars: int):
+        super().__init__()
+        self.maxlevel = 3
+        self.maxdict = 6
+        self.maxlist = 4
+        self.maxtuple = 4
+        self.maxstring = max_chars
+        self.maxother = max_chars
+
+    def repr_instance(self, x: Any, level: int) -> str:
+        fields = getattr(x, "__dict__", None)
+        if not fields:
+            return super().repr_instance(x, level)
+        if level <= 0:
+            return f"{type(x).__name__}(...)"
+        items = [
+            f"{key}={self.repr1(value, level - 1)}"
+            for key, value in list(fields.items())[: self.maxdict]
+            if value is not None
+        ]
+        if len(fields) > self.maxdict:
+            items.append("...")
+        return f"{type(x).__name__}({', '.join(items)})"
+
+
+def _measure(payload: Any) -> Dict[str, int]:
+    """走訪內容計算節點數與字串總長度 (最多走訪 _MAX_WALK_NODES 個節點)"""
+    nodes = chars = 0
+    stack = [payload]
+    while stack and nodes < _MAX_WALK_NODES:
+        value = stack.pop()
+        nodes += 1
+        if isinstance(value, (str, bytes)):
+            chars += len(value)
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple, set)):
+            stack.extend(value)
+        elif hasattr(value, "__dict__"):
+            stack.extend(v for v in vars(value).values() if v is not None)
+    return {"nodes": nodes, "chars": chars, "truncated": bool(stack)}
+
+
+class PayloadSummary:
+    """延遲產生的內容摘要，只有在日誌真的輸出時才會計算"""
+
+    __slots__ = ("payload", "preview_chars")
+
+    def __init__(self, payload: Any, preview_chars: int):
+        self.payload = payload
+        self.preview_chars = preview_chars
+
+    def __str__(self) -> str:
+        payload = self.payload
+        parts = [f"type={type(payload).__name__}"]
+        if isinstance(payload, (str, bytes)):
+            parts.append(f"chars={len(payload)}")
+        else:
+            if hasattr(payload, "__len__"):
+                parts.append(f"items={len(payload)}")
+            size = _measure(payload)
+            more = "+" if size["truncated"] else ""
+            parts.append(
+                f"nodes={size['nodes']}{more} text_chars={size['chars']}{more}"
+            )
+        parts.append(f"preview={_PreviewRepr(self.preview_chars).repr(payload)}")
+        return " ".join(parts)
+
+
+def log_payload(
+    logger: logging.Logger,
+    label: str,
+    payload: Any,
+    level: int = logging.INFO,
+) -> None:
+    """記錄大型內容：DEBUG 時輸出完整內容，否則依取樣率輸出摘要
+
+    Args:
+        logger: 使用的 logger
+        label: 日誌說明文字，例如 "助理回應"
+        payload: 要記錄的內容 (字串、dict、list 或 SDK 物件)
+        level: 摘要使用的日誌層級
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("%s (完整內容): %s", label, payload)
+        return
+    if not logger.isEnabledFor(level) or not _should_sample(logger.name):
+        return
+    logger.log(level, "%s: %s", label, PayloadSummary(payload, _preview_chars))
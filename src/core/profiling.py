@@ -0,0 +1,312 @@
+"""
+線上剖析模組
+
+在不重啟 worker 的情況下收集 CPU 取樣與記憶體配置差異，輸出 collapsed stack
+格式 (每行 "frame;frame;frame 數值")，可直接交給 flamegraph.pl、speedscope 或
+inferno 產生火焰圖。
+
+- SamplingProfiler: 背景執行緒定期以 sys._current_frames() 取樣所有執行緒的
+  呼叫堆疊，涵蓋事件迴圈與 run_in_executor 的執行緒池；事件迴圈執行緒的堆疊
+  會加上目前執行中的 asyncio task 名稱
+- MemorySnapshots: 以 tracemalloc 快照比較兩個時間點之間新增的記憶體配置
+"""
+
+import asyncio
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from types import FrameType
+from typing import Dict, List, Optional, Tuple
+
+from src.core.logger_config import get_logger
+
+logger = get_logger(__name__)
+
+# 執行緒停在這些函式時視為閒置 (等待工作或 I/O 事件)，預設不列入 CPU 取樣
+_IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+    ("handlers.py", "dequeue"),
+    # uvloop 的事件迴圈以 C 實作，閒置時最內層的 Python frame 即為 Runner.run
+    ("runners.py", "run"),
+}
+
+# 取樣間隔下限：取樣執行緒呼叫 sys._current_frames() 時持有 GIL，間隔過短會拖慢 worker
+MIN_INTERVAL = 0.001
+
+_path_cache: Dict[str, str] = {}
+
+
+def short_path(filename: str) -> str:
+    """去除 sys.path 前綴的檔案路徑 (例如 src/bot/foundry_bot.py、asyncio/events.py)"""
+    cached = _path_cache.get(filename)
+    if cached is not None:
+        return cached
+    shortened = filename
+    # 最長前綴優先 (虛擬環境的 site-packages 通常位於專案目錄之下)
+    for prefix in sorted((p for p in sys.path if p), key=len, reverse=True):
+        if filename.startswith(prefix + os.sep):
+            shortened = filename[len(prefix) + 1 :]
+            break
+    _path_cache[filename] = shortened
+    return shortened
+
+
+def format_stack(frame: Optional[FrameType], limit: int = 128) -> List[str]:
+    """將 frame 轉為由外而內的 frame 名稱清單
+
+    Args:
+        frame: 最內層的 frame
+        limit: 最多保留的層數 (保留最內層)
+
+    Returns:
+        例如 ["run (asyncio/runners.py)", ..., "on_turn (src/bot/foundry_bot.py)"]
+    """
+    names = []
+    while frame is not None and len(names) < limit:
+        code = frame.f_code
+        names.append(f"{code.co_qualname} ({short_path(code.co_filename)})")
+        frame = frame.f_back
+    names.reverse()
+    return names
+
+
+def render_collapsed(stacks: Counter) -> str:
+    """將 {stack tuple: 數值} 輸出為 collapsed stack 文字 (數值由大到小)"""
+    return "".join(
+        f"{';'.join(name.replace(';', ':') for name in stack)} {int(value)}\n"
+        for stack, value in stacks.most_common()
+        if value > 0
+    )
+
+
+def _thread_label(thread: Optional[threading.Thread], ident: int) -> str:
+    if thread is None:
+        return f"thread-{ident}"
+    # 同一個執行緒池的執行緒合併 (default-executor_3 -> default-executor)
+    return re.sub(r"_\d+$", "", thread.name)
+
+
+def task_label(task: asyncio.Task) -> str:
+    """task 的顯示名稱 (未命名的 Task-123 改用 coroutine 名稱，同類請求才會合併)"""
+    name = task.get_name()
+    if re.fullmatch(r"Task-\d+", name):
+        coro = task.get_coro()
+        return getattr(coro, "__qualname__", name)
+    return name
+
+
+def _is_idle(frame: FrameType) -> bool:
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in _IDLE_FRAMES
+
+
+class SamplingProfiler:
+    """以固定間隔取樣所有執行緒呼叫堆疊的剖析器"""
+
+    def __init__(self):
+        self.interval = 0.01
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self.duration = 0.0
+        self._stacks: Counter = Counter()
+        self._include_idle = False
+        self._max_seconds = 300.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(
+        self,
+        interval: float = 0.01,
+        max_seconds: float = 300.0,
+        include_idle: bool = False,
+    ) -> bool:
+        """開始取樣 (需在事件迴圈中呼叫，才能辨識迴圈執行緒與目前的 task)
+
+        Args:
+            interval: 取樣間隔秒數
+            max_seconds: 最長取樣秒數，忘記停止時自動結束取樣
+            include_idle: 是否包含閒置中的執行緒 (等待工作或 I/O)
+
+        Returns:
+            已在取樣中時回傳 False
+
+        Raises:
+            ValueError: 取樣間隔小於 MIN_INTERVAL 或 max_seconds 不是正數時
+        """
+        if not interval >= MIN_INTERVAL:  # 也排除 NaN
+            raise ValueError(f"取樣間隔不可小於 {MIN_INTERVAL * 1000:g} ms")
+        if not max_seconds > 0:
+            raise ValueError("最長取樣秒數必須大於 0")
+        with self._lock:
+            if self._thread is not None:
+                return False
+            self.interval = interval
+            self.samples = 0
+            self.duration = 0.0
+            self.started_at = time.time()
+            self._stacks = Counter()
+            self._include_idle = include_idle
+            self._max_seconds = max_seconds
+            self._loop = asyncio.get_running_loop()
+            self._loop_thread_id = threading.get_ident()
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="sampling-profiler", daemon=True
+            )
+            self._thread.start()
+        logger.info(f"CPU 取樣開始 (間隔 {interval * 1000:.1f} ms)")
+        return True
+
+    def stop(self) -> Optional[str]:
+        """停止取樣並回傳 collapsed stack 文字 (未在取樣中時回傳 None)"""
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return None
+            self._stop.set()
+            thread.join()
+            self._thread = None
+        logger.info(f"CPU 取樣結束: {self.samples} 個樣本, {self.duration:.1f} 秒")
+        return render_collapsed(self._stacks)
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        started = time.monotonic()
+        while not self._stop.wait(self.interval):
+            self._sample(own_id)
+            self.samples += 1
+            self.duration = time.monotonic() - started
+            if self.duration >= self._max_seconds:
+                logger.warning(f"CPU 取樣已達 {self._max_seconds:.0f} 秒上限，停止取樣")
+                break
+
+    def _sample(self, own_id: int) -> None:
+        threads = {thread.ident: thread for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own_id:
+                continue
+            if not self._include_idle and _is_idle(frame):
+                continue
+            stack = [_thread_label(threads.get(ident), ident)]
+            if ident == self._loop_thread_id:
+                task = asyncio.current_task(self._loop)
+                if task is not None:
+                    stack.append(f"task {task_label(task)}")
+            stack.extend(format_stack(frame))
+            self._stacks[tuple(stack)] += 1
+
+
+class MemorySnapshots:
+    """以 tracemalloc 快照比較兩個時間點之間的記憶體配置差異"""
+
+    # 排除 tracemalloc、剖析器本身與匯入機制的配置
+    _FILTERS = [
+        tracemalloc.Filter(False, tracemalloc.__file__, all_frames=True),
+        tracemalloc.Filter(False, __file__, all_frames=True),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ]
+
+    def __init__(self):
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._baseline_at: Optional[float] = None
+
+    @property
+    def tracing(self) -> bool:
+        return self._baseline is not None
+
+    def _take(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(self._FILTERS)
+
+    def start(self, frames: int = 25) -> None:
+        """開始追蹤配置並以目前狀態作為比較基準
+
+        追蹤期間每次配置都需記錄呼叫堆疊，會增加 CPU 與記憶體用量，
+        診斷完畢請呼叫 stop()。
+
+        Args:
+            frames: 每筆配置記錄的堆疊層數
+
+        Raises:
+            ValueError: frames 小於 1 時
+        """
+        if frames < 1:
+            raise ValueError("堆疊層數必須大於 0")
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self._baseline = self._take()
+        self._baseline_at = time.time()
+        logger.info(f"記憶體配置追蹤開始 (堆疊 {frames} 層)")
+
+    def diff(self, reset: bool = True) -> Tuple[List[tracemalloc.StatisticDiff], float]:
+        """與基準快照比較
+
+        Args:
+            reset: 比較後是否以本次快照作為下一次比較的基準
+
+        Returns:
+            (依配置堆疊分組、依增加量排序的差異, 距離基準的秒數)
+
+        Raises:
+            RuntimeError: 尚未呼叫 start() 時
+        """
+        if self._baseline is None:
+            raise RuntimeError("記憶體配置追蹤尚未開始")
+        snapshot = self._take()
+        stats = snapshot.compare_to(self._baseline, "traceback")
+        elapsed = time.time() - self._baseline_at
+        if reset:
+            self._baseline = snapshot
+            self._baseline_at = time.time()
+        return stats, elapsed
+
+    @staticmethod
+    def render_collapsed(stats: List[tracemalloc.StatisticDiff]) -> str:
+        """以增加的位元組數為權重輸出 collapsed stack (只包含增加的配置)"""
+        stacks: Counter = Counter()
+        for stat in stats:
+            if stat.size_diff <= 0:
+                continue
+            stack = tuple(
+                f"{short_path(frame.filename)}:{frame.lineno}"
+                for frame in stat.traceback
+            )
+            stacks[stack] += stat.size_diff
+        return render_collapsed(stacks)
+
+    @staticmethod
+    def render_top(stats: List[tracemalloc.StatisticDiff], limit: int = 30) -> str:
+        """輸出增加量最大的配置位置 (每筆顯示最內層的程式碼行)"""
+        lines = []
+        for stat in stats[:limit]:
+            frame = stat.traceback[-1]
+            lines.append(
+                f"{stat.size_diff / 1024:+10.1f} KiB {stat.count_diff:+8d} blocks  "
+                f"{short_path(frame.filename)}:{frame.lineno}"
+            )
+        total = sum(stat.size_diff for stat in stats)
+        lines.append(f"合計 {total / 1024:+.1f} KiB")
+        return "\n".join(lines) + "\n"
+
+    def stop(self) -> None:
+        """停止追蹤並釋放快照"""
+        self._baseline = None
+        self._baseline_at = None
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        logger.info("記憶體配置追蹤結束")
@@ -5,10 +5,29 @@ Settings Module
 """
 
 import os
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from dotenv import load_dotenv
 from fastapi import FastAPI
 
+from src.core.fair_queue import parse_weights
+from src.core.payload_log import parse_sample_rates
+
+
+def _get_env(name: str, required: bool) -> Optional[str]:
+    """讀取環境變數
+
+    Args:
+        name: 環境變數名稱
+        required: 是否為目前模式的必要設定
+
+    Raises:
+        ValueError: 必要的環境變數未設定時
+    """
+    value = os.getenv(name)
+    if required and not value:
+        raise ValueError(f"缺少必要的環境變數: {name}")
+    return value
+
 
 class Settings:
     """
@@ -65,6 +84,57 @@ class Settings:
             "host": os.getenv("HOST", "0.0.0.0"),
             "release_version": os.getenv("APP_RELEASE_VERSION", "1.0.0"),
             "bot_mode": os.getenv("BOT_MODE", "foundry"),
+            # 合併同一使用者連續訊息的等待秒數 (0 表示不額外等待)
+            "turn_coalesce_window": float(os.getenv("TURN_COALESCE_WINDOW") or "0"),
+            # 回合處理期間送出打字指示器的間隔秒數
+            "typing_interval": float(os.getenv("TYPING_INTERVAL") or "3"),
+            # 快速回應模式：驗證後立即回傳 202，回合交由背景 worker 處理並主動回覆
+            "fast_ack": os.getenv("APP_FAST_ACK", "false").lower() == "true",
+            "turn_workers": int(os.getenv("TURN_WORKERS") or "8"),
+            "turn_queue_size": int(os.getenv("TURN_QUEUE_SIZE") or "100"),
+            # 准入控制：每個 worker / 每位使用者的回合上限、等待佇列上限與等待秒數
+            "admission_max_in_flight": int(
+                os.getenv("ADMISSION_MAX_IN_FLIGHT") or "16"
+            ),
+            "admission_max_per_user": int(os.getenv("ADMISSION_MAX_PER_USER") or "3"),
+            "admission_max_queue": int(os.getenv("ADMISSION_MAX_QUEUE") or "50"),
+            "admission_queue_timeout": float(
+                os.getenv("ADMISSION_QUEUE_TIMEOUT") or "30"
+            ),
+            # 公平排程：分組方式 (user, tenant, conversation) 與各分組權重
+            "fair_key": os.getenv("FAIR_SCHEDULING_KEY") or "user",
+            "fair_weights": parse_weights(os.getenv("FAIR_SCHEDULING_WEIGHTS", "")),
+            # 重複投遞抑制：記錄保留秒數與本機記錄上限
+            "dedup_ttl": float(os.getenv("DEDUP_TTL") or "600"),
+            "dedup_max_entries": int(os.getenv("DEDUP_MAX_ENTRIES") or "100000"),
+            # Bot Connector 連線池：保留連線池的主機數與每個主機的 keep-alive 連線上限
+            "connector_pool_connections": int(
+                os.getenv("CONNECTOR_POOL_CONNECTIONS") or "10"
+            ),
+            "connector_pool_maxsize": int(os.getenv("CONNECTOR_POOL_MAXSIZE") or "32"),
+            # 預設執行緒池大小 (run_in_executor 使用) 與啟動預熱的逾時秒數
+            "executor_workers": int(
+                os.getenv("EXECUTOR_WORKERS") or str(min(32, (os.cpu_count() or 1) + 4))
+            ),
+            "warmup_timeout": float(os.getenv("WARMUP_TIMEOUT") or "60"),
+            # 分散式追蹤：OTLP/HTTP Collector 位址 (空白表示停用) 與服務名稱
+            "otlp_endpoint": os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", ""),
+            "service_name": os.getenv("OTEL_SERVICE_NAME") or "genie-bot",
+            # 大型內容日誌：預設取樣率、各 logger 取樣率與摘要預覽字元數
+            "log_payload_sample_rate": float(
+                os.getenv("LOG_PAYLOAD_SAMPLE_RATE") or "1"
+            ),
+            "log_payload_sample_rates": parse_sample_rates(
+                os.getenv("LOG_PAYLOAD_SAMPLE_RATES", "")
+            ),
+            "log_payload_preview_chars": int(
+                os.getenv("LOG_PAYLOAD_PREVIEW_CHARS") or "200"
+            ),
+            # 管理端點 (/admin) 的驗證 token，空白表示停用管理端點
+            "admin_token": os.getenv("ADMIN_TOKEN", ""),
+            # 事件迴圈延遲監控：量測間隔秒數與視為阻塞並取樣堆疊的秒數
+            "loop_monitor_interval": float(os.getenv("LOOP_MONITOR_INTERVAL") or "0.1"),
+            "loop_stall_threshold": float(os.getenv("LOOP_STALL_THRESHOLD") or "0.1"),
         }
 
         # Microsoft Bot Framework 配置
@@ -83,14 +153,13 @@ class Settings:
                 "app_tenantid": os.getenv("AZURE_TENANT_ID", ""),
             }
 
-        # Azure AI Foundry 配置
-        project_endpoint = os.getenv("AZURE_FOUNDRY_PROJECT_ENDPOINT")
-        agent_id = os.getenv("AZURE_AI_AGENT_ID")
+        # 只檢查目前 BOT_MODE 需要的環境變數
+        is_foundry = self.app["bot_mode"] == "foundry"
+        is_genie = self.app["bot_mode"] == "genie"
 
-        if not project_endpoint:
-            raise ValueError("缺少必要的環境變數: AZURE_FOUNDRY_PROJECT_ENDPOINT")
-        if not agent_id:
-            raise ValueError("缺少必要的環境變數: AZURE_AI_AGENT_ID")
+        # Azure AI Foundry 配置
+        project_endpoint = _get_env("AZURE_FOUNDRY_PROJECT_ENDPOINT", is_foundry)
+        agent_id = _get_env("AZURE_AI_AGENT_ID", is_foundry)
 
         self.azure_foundry = {
             "project_endpoint": project_endpoint,
@@ -99,28 +168,46 @@ class Settings:
                 name.strip()
                 for name in os.getenv("AZURE_FOUNDRY_CONNECTION_NAMES", "").split(",")
             ],
+            # 輪詢 run 狀態的間隔秒數
+            "run_polling_interval": float(
+                os.getenv("AZURE_AI_AGENT_POLLING_INTERVAL") or "1"
+            ),
+            # 平行執行工具呼叫的執行緒數量上限
+            "tool_max_workers": int(os.getenv("AZURE_AI_AGENT_TOOL_WORKERS") or "8"),
+            # 回合用量記錄：SQLite 檔案路徑 (off 表示只輸出指標) 與每 1000 token 單價
+            "turn_telemetry_path": os.getenv("TURN_TELEMETRY_PATH")
+            or "logs/turn_telemetry.db",
+            "prompt_token_price": float(
+                os.getenv("AZURE_AI_AGENT_PROMPT_TOKEN_PRICE") or "0"
+            ),
+            "completion_token_price": float(
+                os.getenv("AZURE_AI_AGENT_COMPLETION_TOKEN_PRICE") or "0"
+            ),
         }
 
-        # Databricks 配置
-        entra_id_scope = os.getenv("DATABRICKS_ENTRA_ID_AUDIENCE_SCOPE")
-        databricks_host = os.getenv("DATABRICKS_HOST")
-        databricks_token = os.getenv("DATABRICKS_TOKEN")
-        genie_space_id = os.getenv("DATABRICKS_SPACE_ID")
-
-        if not entra_id_scope:
-            raise ValueError("缺少必要的環境變數: DATABRICKS_ENTRA_ID_AUDIENCE_SCOPE")
-        if not databricks_host:
-            raise ValueError("缺少必要的環境變數: DATABRICKS_HOST")
-        if not databricks_token:
-            raise ValueError("缺少必要的環境變數: DATABRICKS_TOKEN")
-        if not genie_space_id:
-            raise ValueError("缺少必要的環境變數: DATABRICKS_SPACE_ID")
+        # Databricks 配置 (Foundry 模式透過 Entra ID scope 存取 Genie，Genie 模式使用 token)
+        entra_id_scope = _get_env("DATABRICKS_ENTRA_ID_AUDIENCE_SCOPE", is_foundry)
+        databricks_host = _get_env("DATABRICKS_HOST", is_genie)
+        databricks_token = _get_env("DATABRICKS_TOKEN", is_genie)
+        genie_space_id = _get_env("DATABRICKS_SPACE_ID", is_genie)
 
         self.databricks = {
             "entra_id_audience_scope": entra_id_scope,
             "host": databricks_host,
             "token": databricks_token,
             "genie_space_id": genie_space_id,
+            # 每個 Genie space 同時執行的查詢上限
+            "genie_max_concurrency_per_space": int(
+                os.getenv("GENIE_MAX_CONCURRENCY_PER_SPACE") or "2"
+            ),
+            # ask_genies 平行查詢的整體等待秒數
+            "genie_fanout_timeout": float(os.getenv("GENIE_FANOUT_TIMEOUT") or "120"),
+            # 等待 Genie space 執行名額的最長秒數
+            "genie_space_wait_timeout": float(
+                os.getenv("GENIE_SPACE_WAIT_TIMEOUT") or "60"
+            ),
+            # 啟動時等待 Genie 連線初始化的秒數，未就緒的連線改為背景重試與延遲初始化
+            "genie_startup_timeout": float(os.getenv("GENIE_STARTUP_TIMEOUT") or "10"),
         }
 
     def set_config(self, category: str, key: str, value: Any) -> None:
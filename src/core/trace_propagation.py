@@ -0,0 +1,55 @@
+"""
+追蹤內容傳遞模組
+
+將目前 span 的 W3C traceparent 帶入送往下游服務的請求，讓 Azure AI Foundry 與
+Databricks 端的紀錄能對應回同一條 trace。Bot Connector 的請求由 connector_pool
+的 msrest pipeline 處理。
+"""
+
+from typing import Dict
+
+from azure.core.pipeline.policies import SansIOHTTPPolicy
+from databricks.sdk.config import Config
+from databricks.sdk.credentials_provider import CredentialsProvider, CredentialsStrategy
+
+from src.core import tracing
+
+
+class TraceparentPolicy(SansIOHTTPPolicy):
+    """azure-core pipeline policy：在每個請求加上 traceparent 標頭
+
+    以 per_call_policies 傳給 AIProjectClient，其建立的 AgentsClient 也會沿用。
+    """
+
+    def on_request(self, request) -> None:
+        tracing.inject_traceparent(request.http_request.headers)
+
+
+class TraceparentCredentialsStrategy(CredentialsStrategy):
+    """包裝 Databricks credentials strategy，在驗證標頭之外加上 traceparent
+
+    databricks-sdk 每次送出請求都會呼叫 header_factory，因此標頭會跟著呼叫端
+    執行緒的 span (經由 ContextThreadPoolExecutor 延續)。
+    """
+
+    def __init__(self, inner: CredentialsStrategy):
+        """
+        Args:
+            inner: 實際提供驗證標頭的 credentials strategy
+        """
+        self._inner = inner
+
+    def auth_type(self) -> str:
+        return self._inner.auth_type()
+
+    def __call__(self, cfg: Config) -> CredentialsProvider:
+        inner_factory = self._inner(cfg)
+        if not inner_factory:
+            return inner_factory
+
+        def header_factory() -> Dict[str, str]:
+            headers = dict(inner_factory())
+            tracing.inject_traceparent(headers)
+            return headers
+
+        return header_factory
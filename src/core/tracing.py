@@ -0,0 +1,367 @@
+"""
+輕量分散式追蹤模組
+
+每個 activity 建立一條 trace，span 以 contextvars 傳遞，經由
+ContextThreadPoolExecutor 延續到 run_in_executor 與工具呼叫的執行緒。
+結束的 span 由背景執行緒批次以 OTLP/JSON (POST {endpoint}/v1/traces)
+送往 OpenTelemetry Collector；未設定 endpoint 時不建立 span，額外成本可忽略。
+"""
+
+import asyncio
+import contextvars
+import json
+import os
+import threading
+import time
+import urllib.request
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, MutableMapping, Optional, Tuple
+
+from src.core import metrics
+from src.core.logger_config import get_logger
+
+logger = get_logger(__name__)
+
+# OTLP SpanKind 與 StatusCode
+SPAN_KINDS = {"internal": 1, "server": 2, "client": 3, "producer": 4, "consumer": 5}
+STATUS_UNSET, STATUS_OK, STATUS_ERROR = 0, 1, 2
+
+# 取消與產生器關閉屬於正常的結束方式，不標記為錯誤
+_NON_ERROR_EXCEPTIONS = (asyncio.CancelledError, GeneratorExit)
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar(
+    "current_span", default=None
+)
+_exporter: Optional["OTLPJsonExporter"] = None
+
+
+class Span:
+    """單一追蹤區段"""
+
+    __slots__ = (
+        "trace_id",
+        "span_id",
+        "parent_span_id",
+        "name",
+        "kind",
+        "start_ns",
+        "end_ns",
+        "attributes",
+        "status_code",
+        "status_message",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_span_id: Optional[str] = None,
+        kind: str = "internal",
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_span_id = parent_span_id
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.status_code = STATUS_UNSET
+        self.status_message = ""
+
+    @property
+    def traceparent(self) -> str:
+        """W3C traceparent 標頭值，可傳給下游服務"""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_error(self, error: BaseException) -> None:
+        """標記為失敗並記錄例外類型與訊息"""
+        self.status_code = STATUS_ERROR
+        self.status_message = f"{type(error).__name__}: {error}"
+        self.attributes["exception.type"] = type(error).__name__
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """轉為 OTLP/JSON 的 span 物件 (trace / span ID 使用 hex 字串)"""
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": SPAN_KINDS.get(self.kind, 1),
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or time.time_ns()),
+            "attributes": _otlp_attributes(self.attributes),
+            "status": {"code": self.status_code},
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        if self.status_message:
+            span["status"]["message"] = self.status_message
+        return span
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        # OTLP/JSON 的 int64 以字串表示
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [
+        {"key": key, "value": _otlp_value(value)}
+        for key, value in attributes.items()
+        if value is not None
+    ]
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str]]:
+    """解析 W3C traceparent 標頭
+
+    Args:
+        header: 標頭值，例如 00-<32 hex trace id>-<16 hex span id>-01
+
+    Returns:
+        (trace_id, parent_span_id)，格式不正確時回傳 None
+    """
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    trace_id, span_id = parts[1].lower(), parts[2].lower()
+    try:
+        int(trace_id, 16), int(span_id, 16)
+    except ValueError:
+        return None
+    if trace_id == "0" * 32 or span_id == "0" * 16:
+        return None
+    return trace_id, span_id
+
+
+class OTLPJsonExporter:
+    """以背景執行緒批次送出 span 的 OTLP/HTTP JSON exporter"""
+
+    def __init__(
+        self,
+        endpoint: str,
+        service_name: str,
+        max_queue_size: int = 4096,
+        batch_size: int = 256,
+        interval: float = 2.0,
+        timeout: float = 5.0,
+    ):
+        """
+        Args:
+            endpoint: Collector 位址，例如 http://localhost:4318
+            service_name: resource 的 service.name
+            max_queue_size: 等待送出的 span 上限，超過時丟棄新的 span
+            batch_size: 每次 POST 的 span 數量上限
+            interval: 定期送出的間隔秒數
+            timeout: HTTP 請求逾時秒數
+        """
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.interval = interval
+        self.timeout = timeout
+        # metrics 的 StageTimer 會匯入此模組，指標於建立 exporter 時才註冊
+        self._exported = metrics.counter("trace_spans_exported", "已送出的追蹤 span 數")
+        self._dropped = metrics.counter(
+            "trace_spans_dropped", "未送出而丟棄的追蹤 span 數", labelnames=("reason",)
+        )
+        self._queue: Deque[Span] = deque()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="otlp-exporter", daemon=True
+        )
+        self._thread.start()
+
+    def export(self, span: Span) -> None:
+        """將結束的 span 放入佇列 (不阻塞呼叫端)"""
+        if len(self._queue) >= self.max_queue_size:
+            self._dropped.labels("queue_full").inc()
+            return
+        self._queue.append(span)
+        if len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+
+    def _take_batch(self) -> List[Span]:
+        batch = []
+        while self._queue and len(batch) < self.batch_size:
+            batch.append(self._queue.popleft())
+        return batch
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self) -> None:
+        """送出佇列中所有 span"""
+        while self._queue:
+            batch = self._take_batch()
+            try:
+                self._post(batch)
+                self._exported.inc(len(batch))
+            except Exception as e:
+                self._dropped.labels("export_failed").inc(len(batch))
+                logger.warning(f"送出追蹤資料失敗 ({len(batch)} 個 span): {e}")
+                return
+
+    def _post(self, spans: List[Span]) -> None:
+        payload = {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": _otlp_attributes(
+                            {"service.name": self.service_name}
+                        )
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": __name__},
+                            "spans": [span.to_otlp() for span in spans],
+                        }
+                    ],
+                }
+            ]
+        }
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps(payload, ensure_ascii=False).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+    def shutdown(self) -> None:
+        """停止背景執行緒並送出剩餘 span"""
+        self._stopped.set()
+        self._wakeup.set()
+        self._thread.join(self.timeout)
+        self.flush()
+
+
+def configure(endpoint: str, service_name: str) -> None:
+    """啟用追蹤 (endpoint 為空時維持停用)
+
+    Args:
+        endpoint: OTLP/HTTP Collector 位址
+        service_name: 服務名稱
+    """
+    global _exporter
+    if not endpoint:
+        return
+    _exporter = OTLPJsonExporter(endpoint, service_name)
+    logger.info(f"分散式追蹤已啟用，送往 {_exporter.url}")
+
+
+def shutdown() -> None:
+    """送出剩餘的 span 並停用追蹤"""
+    global _exporter
+    if _exporter is not None:
+        _exporter.shutdown()
+        _exporter = None
+
+
+def is_enabled() -> bool:
+    return _exporter is not None
+
+
+def current_span() -> Optional[Span]:
+    """取得目前 context 的 span (未啟用追蹤時為 None)"""
+    return _current_span.get()
+
+
+def inject_traceparent(headers: MutableMapping[str, str]) -> None:
+    """將目前 span 的 W3C traceparent 寫入送往下游的請求標頭 (沒有 span 時不變更)
+
+    Args:
+        headers: 請求標頭
+    """
+    span = _current_span.get()
+    if span is not None:
+        headers["traceparent"] = span.traceparent
+
+
+def set_attribute(key: str, value: Any) -> None:
+    """在目前的 span 加上屬性 (沒有 span 時忽略)"""
+    span = _current_span.get()
+    if span is not None:
+        span.set_attribute(key, value)
+
+
+@contextmanager
+def start_span(
+    name: str,
+    kind: str = "internal",
+    attributes: Optional[Dict[str, Any]] = None,
+    parent: Optional[Span] = None,
+    traceparent: Optional[str] = None,
+) -> Iterator[Optional[Span]]:
+    """建立 span 並設為目前 context 的 span
+
+    Args:
+        name: span 名稱
+        kind: internal、server 或 client
+        attributes: 初始屬性
+        parent: 明確指定的父 span (例如跨越背景佇列時)，預設為目前 context 的 span
+        traceparent: 上游傳入的 W3C traceparent，沒有父 span 時延續該 trace
+
+    Yields:
+        建立的 Span，未啟用追蹤時為 None
+    """
+    exporter = _exporter
+    if exporter is None:
+        yield None
+        return
+
+    parent = parent or _current_span.get()
+    if parent is not None:
+        trace_id, parent_span_id = parent.trace_id, parent.span_id
+    else:
+        trace_id, parent_span_id = parse_traceparent(traceparent) or (
+            os.urandom(16).hex(),
+            None,
+        )
+
+    span = Span(name, trace_id, parent_span_id, kind, attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except _NON_ERROR_EXCEPTIONS:
+        span.set_attribute("cancelled", True)
+        raise
+    except BaseException as e:
+        span.set_error(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        span.end_ns = time.time_ns()
+        exporter.export(span)
+
+
+class ContextThreadPoolExecutor(ThreadPoolExecutor):
+    """在提交工作時複製 contextvars 的 ThreadPoolExecutor
+
+    loop.run_in_executor 與 ThreadPoolExecutor.submit 不會帶入呼叫端的 context，
+    使用此執行緒池才能讓 SDK 執行緒中的 span 接在目前的 trace 之下。
+    """
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        context = contextvars.copy_context()
+        return super().submit(context.run, fn, *args, **kwargs)
@@ -0,0 +1,145 @@
+"""
+背景回合處理佇列
+
+webhook 收到訊息後只負責驗證與排入佇列，實際的 bot 回合由固定數量的
+背景 worker 處理，避免慢回合拖住 HTTP 回應造成 Bot Connector 逾時重送。
+等待中的回合依公平排程鍵以加權 Deficit Round Robin 取出，而非單純 FIFO。
+
+同一使用者的回合以 serial_key 序列化：已有回合在佇列或執行中時，後續回合先
+暫存而不佔用 worker，否則它會在 worker 中等待該使用者的回合鎖，整個前一回合
+期間多佔一個 worker。前一個回合結束後，暫存的回合合併為一個工作排回佇列，
+在同一個 worker 中同時交給 bot，由 TurnScheduler 合併訊息。
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from src.core.fair_queue import DeficitRoundRobin
+from src.core.logger_config import get_logger
+
+logger = get_logger(__name__)
+
+TurnJob = Callable[[], Awaitable[None]]
+# (serial_key, fair_key, job)
+_QueuedJob = Tuple[Optional[str], str, TurnJob]
+
+
+class TurnQueue:
+    """有上限、依分組公平取出的背景回合佇列"""
+
+    def __init__(
+        self,
+        workers: int = 8,
+        max_size: int = 100,
+        fair_weights: Optional[Dict[str, float]] = None,
+    ):
+        """
+        Args:
+            workers: 背景 worker 數量 (同時處理的回合上限)
+            max_size: 佇列可容納的等待回合數量
+            fair_weights: 公平排程鍵的權重，未列出者權重為 1
+        """
+        self.workers = workers
+        self.max_size = max_size
+        self._jobs: DeficitRoundRobin[_QueuedJob] = DeficitRoundRobin(
+            weights=fair_weights
+        )
+        # 已有回合在佇列或執行中的 serial_key，及其暫存的後續回合
+        self._active_keys: Set[str] = set()
+        self._parked: Dict[str, List[TurnJob]] = {}
+        # 計數可取出的回合數，worker 在此等待
+        self._available: Optional[asyncio.Semaphore] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        """啟動背景 worker - 應在應用啟動時調用"""
+        if self._tasks:
+            return
+        self._available = asyncio.Semaphore(0)
+        self._tasks = [
+            asyncio.create_task(self._worker(index)) for index in range(self.workers)
+        ]
+        logger.info(
+            f"背景回合佇列已啟動，worker 數量: {self.workers}，佇列上限: {self.max_size}"
+        )
+
+    async def stop(self) -> None:
+        """停止所有背景 worker"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("背景回合佇列已停止")
+
+    def qsize(self) -> int:
+        """目前等待中的回合數量 (含暫存的後續回合)"""
+        return len(self._jobs) + sum(len(jobs) for jobs in self._parked.values())
+
+    def submit(
+        self, job: TurnJob, fair_key: str = "", serial_key: Optional[str] = None
+    ) -> bool:
+        """將回合排入佇列
+
+        Args:
+            job: 執行回合的協程函式
+            fair_key: 公平排程鍵 (使用者、租戶或對話)
+            serial_key: 序列化鍵 (通常為使用者 ID)，同一鍵的回合不會同時佔用 worker；
+                None 表示不序列化 (例如需要立即處理的指令)
+
+        Returns:
+            bool: 是否成功排入 (佇列已滿或尚未啟動時回傳 False)
+        """
+        if self._available is None:
+            logger.warning("背景回合佇列尚未啟動")
+            return False
+        if self.qsize() >= self.max_size:
+            logger.warning(f"背景回合佇列已滿 ({self.max_size})，拒絕新的回合")
+            return False
+        if serial_key is not None:
+            if serial_key in self._active_keys:
+                self._parked.setdefault(serial_key, []).append(job)
+                logger.info(f"{serial_key} 已有回合在處理，後續回合暫存至前一回合結束")
+                return True
+            self._active_keys.add(serial_key)
+        self._push(serial_key, fair_key, job)
+        return True
+
+    def _push(self, serial_key: Optional[str], fair_key: str, job: TurnJob) -> None:
+        self._jobs.push(fair_key, (serial_key, fair_key, job))
+        self._available.release()
+
+    def _release_key(self, serial_key: str, fair_key: str) -> None:
+        """回合結束：將暫存的後續回合合併為一個工作排回佇列"""
+        jobs = self._parked.pop(serial_key, None)
+        if not jobs:
+            self._active_keys.discard(serial_key)
+            return
+        if len(jobs) == 1:
+            self._push(serial_key, fair_key, jobs[0])
+            return
+
+        async def run_together() -> None:
+            # 同時交給 bot，TurnScheduler 會依序執行並合併等待中的訊息
+            results = await asyncio.gather(
+                *(job() for job in jobs), return_exceptions=True
+            )
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.error(
+                        f"{serial_key} 的暫存回合執行錯誤: {result}", exc_info=result
+                    )
+
+        self._push(serial_key, fair_key, run_together)
+
+    async def _worker(self, index: int) -> None:
+        """背景 worker：依公平順序取出並執行回合"""
+        while True:
+            await self._available.acquire()
+            serial_key, fair_key, job = self._jobs.pop()
+            try:
+                await job()
+            except Exception as e:
+                logger.error(f"背景回合 worker {index} 執行錯誤: {e}", exc_info=True)
+            finally:
+                if serial_key is not None:
+                    self._release_key(serial_key, fair_key)
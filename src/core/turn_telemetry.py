@@ -0,0 +1,255 @@
+"""
+回合用量記錄模組
+
+記錄每個 agent 回合的 token 用量 (prompt / completion)、工具呼叫次數、工具輸出
+字元數、run 耗時與估算費用：依 agent 累計為 Prometheus 指標，並寫入本機 SQLite
+(turns 資料表) 供離線查詢容量與費用，例如:
+
+    sqlite3 logs/turn_telemetry.db \\
+        "SELECT user_id, COUNT(*), SUM(total_tokens) FROM turns GROUP BY user_id"
+
+寫入由背景執行緒批次處理，記錄回合時不會阻塞事件迴圈。
+"""
+
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from src.core.logger_config import get_logger
+from src.core.metrics import counter, histogram
+
+logger = get_logger(__name__)
+
+AGENT_TOKENS = counter(
+    "agent_tokens", "agent run 使用的 token 數", labelnames=("agent", "kind")
+)
+AGENT_TOOL_CALLS = counter(
+    "agent_tool_calls", "agent run 的工具呼叫次數", labelnames=("agent",)
+)
+AGENT_TOOL_OUTPUT_CHARS = counter(
+    "agent_tool_output_chars", "送回給 agent 的工具輸出字元數", labelnames=("agent",)
+)
+AGENT_COST = counter(
+    "agent_cost", "依設定單價估算的 agent run 費用", labelnames=("agent",)
+)
+# 執行緒越長每個回合的 prompt token 越多，以分布觀察成長
+AGENT_PROMPT_TOKENS = histogram(
+    "agent_run_prompt_tokens",
+    "每個 run 的 prompt token 數",
+    labelnames=("agent",),
+    buckets=(1000, 2000, 4000, 8000, 16000, 32000, 64000, 128000),
+)
+
+_COLUMNS = (
+    "ts",
+    "user_id",
+    "agent_id",
+    "thread_id",
+    "run_id",
+    "status",
+    "prompt_tokens",
+    "completion_tokens",
+    "total_tokens",
+    "tool_calls",
+    "tool_output_chars",
+    "run_seconds",
+    "cost",
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS turns (
+    ts REAL NOT NULL,
+    user_id TEXT,
+    agent_id TEXT,
+    thread_id TEXT,
+    run_id TEXT,
+    status TEXT,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    total_tokens INTEGER,
+    tool_calls INTEGER,
+    tool_output_chars INTEGER,
+    run_seconds REAL,
+    cost REAL
+);
+CREATE INDEX IF NOT EXISTS turns_ts ON turns (ts);
+CREATE INDEX IF NOT EXISTS turns_user_ts ON turns (user_id, ts);
+"""
+
+_STOP = object()
+
+
+class TurnTelemetry:
+    """記錄回合用量：更新指標並由背景執行緒批次寫入 SQLite"""
+
+    def __init__(
+        self,
+        path: str,
+        prompt_price: float = 0.0,
+        completion_price: float = 0.0,
+        batch_size: int = 100,
+    ):
+        """
+        Args:
+            path: SQLite 檔案路徑 (空字串或 off 表示只更新指標，不寫入檔案)
+            prompt_price: 每 1000 個 prompt token 的單價
+            completion_price: 每 1000 個 completion token 的單價
+            batch_size: 每次交易最多寫入的筆數
+        """
+        self.path = "" if path.lower() == "off" else path
+        self.prompt_price = prompt_price
+        self.completion_price = completion_price
+        self.batch_size = batch_size
+        self._queue: "queue.SimpleQueue[Any]" = queue.SimpleQueue()
+        self._writer: Optional[threading.Thread] = None
+        if self.path:
+            self._writer = threading.Thread(
+                target=self._write_loop, name="turn-telemetry", daemon=True
+            )
+            self._writer.start()
+            # 結束行程前寫入尚未處理的記錄
+            atexit.register(self.close)
+
+    def record(
+        self,
+        user_id: str,
+        agent_id: str,
+        thread_id: str,
+        run_id: str,
+        status: str,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        tool_calls: int = 0,
+        tool_output_chars: int = 0,
+        run_seconds: float = 0.0,
+    ) -> None:
+        """記錄一個回合 (不阻塞，寫入由背景執行緒處理)"""
+        cost = (
+            prompt_tokens * self.prompt_price
+            + completion_tokens * self.completion_price
+        ) / 1000
+
+        AGENT_TOKENS.labels(agent_id, "prompt").inc(prompt_tokens)
+        AGENT_TOKENS.labels(agent_id, "completion").inc(completion_tokens)
+        AGENT_TOOL_CALLS.labels(agent_id).inc(tool_calls)
+        AGENT_TOOL_OUTPUT_CHARS.labels(agent_id).inc(tool_output_chars)
+        AGENT_COST.labels(agent_id).inc(cost)
+        if prompt_tokens:
+            AGENT_PROMPT_TOKENS.labels(agent_id).observe(prompt_tokens)
+
+        # 資料庫無法開啟時背景執行緒已結束，不再累積記錄
+        if self._writer is not None and self._writer.is_alive():
+            self._queue.put(
+                (
+                    time.time(),
+                    user_id,
+                    agent_id,
+                    thread_id,
+                    run_id,
+                    status,
+                    prompt_tokens,
+                    completion_tokens,
+                    prompt_tokens + completion_tokens,
+                    tool_calls,
+                    tool_output_chars,
+                    round(run_seconds, 3),
+                    cost,
+                )
+            )
+
+    def close(self) -> None:
+        """寫入剩餘的記錄並停止背景執行緒"""
+        if self._writer is None:
+            return
+        self._queue.put(_STOP)
+        self._writer.join(timeout=10)
+        self._writer = None
+
+    def _connect(self) -> sqlite3.Connection:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(_SCHEMA)
+        return connection
+
+    def _write_loop(self) -> None:
+        try:
+            connection = self._connect()
+        except sqlite3.Error as e:
+            logger.error(f"無法開啟回合用量資料庫 {self.path}: {e}")
+            return
+        logger.info(f"回合用量記錄已啟用: {self.path}")
+
+        insert = (
+            f"INSERT INTO turns ({', '.join(_COLUMNS)}) "
+            f"VALUES ({', '.join('?' for _ in _COLUMNS)})"
+        )
+        stopping = False
+        while not stopping:
+            rows = [self._queue.get()]
+            # 一次交易寫入目前累積的所有記錄
+            while len(rows) < self.batch_size:
+                try:
+                    rows.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if _STOP in rows:
+                stopping = True
+                rows = [row for row in rows if row is not _STOP]
+            if not rows:
+                continue
+            try:
+                with connection:
+                    connection.executemany(insert, rows)
+            except sqlite3.Error as e:
+                logger.error(f"回合用量寫入失敗 ({len(rows)} 筆): {e}")
+        connection.close()
+
+
+def summarize(
+    path: str, group_by: str = "user_id", since: Optional[float] = None
+) -> List[Dict[str, Any]]:
+    """依使用者或 agent 彙總回合用量
+
+    Args:
+        path: SQLite 檔案路徑
+        group_by: 分組欄位 (user_id 或 agent_id)
+        since: 只計入此時間 (epoch 秒) 之後的回合
+
+    Returns:
+        每個分組一筆彙總，依 total_tokens 由大到小排序
+    """
+    if group_by not in ("user_id", "agent_id"):
+        raise ValueError(f"不支援的分組欄位: {group_by}")
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    connection.row_factory = sqlite3.Row
+    try:
+        rows = connection.execute(
+            f"""
+            SELECT {group_by} AS key,
+                   COUNT(*) AS turns,
+                   SUM(prompt_tokens) AS prompt_tokens,
+                   SUM(completion_tokens) AS completion_tokens,
+                   SUM(total_tokens) AS total_tokens,
+                   AVG(prompt_tokens) AS avg_prompt_tokens,
+                   MAX(prompt_tokens) AS max_prompt_tokens,
+                   SUM(tool_calls) AS tool_calls,
+                   SUM(tool_output_chars) AS tool_output_chars,
+                   AVG(run_seconds) AS avg_run_seconds,
+                   SUM(cost) AS cost
+            FROM turns
+            WHERE ts >= ?
+            GROUP BY {group_by}
+            ORDER BY total_tokens DESC
+            """,
+            (since or 0,),
+        ).fetchall()
+    finally:
+        connection.close()
+    return [dict(row) for row in rows]
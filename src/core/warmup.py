@@ -0,0 +1,135 @@
+"""
+啟動預熱模組
+
+在應用啟動時平行執行各項預熱工作 (字型掃描、token 取得、建立 HTTPS 連線、
+回應格式建構、執行緒建立等)，完成後才讓 /healthz/ready 回報就緒，
+滾動部署時負載平衡器不會把第一批使用者導向尚未預熱的 worker。
+"""
+
+import asyncio
+import inspect
+import time
+from concurrent.futures import Executor, Future
+from typing import Awaitable, Callable, Dict, List, Optional, Union
+
+from src.core.logger_config import get_logger
+from src.core.metrics import gauge
+
+logger = get_logger(__name__)
+
+WARMUP_READY = gauge("warmup_ready", "預熱是否已完成 (1 為完成)")
+WARMUP_DURATION = gauge("warmup_duration_seconds", "預熱花費秒數")
+
+# 同步函式在預設執行緒池執行；coroutine 函式直接在事件迴圈上執行
+WarmupTask = Callable[[], Union[object, Awaitable[object]]]
+
+
+def prestart_threads(executor: Executor, count: int) -> List[Future]:
+    """同時送出 count 個短暫工作，預先建立執行緒池的執行緒
+
+    ThreadPoolExecutor 在沒有閒置執行緒時會逐一建立新執行緒，之後的請求
+    不必再付出建立執行緒的成本。呼叫端不可在同一個執行緒池的執行緒中等待
+    回傳的 Future，執行緒池只有一個執行緒時會卡死。
+
+    Args:
+        executor: 執行緒池
+        count: 要建立的執行緒數量
+
+    Returns:
+        送出的工作
+    """
+    return [executor.submit(time.sleep, 0.05) for _ in range(count)]
+
+
+def prestart_executor(executor: Executor, count: int) -> WarmupTask:
+    """建立預先啟動執行緒池執行緒的預熱工作 (見 prestart_threads)
+
+    回傳的是 coroutine 函式，在事件迴圈上等待工作完成：若在同一個執行緒池中
+    等待，執行緒池只有一個執行緒時會等待永遠無法執行的工作而卡死。
+
+    Args:
+        executor: 執行緒池
+        count: 要建立的執行緒數量
+
+    Returns:
+        預熱工作 (coroutine 函式)
+    """
+
+    async def _prestart() -> None:
+        futures = prestart_threads(executor, count)
+        await asyncio.gather(*(asyncio.wrap_future(future) for future in futures))
+
+    return _prestart
+
+
+class WarmupManager:
+    """管理預熱工作與就緒狀態"""
+
+    def __init__(self, timeout: float = 60.0):
+        """
+        Args:
+            timeout: 預熱工作的總逾時秒數，逾時後仍視為完成以免永遠無法就緒
+        """
+        self.timeout = timeout
+        self.ready = False
+        self.results: Dict[str, str] = {}
+        self.duration: Optional[float] = None
+        self._tasks: Dict[str, WarmupTask] = {}
+
+    def add(self, name: str, task: WarmupTask) -> None:
+        """註冊預熱工作
+
+        Args:
+            name: 工作名稱 (顯示於 /healthz/ready)
+            task: 同步函式 (在執行緒池中執行) 或 coroutine 函式 (在事件迴圈上執行)
+        """
+        self._tasks[name] = task
+
+    async def _run_task(self, name: str, task: WarmupTask) -> None:
+        started = time.monotonic()
+        try:
+            if inspect.iscoroutinefunction(task):
+                await task()
+            else:
+                await asyncio.to_thread(task)
+            self.results[name] = "ok"
+            logger.info(f"預熱完成: {name} ({time.monotonic() - started:.2f} 秒)")
+        except Exception as e:
+            self.results[name] = f"failed: {e}"
+            logger.warning(f"預熱失敗: {name}: {e}")
+
+    async def run(self) -> None:
+        """平行執行所有預熱工作，完成或逾時後標記為就緒"""
+        started = time.monotonic()
+        for name in self._tasks:
+            self.results[name] = "pending"
+        logger.info(f"開始預熱，工作: {list(self._tasks)}")
+
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(
+                    *(self._run_task(name, task) for name, task in self._tasks.items())
+                ),
+                self.timeout,
+            )
+        except asyncio.TimeoutError:
+            for name, status in self.results.items():
+                if status == "pending":
+                    self.results[name] = "timeout"
+            logger.warning(f"預熱逾時 ({self.timeout} 秒): {self.results}")
+
+        self.duration = time.monotonic() - started
+        self.ready = True
+        WARMUP_READY.set(1)
+        WARMUP_DURATION.set(self.duration)
+        logger.info(f"預熱結束，花費 {self.duration:.2f} 秒")
+
+    def status(self) -> Dict[str, object]:
+        """回傳就緒狀態與各預熱工作的結果"""
+        return {
+            "ready": self.ready,
+            "duration_seconds": (
+                round(self.duration, 3) if self.duration is not None else None
+            ),
+            "tasks": dict(self.results),
+        }
@@ -2,20 +2,48 @@
 DESCRIPTION:
     This sample demonstrates how to interact with an existing
     Azure AI Foundry agent by sending user questions and receiving responses.
+
+    Scripted mode (--script) reads a question corpus (one question per line,
+    lines starting with # are ignored) and runs N concurrent simulated users,
+    each with its own thread. It records per-question timings for thread
+    creation, run and message fetch plus token usage, and writes a JSON report.
+
+USAGE:
+    python src/scripts/foundry/agent_chat.py
+    python src/scripts/foundry/agent_chat.py --script questions.txt --users 4 \
+        [--questions-per-user 10] [--report agent_chat_report.json]
 """
 
+import argparse
 import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
 from databricks.sdk import WorkspaceClient
 from azure.ai.projects import AIProjectClient
 from azure.identity import DefaultAzureCredential
 from databricks_ai_bridge.genie import Genie, GenieResponse
 from azure.ai.agents.models import FunctionTool, ToolSet
-from typing import Any, Callable, Set
+from typing import Any, Callable, Dict, List, Optional, Set
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+parser = argparse.ArgumentParser(description="Chat with an existing Foundry agent")
+parser.add_argument("--script", help="問題清單檔案，指定時以多使用者腳本模式執行")
+parser.add_argument("--users", type=int, default=1, help="同時模擬的使用者數")
+parser.add_argument(
+    "--questions-per-user",
+    type=int,
+    default=0,
+    help="每位使用者的題數 (預設為問題清單的題數)",
+)
+parser.add_argument(
+    "--report", default="agent_chat_report.json", help="腳本模式的報告輸出路徑"
+)
+args = parser.parse_args()
+
 DATABRICKS_ENTRA_ID_AUDIENCE_SCOPE = os.getenv("DATABRICKS_ENTRA_ID_AUDIENCE_SCOPE")
 FOUNDRY_PROJECT_ENDPOINT = os.getenv("AZURE_FOUNDRY_PROJECT_ENDPOINT")
 FOUNDRY_DATABRICKS_CONNECTION_NAME = os.getenv(
@@ -31,16 +59,46 @@ def genie_to_object(genie_response: GenieResponse) -> dict:
     return {"query": query, "result": result, "description": description}
 
 
-def ask_genie(questions) -> str:
+def ask_genie(connection_name: str, question: str) -> str:
     """
     Function to ask Genie a question and get the response.
-    :param questions: List of questions to ask Genie.
+    :param connection_name: The name of the Databricks connection.
+    :param question: Question to ask Genie.
     :return: Response from Genie.
     """
-    genie_response = genie.ask_question(questions)
+    # 與 create_agent.py 註冊的工具簽章一致，此腳本只連線 FOUNDRY_DATABRICKS_CONNECTION_NAME
+    if connection_name != FOUNDRY_DATABRICKS_CONNECTION_NAME:
+        return json.dumps(
+            {"error": f"connection {connection_name} is not configured in this script"}
+        )
+    genie_response = genie.ask_question(question)
     return json.dumps(genie_to_object(genie_response))
 
 
+def ask_genies(connection_names: List[str], questions: List[str]) -> str:
+    """
+    Function to ask several Genie spaces concurrently and get all responses at once.
+    :param connection_names: The names of the Databricks connections, paired with questions by index.
+    :param questions: Questions to ask, one per connection name.
+    :return: Responses from Genie, with an error entry for each failed question.
+    """
+    # 與 create_agent.py 註冊的工具簽章及 bot 的回傳格式一致 ({"results": [...]})
+    if len(connection_names) != len(questions):
+        return json.dumps({"error": "connection_names 與 questions 長度不一致"})
+
+    def ask_one(connection_name: str, question: str) -> Dict[str, Any]:
+        entry = {"connection_name": connection_name, "question": question}
+        try:
+            entry.update(json.loads(ask_genie(connection_name, question)))
+        except Exception as e:
+            entry["error"] = str(e)
+        return entry
+
+    with ThreadPoolExecutor(max_workers=max(1, len(questions))) as executor:
+        results = list(executor.map(ask_one, connection_names, questions))
+    return json.dumps({"results": results})
+
+
 credential = DefaultAzureCredential(exclude_interactive_browser_credential=False)
 
 project_client = AIProjectClient(FOUNDRY_PROJECT_ENDPOINT, credential)
@@ -67,56 +125,250 @@ genie = Genie(genie_space_id, client=databricks_workspace_client)
 print("Genie client initialized")
 
 toolset = ToolSet()
-user_functions: Set[Callable[..., Any]] = {ask_genie}
+user_functions: Set[Callable[..., Any]] = {ask_genie, ask_genies}
 functions = FunctionTool(functions=user_functions)
 toolset.add(functions)
 
-print("\n" + "=" * 60)
-print("Chat with Agent")
-print("=" * 60)
-print("Type your question and press Enter. Type 'exit' to quit.\n")
 
-with project_client:
-    project_client.agents.enable_auto_function_calls(toolset)
+def load_corpus(path: str) -> List[str]:
+    """讀取問題清單 (每行一題，忽略空行與 # 開頭的行)"""
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
 
-    thread = project_client.agents.threads.create()
-    print(f"Created thread, ID: {thread.id}\n")
 
-    try:
-        while True:
-            user_input = input("You: ").strip()
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
 
-            if user_input.lower() == "exit":
-                print("Ending conversation...")
-                break
 
-            if not user_input:
-                continue
+def run_session(user_index: int, questions: List[str]) -> List[Dict[str, Any]]:
+    """模擬單一使用者：建立自己的 thread 並依序提問
 
-            message = project_client.agents.messages.create(
-                thread_id=thread.id,
-                role="user",
-                content=user_input,
-            )
-            print(f"Message sent, ID: {message.id}")
+    Args:
+        user_index: 模擬使用者編號
+        questions: 此使用者要問的問題
 
-            run = project_client.agents.runs.create_and_process(
-                thread_id=thread.id, agent_id=AZURE_AI_AGENT_ID
-            )
+    Returns:
+        每題一筆的紀錄 (各階段毫秒數、run 狀態、token 用量與錯誤)
+    """
+    records = []
+    started = time.perf_counter()
+    thread = project_client.agents.threads.create()
+    thread_create_ms = _elapsed_ms(started)
 
-            print(f"Run completed with status: {run.status}")
+    try:
+        for index, question in enumerate(questions):
+            record: Dict[str, Any] = {
+                "user": user_index,
+                "question": question,
+                # 只有每個 session 的第一題包含建立 thread 的時間
+                "thread_create_ms": thread_create_ms if index == 0 else None,
+                "message_create_ms": None,
+                "run_ms": None,
+                "messages_fetch_ms": None,
+                "status": None,
+                "prompt_tokens": None,
+                "completion_tokens": None,
+                "total_tokens": None,
+                "error": None,
+            }
+            try:
+                started = time.perf_counter()
+                project_client.agents.messages.create(
+                    thread_id=thread.id, role="user", content=question
+                )
+                record["message_create_ms"] = _elapsed_ms(started)
 
-            messages = project_client.agents.messages.list(thread_id=thread.id)
-            for message in messages:
-                if message.role == "assistant":
-                    print(f"\nAgent: {message.content}\n")
-                    break
+                started = time.perf_counter()
+                run = project_client.agents.runs.create_and_process(
+                    thread_id=thread.id, agent_id=AZURE_AI_AGENT_ID
+                )
+                record["run_ms"] = _elapsed_ms(started)
+                record["status"] = getattr(run.status, "value", run.status)
+                if run.usage is not None:
+                    record["prompt_tokens"] = run.usage.prompt_tokens
+                    record["completion_tokens"] = run.usage.completion_tokens
+                    record["total_tokens"] = run.usage.total_tokens
+
+                started = time.perf_counter()
+                list(
+                    project_client.agents.messages.list(
+                        thread_id=thread.id, run_id=run.id
+                    )
+                )
+                record["messages_fetch_ms"] = _elapsed_ms(started)
+            except Exception as e:
+                record["error"] = f"{type(e).__name__}: {e}"
+            records.append(record)
+            print(
+                f"[user {user_index}] {question[:40]} -> {record['status']} "
+                f"run {record['run_ms']} ms"
+                + (f" error: {record['error']}" if record["error"] else "")
+            )
     finally:
-        # 清理資源：刪除執行緒（選擇性）
         try:
             project_client.agents.threads.delete(thread.id)
-            print(f"Thread {thread.id} deleted successfully.")
         except Exception as e:
-            print(f"Could not delete thread: {e}")
+            print(f"Could not delete thread {thread.id}: {e}")
+    return records
+
+
+def _distribution(values: List[float]) -> Optional[Dict[str, float]]:
+    if not values:
+        return None
+    ordered = sorted(values)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+    return {
+        "count": len(ordered),
+        "mean": round(statistics.mean(ordered), 1),
+        "p50": pick(0.50),
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+        "max": ordered[-1],
+    }
+
+
+def summarize(records: List[Dict[str, Any]], wall_seconds: float) -> Dict[str, Any]:
+    """彙整各階段延遲分布、token 用量與 run 狀態"""
+    statuses: Dict[str, int] = {}
+    for record in records:
+        key = record["status"] or "error"
+        statuses[key] = statuses.get(key, 0) + 1
+
+    tokens = {
+        key: sum(record[key] or 0 for record in records)
+        for key in ("prompt_tokens", "completion_tokens", "total_tokens")
+    }
+    answered = [record for record in records if record["total_tokens"] is not None]
+    return {
+        "questions": len(records),
+        "errors": sum(1 for record in records if record["error"]),
+        "statuses": statuses,
+        "wall_seconds": round(wall_seconds, 2),
+        "questions_per_second": (
+            round(len(records) / wall_seconds, 3) if wall_seconds else 0.0
+        ),
+        "latency_ms": {
+            phase: _distribution(
+                [record[phase] for record in records if record[phase] is not None]
+            )
+            for phase in (
+                "thread_create_ms",
+                "message_create_ms",
+                "run_ms",
+                "messages_fetch_ms",
+            )
+        },
+        "tokens": tokens,
+        "mean_total_tokens_per_question": (
+            round(tokens["total_tokens"] / len(answered), 1) if answered else None
+        ),
+    }
+
+
+def run_script(
+    corpus_path: str, users: int, questions_per_user: int, report_path: str
+) -> None:
+    """以多個模擬使用者同時執行問題清單，並寫出報告"""
+    corpus = load_corpus(corpus_path)
+    if not corpus:
+        raise ValueError(f"問題清單是空的: {corpus_path}")
+    per_user = questions_per_user or len(corpus)
+    # 每位使用者從不同的位置開始輪流取題，避免同一時間都問相同問題
+    sessions = [
+        [corpus[(user + i) % len(corpus)] for i in range(per_user)]
+        for user in range(users)
+    ]
+    print(f"Running {users} simulated users x {per_user} questions\n")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as executor:
+        results = executor.map(run_session, range(users), sessions)
+        records = [record for session in results for record in session]
+    summary = summarize(records, time.perf_counter() - started)
+
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "config": {
+                    "endpoint": FOUNDRY_PROJECT_ENDPOINT,
+                    "agent_id": AZURE_AI_AGENT_ID,
+                    "corpus": corpus_path,
+                    "users": users,
+                    "questions_per_user": per_user,
+                },
+                "summary": summary,
+                "records": records,
+            },
+            f,
+            indent=2,
+            ensure_ascii=False,
+        )
+
+    print("\n" + "=" * 60)
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    print(f"Report written to {report_path}")
+
+
+def chat_interactive() -> None:
+    """互動模式：單一 thread 的對話"""
+    print("\n" + "=" * 60)
+    print("Chat with Agent")
+    print("=" * 60)
+    print("Type your question and press Enter. Type 'exit' to quit.\n")
+
+    with project_client:
+        project_client.agents.enable_auto_function_calls(toolset)
+
+        thread = project_client.agents.threads.create()
+        print(f"Created thread, ID: {thread.id}\n")
+
+        try:
+            while True:
+                user_input = input("You: ").strip()
+
+                if user_input.lower() == "exit":
+                    print("Ending conversation...")
+                    break
+
+                if not user_input:
+                    continue
+
+                message = project_client.agents.messages.create(
+                    thread_id=thread.id,
+                    role="user",
+                    content=user_input,
+                )
+                print(f"Message sent, ID: {message.id}")
+
+                run = project_client.agents.runs.create_and_process(
+                    thread_id=thread.id, agent_id=AZURE_AI_AGENT_ID
+                )
+
+                print(f"Run completed with status: {run.status}")
+
+                messages = project_client.agents.messages.list(thread_id=thread.id)
+                for message in messages:
+                    if message.role == "assistant":
+                        print(f"\nAgent: {message.content}\n")
+                        break
+        finally:
+            # 清理資源：刪除執行緒（選擇性）
+            try:
+                project_client.agents.threads.delete(thread.id)
+                print(f"Thread {thread.id} deleted successfully.")
+            except Exception as e:
+                print(f"Could not delete thread: {e}")
+
+    print("Chat session ended.")
+
 
-print("Chat session ended.")
+if __name__ == "__main__":
+    if args.script:
+        with project_client:
+            project_client.agents.enable_auto_function_calls(toolset)
+            run_script(args.script, args.users, args.questions_per_user, args.report)
+    else:
+        chat_interactive()
@@ -0,0 +1,44 @@
+"""
+DESCRIPTION:
+    Summarizes the per-turn usage recorded by FoundryBot (TURN_TELEMETRY_PATH)
+    per user or per agent: turns, prompt / completion tokens, tool calls,
+    average run duration and estimated cost.
+
+USAGE:
+    python src/scripts/foundry/turn_report.py [--db logs/turn_telemetry.db] \
+        [--by user|agent] [--hours 24] [--limit 20]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+from src.core.turn_telemetry import summarize  # noqa: E402
+
+parser = argparse.ArgumentParser(description="回合用量彙總")
+parser.add_argument("--db", default="logs/turn_telemetry.db", help="SQLite 檔案路徑")
+parser.add_argument("--by", choices=("user", "agent"), default="user", help="分組方式")
+parser.add_argument(
+    "--hours", type=float, default=0, help="只統計最近幾小時 (0 為全部)"
+)
+parser.add_argument("--limit", type=int, default=20, help="最多顯示幾個分組")
+args = parser.parse_args()
+
+since = time.time() - args.hours * 3600 if args.hours else None
+rows = summarize(args.db, f"{args.by}_id", since)
+
+print(
+    f"{args.by:<40}{'回合':>8}{'prompt':>12}{'completion':>12}{'最大prompt':>12}"
+    f"{'工具呼叫':>10}{'平均秒數':>10}{'費用':>10}"
+)
+for row in rows[: args.limit]:
+    print(
+        f"{str(row['key']):<40}{row['turns']:>8}{row['prompt_tokens']:>12}"
+        f"{row['completion_tokens']:>12}{row['max_prompt_tokens']:>12}"
+        f"{row['tool_calls']:>10}{row['avg_run_seconds']:>10.1f}{row['cost']:>10.4f}"
+    )
+total_tokens = sum(row["total_tokens"] or 0 for row in rows)
+print(f"合計 {sum(row['turns'] for row in rows)} 個回合, {total_tokens} tokens")
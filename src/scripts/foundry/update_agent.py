@@ -12,7 +12,7 @@ USAGE:
 from azure.ai.projects import AIProjectClient
 from azure.identity import DefaultAzureCredential
 from azure.ai.agents.models import FunctionTool, ToolSet
-from typing import Any, Callable, Set
+from typing import Any, Callable, List, Set
 import os
 from dotenv import load_dotenv
 
@@ -37,6 +37,18 @@ def ask_genie(connection_name: str, question: str) -> str:
     pass
 
 
+def ask_genies(connection_names: List[str], questions: List[str]) -> str:
+    """
+    Function to ask several Genie spaces concurrently and get all responses at once.
+    Only the schema is defined here; actual execution is handled in bot definition.
+
+    :param connection_names: The names of the Databricks connections, paired with questions by index. 可用選項: Active_dataset_Rag_bst (active dataset), Finance_dataset_Rag_bst (finance dataset)
+    :param questions: Questions to ask, one per connection name.
+    :return: Responses from Genie, with an error entry for each failed or timed-out question.
+    """
+    pass
+
+
 ##################
 # Update Agent
 
@@ -57,6 +69,7 @@ if __name__ == "__main__":
     toolset = ToolSet()
     user_functions: Set[Callable[..., Any]] = {
         ask_genie,
+        ask_genies,
     }
     functions = FunctionTool(functions=user_functions)
     toolset.add(functions)
@@ -74,6 +87,7 @@ if __name__ == "__main__":
 * Genie 是取得資料的工具，如果使用者問題和 "active" 或 "finance" 資料相關，使用 ask_genie 工具取得資料，取得結果後回傳給使用者
 * 使用者問題與"active" 或 "finance" 資料不相關，就不要使用 ask_genie
 * 使用 ask_genie 的時候要根據使用者問題傳遞 connection_name
+* 問題同時需要多個資料集時 (例如比較 active 與 finance)，使用 ask_genies 一次查詢多個 connection_name，不要依序呼叫多次 ask_genie
 * 單一問題使用 ask_genie 次數不得超過 2 次
 * 繪製圖表：當需要回傳圖表時,請直接使用 card_type="chart" 並提供 chart_type, labels, values 欄位。確保labels, values長度相同。
             """,
@@ -0,0 +1,218 @@
+"""
+Foundry Agent run 執行器
+
+取代 SDK 的 create_and_process 自動函式呼叫：自行輪詢 run 狀態，
+同一個 requires_action 步驟中的多個工具呼叫會在有上限的執行緒池中平行執行，
+並一次送出所有工具輸出。
+"""
+
+import json
+import time
+from concurrent.futures import wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List
+
+from azure.ai.agents.models import (
+    RequiredFunctionToolCall,
+    RunStatus,
+    SubmitToolOutputsAction,
+    ThreadRun,
+    ToolOutput,
+)
+from azure.ai.projects import AIProjectClient
+
+from src.core import tracing
+from src.core.logger_config import get_logger
+from src.core.metrics import stage_timer
+from src.core.warmup import prestart_threads
+
+logger = get_logger(__name__)
+
+TOOL_CALL_STAGE = stage_timer("agent_runner", "tool_call")
+SUBMIT_TOOL_OUTPUTS_STAGE = stage_timer(
+    "agent_runner", "submit_tool_outputs", kind="client"
+)
+
+# 仍需繼續輪詢的 run 狀態
+_ACTIVE_STATUSES = (
+    RunStatus.QUEUED,
+    RunStatus.IN_PROGRESS,
+    RunStatus.REQUIRES_ACTION,
+    RunStatus.CANCELLING,
+)
+
+
+@dataclass
+class AgentRunResult:
+    """run 的結束狀態與執行統計
+
+    Attributes:
+        run: 結束狀態的 run (run.usage 為 token 用量)
+        tool_calls: 執行的工具呼叫次數
+        tool_output_chars: 送回給 agent 的工具輸出字元數 (會計入後續的 prompt token)
+        duration: 建立 run 到結束狀態的秒數
+    """
+
+    run: ThreadRun
+    tool_calls: int = 0
+    tool_output_chars: int = 0
+    duration: float = 0.0
+
+
+class AgentRunner:
+    """執行 Foundry Agent run 並平行處理工具呼叫
+
+    run() 為同步阻塞方法，應在 executor 執行緒中呼叫。
+    """
+
+    def __init__(
+        self,
+        project_client: AIProjectClient,
+        functions: Iterable[Callable[..., str]],
+        max_workers: int = 8,
+        polling_interval: float = 1.0,
+    ):
+        """
+        Args:
+            project_client: Azure AI Project Client
+            functions: 可供 agent 呼叫的函式，以函式名稱對應工具名稱
+            max_workers: 平行執行工具呼叫的執行緒數量上限
+            polling_interval: 輪詢 run 狀態的間隔秒數
+        """
+        self.project_client = project_client
+        self.functions: Dict[str, Callable[..., str]] = {
+            func.__name__: func for func in functions
+        }
+        self.polling_interval = polling_interval
+        self.max_workers = max_workers
+        # 工具呼叫在此執行緒池執行，帶入 run 的 context 以延續 trace
+        self._executor = tracing.ContextThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="agent-tool"
+        )
+
+    def warm_up(self) -> None:
+        """預先建立工具呼叫執行緒"""
+        # warm_up 在預設執行緒池執行，等待自己的執行緒池不會卡死
+        wait(prestart_threads(self._executor, self.max_workers))
+
+    def run(
+        self,
+        thread_id: str,
+        agent_id: str,
+        response_format: Any = None,
+    ) -> AgentRunResult:
+        """建立 run 並處理到結束狀態
+
+        Args:
+            thread_id: 執行緒 ID
+            agent_id: Agent ID
+            response_format: 回應格式定義
+
+        Returns:
+            AgentRunResult: 結束狀態 (completed, failed, cancelled, expired) 的 run
+            與工具呼叫統計
+        """
+        started = time.monotonic()
+        runs = self.project_client.agents.runs
+        run = runs.create(
+            thread_id=thread_id, agent_id=agent_id, response_format=response_format
+        )
+        logger.info(f"已建立 run: {run.id} (執行緒: {thread_id})")
+        tracing.set_attribute("foundry.thread_id", thread_id)
+        tracing.set_attribute("foundry.run_id", run.id)
+
+        result = AgentRunResult(run=run)
+        while run.status in _ACTIVE_STATUSES:
+            time.sleep(self.polling_interval)
+            run = runs.get(thread_id=thread_id, run_id=run.id)
+
+            if run.status != RunStatus.REQUIRES_ACTION or not isinstance(
+                run.required_action, SubmitToolOutputsAction
+            ):
+                continue
+
+            tool_calls = run.required_action.submit_tool_outputs.tool_calls
+            if not tool_calls:
+                logger.warning(f"run {run.id} 未提供工具呼叫，取消 run")
+                run = runs.cancel(thread_id=thread_id, run_id=run.id)
+                continue
+
+            tool_outputs = self._execute_tool_calls(tool_calls)
+            result.tool_calls += len(tool_outputs)
+            result.tool_output_chars += sum(
+                len(output.output or "") for output in tool_outputs
+            )
+            try:
+                with SUBMIT_TOOL_OUTPUTS_STAGE.track():
+                    run = runs.submit_tool_outputs(
+                        thread_id=thread_id, run_id=run.id, tool_outputs=tool_outputs
+                    )
+            except Exception as e:
+                # run 可能在工具執行期間被取消或逾時，重新取得狀態
+                logger.warning(f"送出工具輸出失敗: {e}")
+                run = runs.get(thread_id=thread_id, run_id=run.id)
+
+        result.run = run
+        result.duration = time.monotonic() - started
+        return result
+
+    def _execute_tool_calls(self, tool_calls: List[Any]) -> List[ToolOutput]:
+        """平行執行同一步驟中的所有工具呼叫
+
+        Args:
+            tool_calls: run.required_action 中的工具呼叫列表
+
+        Returns:
+            與工具呼叫順序相同的工具輸出列表 (每個工具呼叫 ID 各一筆)
+        """
+        function_calls = [
+            tool_call
+            for tool_call in tool_calls
+            if isinstance(tool_call, RequiredFunctionToolCall)
+        ]
+        logger.info(
+            f"平行執行 {len(function_calls)} 個工具呼叫: "
+            f"{[tool_call.function.name for tool_call in function_calls]}"
+        )
+
+        futures = {
+            tool_call.id: self._executor.submit(self._call_function, tool_call)
+            for tool_call in function_calls
+        }
+        tool_outputs = []
+        for tool_call in tool_calls:
+            future = futures.get(tool_call.id)
+            if future is not None:
+                output = future.result()
+            else:
+                # 缺少任何一個工具呼叫 ID 的輸出時，服務會拒絕整批 submit_tool_outputs
+                tool_type = getattr(tool_call, "type", type(tool_call).__name__)
+                logger.warning(f"不支援的工具呼叫類型: {tool_type} ({tool_call.id})")
+                output = json.dumps({"error": f"不支援的工具呼叫類型: {tool_type}"})
+            tool_outputs.append(ToolOutput(tool_call_id=tool_call.id, output=output))
+        return tool_outputs
+
+    @TOOL_CALL_STAGE
+    def _call_function(self, tool_call: RequiredFunctionToolCall) -> str:
+        """執行單一函式工具呼叫，錯誤以 JSON 格式回傳給 agent
+
+        Args:
+            tool_call: 函式工具呼叫
+
+        Returns:
+            工具輸出字串
+        """
+        name = tool_call.function.name
+        tracing.set_attribute("tool.name", name)
+        function = self.functions.get(name)
+        if function is None:
+            logger.warning(f"未知的工具: {name}")
+            return json.dumps({"error": f"未知的工具: {name}"})
+
+        try:
+            arguments = json.loads(tool_call.function.arguments or "{}")
+            return function(**arguments)
+        except Exception as e:
+            TOOL_CALL_STAGE.record_error()
+            logger.error(f"工具 {name} 執行失敗: {e}", exc_info=True)
+            return json.dumps({"error": str(e)})
@@ -10,10 +10,14 @@
 
 from botbuilder.schema import Attachment
 from src.core.logger_config import get_logger
+from src.core.metrics import stage_timer
+from src.core.payload_log import log_payload
 from src.utils.chart_tool import ChartTool
 
 logger = get_logger(__name__)
 
+CONVERT_STAGE = stage_timer("card_builder", "convert_to_card")
+
 
 def create_text_card(content: str) -> list:
     """建立文字卡片
@@ -156,6 +160,7 @@ def create_chart_card(
     ]
 
 
+@CONVERT_STAGE
 def convert_to_card(response_data: dict) -> Attachment:
     """將 agent 回應轉換為 Adaptive Card
 
@@ -170,7 +175,7 @@ def convert_to_card(response_data: dict) -> Attachment:
     """
     body_elements = []
     actions = []
-    logger.info(f"輸入資料: {response_data}")
+    log_payload(logger, "輸入資料", response_data)
 
     for item in response_data.get("cards", []):
         card_type = item.get("card_type")
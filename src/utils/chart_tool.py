@@ -2,6 +2,7 @@
 
 此模組提供用於生成各種類型圖表並將其轉換為 base64 編碼 PNG 圖片的實用類別。
 設計用於無頭環境，使用 Matplotlib 函式庫進行圖表渲染。
+Matplotlib 於第一次繪圖時才載入，未使用圖表時不增加啟動時間與記憶體。
 
 類別:
 - ChartTool: 根據輸入的數值與標籤生成圖表（圓餅圖、甜甜圈圖、水平長條圖、垂直長條圖或折線圖），
@@ -11,15 +12,32 @@
 from typing import Literal
 import io
 import base64
-import matplotlib
-from matplotlib import font_manager
+import threading
 from src.core.logger_config import get_logger
-
-matplotlib.use("Agg")  # Use Agg backend for headless environments
-import matplotlib.pyplot as plt
+from src.core.metrics import stage_timer
 
 logger = get_logger(__name__)
 
+RENDER_STAGE = stage_timer("chart_tool", "render")
+
+_pyplot = None
+_pyplot_lock = threading.Lock()
+
+
+def _load_pyplot():
+    """延遲載入 matplotlib.pyplot (只在第一次呼叫時匯入)"""
+    global _pyplot
+    if _pyplot is None:
+        with _pyplot_lock:
+            if _pyplot is None:
+                import matplotlib
+
+                matplotlib.use("Agg")  # Use Agg backend for headless environments
+                import matplotlib.pyplot as plt
+
+                _pyplot = plt
+    return _pyplot
+
 
 class ChartTool:
     ChartType = Literal["pie", "donut", "horizontal_bar", "vertical_bar", "line"]
@@ -37,6 +55,10 @@ class ChartTool:
     @classmethod
     def _configure_chinese_font(cls) -> None:
         """優先選用可支援繁體中文的字型。"""
+        _load_pyplot()
+        import matplotlib
+        from matplotlib import font_manager
+
         available_fonts = {font.name for font in font_manager.fontManager.ttflist}
         default_sans = list(matplotlib.rcParams["font.sans-serif"])
         matplotlib.rcParams["font.family"] = "sans-serif"
@@ -59,6 +81,18 @@ class ChartTool:
         cls._configure_chinese_font()
         cls._font_configured = True
 
+    @classmethod
+    def warm_up(cls) -> None:
+        """預先掃描字型並輸出一次 PNG，載入字型快取與繪圖後端"""
+        plt = _load_pyplot()
+        cls._ensure_font_configured()
+        fig, ax = plt.subplots(figsize=(1, 1))
+        try:
+            ax.set_title("warm-up")
+            fig.savefig(io.BytesIO(), format="png")
+        finally:
+            plt.close(fig)
+
     @staticmethod
     def _truncate_label(label: str, max_length: int = 15) -> str:
         if len(label) > max_length:
@@ -66,6 +100,7 @@ class ChartTool:
         return label
 
     @classmethod
+    @RENDER_STAGE
     def chart_to_base64(
         cls,
         values: list[float] | str,
@@ -74,6 +109,7 @@ class ChartTool:
     ) -> str:
         """根據 values 與 labels 生成圖表，並回傳 PNG base64 data URI。"""
 
+        plt = _load_pyplot()
         cls._ensure_font_configured()
 
         # 處理 labels
@@ -99,7 +135,7 @@ class ChartTool:
         n = len(labs)
 
         # Generate distinct colors using tab20 colormap
-        cmap = plt.cm.get_cmap("tab20")
+        cmap = plt.get_cmap("tab20")
         colors = [cmap(i / max(1, n - 1)) for i in range(n)]
 
         buf = io.BytesIO()
@@ -3,12 +3,22 @@ Bot 檢查使用者輸入的特殊命令並進行處理
 包含重置對話與顯示說明
 """
 
+import asyncio
+from typing import TYPE_CHECKING, Optional
+
 from botbuilder.core import TurnContext
-from azure.ai.projects import AIProjectClient
 from src.core.logger_config import get_logger
+from src.utils.turn_scheduler import TurnScheduler
+
+if TYPE_CHECKING:
+    # 僅供型別標註，Genie 模式不需載入 Azure AI SDK
+    from azure.ai.projects import AIProjectClient
 
 logger = get_logger(__name__)
 
+# 仍在執行中、可被取消的 run 狀態
+ACTIVE_RUN_STATUSES = ("queued", "in_progress", "requires_action")
+
 
 class CommandHandler:
     """處理特殊命令的處理器類別"""
@@ -52,30 +62,107 @@ class CommandHandler:
         """
         return question.lower() in ["hello", "hi", "你好", "您好"]
 
+    @classmethod
+    def is_command(cls, question: Optional[str]) -> bool:
+        """檢查訊息是否為特殊命令 (重置、說明或歡迎)
+
+        Args:
+            question: 使用者輸入的訊息
+
+        Returns:
+            bool: 是否為特殊命令
+        """
+        normalized_question = (question or "").strip().lower()
+        return (
+            cls._is_reset_command(normalized_question)
+            or cls._is_help_command(normalized_question)
+            or cls._is_greet_command(normalized_question)
+        )
+
+    @staticmethod
+    def _cancel_active_runs(project_client: "AIProjectClient", thread_id: str) -> int:
+        """取消執行緒上仍在執行中的 run (同步阻塞，應在 executor 執行緒中呼叫)
+
+        Args:
+            project_client: Azure AI Project 客戶端
+            thread_id: 執行緒 ID
+
+        Returns:
+            int: 已取消的 run 數量
+        """
+        cancelled = 0
+        try:
+            for run in project_client.agents.runs.list(thread_id=thread_id, limit=5):
+                if run.status in ACTIVE_RUN_STATUSES:
+                    project_client.agents.runs.cancel(
+                        thread_id=thread_id, run_id=run.id
+                    )
+                    logger.info(f"已取消執行中的 run: {run.id} (執行緒: {thread_id})")
+                    cancelled += 1
+        except Exception as e:
+            logger.warning(f"取消執行中的 run 失敗: {e}")
+        return cancelled
+
+    @staticmethod
+    def delete_thread(project_client: "AIProjectClient", thread_id: str) -> bool:
+        """刪除 Foundry 執行緒 (同步阻塞，應在 executor 執行緒中呼叫)
+
+        Args:
+            project_client: Azure AI Project 客戶端
+            thread_id: 執行緒 ID
+
+        Returns:
+            bool: 是否刪除成功
+        """
+        try:
+            project_client.agents.threads.delete(thread_id)
+            logger.info(f"已刪除執行緒: {thread_id}")
+            return True
+        except Exception as e:
+            logger.warning(f"刪除執行緒失敗: {e}")
+            return False
+
     @staticmethod
     async def _handle_reset_command(
         turn_context: TurnContext,
         user_id: str,
         thread_dict: dict,
-        project_client: AIProjectClient = None,
+        project_client: "AIProjectClient" = None,
+        turn_scheduler: TurnScheduler = None,
     ) -> None:
         """處理重置命令
 
+        使用者有執行中的回合時只取消 run，執行緒由該回合看到 run 結束後刪除，
+        避免回合仍在輪詢已刪除的執行緒。
+
         Args:
             turn_context: Bot 的對話上下文
             user_id: 使用者 ID
             thread_dict: 執行緒字典
             project_client: Azure AI Project 客戶端 (可選，僅 FoundryBot 需要)
+            turn_scheduler: 回合排程器 (可選)，用於捨棄尚未處理的訊息
         """
-        if user_id in thread_dict and thread_dict[user_id]:
-            # 如果是 FoundryBot，需要透過 API 刪除執行緒
-            if project_client:
-                try:
-                    project_client.agents.threads.delete(thread_dict[user_id])
-                    logger.info(f"已刪除執行緒: {thread_dict[user_id]}")
-                except Exception as e:
-                    logger.warning(f"刪除執行緒失敗: {e}")
+        if turn_scheduler:
+            turn_scheduler.discard_pending(user_id)
+
+        thread_id = thread_dict.get(user_id)
+        if thread_id:
+            # 先解除對應，執行中的回合據此得知對話已重置
             thread_dict[user_id] = None
+            # 如果是 FoundryBot，需要先取消執行中的 run，再透過 API 刪除執行緒
+            if project_client:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(
+                    None, CommandHandler._cancel_active_runs, project_client, thread_id
+                )
+                if turn_scheduler and turn_scheduler.is_busy(user_id):
+                    logger.info(
+                        f"執行緒 {thread_id} 將於使用者 {user_id} 的回合結束後刪除"
+                    )
+                else:
+                    await loop.run_in_executor(
+                        None, CommandHandler.delete_thread, project_client, thread_id
+                    )
         await turn_context.send_activity("對話已重新開始！請問您有什麼問題？")
 
     @staticmethod
@@ -113,7 +200,8 @@ class CommandHandler:
         turn_context: TurnContext,
         user_id: str,
         thread_dict: dict,
-        project_client: AIProjectClient = None,
+        project_client: "AIProjectClient" = None,
+        turn_scheduler: TurnScheduler = None,
     ) -> bool:
         """統一處理特殊命令
 
@@ -123,6 +211,7 @@ class CommandHandler:
             user_id: 使用者 ID
             thread_dict: 執行緒字典
             project_client: Azure AI Project 客戶端 (可選，僅 FoundryBot 需要)
+            turn_scheduler: 回合排程器 (可選)
 
         Returns:
             bool: 是否已處理特殊命令（True 表示已處理，False 表示非特殊命令）
@@ -137,7 +226,7 @@ class CommandHandler:
         # 檢查重置命令
         if self._is_reset_command(normalized_question):
             await self._handle_reset_command(
-                turn_context, user_id, thread_dict, project_client
+                turn_context, user_id, thread_dict, project_client, turn_scheduler
             )
             return True
 
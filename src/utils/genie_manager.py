@@ -3,16 +3,30 @@
 """
 
 import json
-from typing import Dict, List
-from azure.identity import DefaultAzureCredential
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from functools import partial
+from typing import Dict, List, Optional
 from azure.ai.projects import AIProjectClient
 from databricks.sdk import WorkspaceClient
 from databricks_ai_bridge.genie import Genie
 
+from src.core import tracing
+from src.core.admission import GENIE_SPACE_REJECTED
 from src.core.logger_config import get_logger
+from src.core.metrics import stage_timer
+from src.core.trace_propagation import TraceparentCredentialsStrategy
+from src.core.warmup import prestart_threads
+from src.utils.token_manager import TokenManager
 
 logger = get_logger(__name__)
 
+INIT_CONNECTION_STAGE = stage_timer("genie_manager", "init_connection")
+SPACE_WAIT_STAGE = stage_timer("genie_manager", "space_wait")
+ASK_QUESTION_STAGE = stage_timer("genie_manager", "ask_question", kind="client")
+FANOUT_STAGE = stage_timer("genie_manager", "fanout")
+
 
 class GenieManager:
     """
@@ -22,134 +36,349 @@ class GenieManager:
     避免使用全域狀態造成難以追蹤的副作用。
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        max_concurrency_per_space: int = 2,
+        fanout_timeout: float = 120.0,
+        space_wait_timeout: float = 60.0,
+        max_workers: int = 8,
+        init_retry_base_delay: float = 5.0,
+        init_retry_max_delay: float = 300.0,
+    ):
+        """
+        Args:
+            max_concurrency_per_space: 每個 Genie space 同時執行的查詢上限
+            fanout_timeout: ask_genies 整體等待秒數，逾時的查詢回傳錯誤
+            space_wait_timeout: 等待 Genie space 執行名額的最長秒數
+            max_workers: ask_genies 平行查詢使用的執行緒數量
+            init_retry_base_delay: 連線初始化失敗後第一次重試的等待秒數
+            init_retry_max_delay: 連線初始化重試的最長等待秒數
+        """
         self._genies: Dict[str, Genie] = {}
-        self._credential: DefaultAzureCredential | None = None
+        self._project_client: AIProjectClient | None = None
+        self._token_manager: TokenManager | None = None
         self._entra_id_audience_scope: str | None = None
+        self._connection_names: List[str] = []
         self._connections: Dict[str, dict] = {}
 
+        self.init_retry_base_delay = init_retry_base_delay
+        self.init_retry_max_delay = init_retry_max_delay
+        self._init_locks: Dict[str, threading.Lock] = {}
+        self._retry_attempts: Dict[str, int] = {}
+
+        self.max_concurrency_per_space = max_concurrency_per_space
+        self.fanout_timeout = fanout_timeout
+        self.space_wait_timeout = space_wait_timeout
+        self._space_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._semaphores_lock = threading.Lock()
+        self.max_workers = max_workers
+        self._executor = tracing.ContextThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="genie-fanout"
+        )
+
     def initialize(
         self,
         project_client: AIProjectClient,
-        credential: DefaultAzureCredential,
+        token_manager: TokenManager,
         connection_names: List[str],
         entra_id_audience_scope: str,
+        startup_timeout: float = 10.0,
     ) -> Dict[str, Genie]:
-        """初始化多個 Genie 客戶端
+        """平行初始化多個 Genie 客戶端
+
+        所有連線同時初始化，最多等待 startup_timeout 秒。
+        逾時或失敗的連線會在背景重試，並在第一次使用時延遲初始化。
+        所有客戶端共用 token_manager 提供的 credentials strategy，
+        token 由 token_manager 在背景主動更新。
 
         Args:
             project_client: Azure AI Project Client
-            credential: Azure 認證
+            token_manager: Entra ID token 管理器
             connection_names: Genie 連線名稱列表
             entra_id_audience_scope: Entra ID 受眾範圍
+            startup_timeout: 啟動時等待連線初始化的秒數
 
         Returns:
-            字典,鍵為連線名稱,值為 Genie 物件
+            字典,鍵為連線名稱,值為已完成初始化的 Genie 物件
         """
         logger.info(
             f"準備初始化 {len(connection_names)} 個 Genie 連線: {connection_names}"
         )
 
-        self._credential = credential
+        self._project_client = project_client
+        self._token_manager = token_manager
         self._entra_id_audience_scope = entra_id_audience_scope
+        self._connection_names = [name for name in connection_names if name]
 
-        for connection_name in connection_names:
-            try:
-                logger.info(f"正在取得連線: {connection_name}")
-                connection = project_client.connections.get(connection_name)
-                genie_space_id = connection.metadata.get("genie_space_id")
-                if not genie_space_id:
-                    logger.error(f"連線 {connection_name} 缺少 genie_space_id metadata")
-                    raise ValueError(f"連線 {connection_name} 缺少 genie_space_id")
-
-                # 保存連線資訊，供token過期時重建使用
-                self._connections[connection_name] = {
-                    "target": connection.target,
-                    "genie_space_id": genie_space_id,
-                }
-
-                token = credential.get_token(entra_id_audience_scope).token
-                databricks_client = WorkspaceClient(
-                    host=connection.target,
-                    token=token,
-                )
-                self._genies[connection_name] = Genie(
-                    genie_space_id, client=databricks_client
-                )
-                logger.info(
-                    f"Genie 初始化完成,Connection: {connection_name}, Space ID: {genie_space_id}"
-                )
-
-            except Exception as e:
-                logger.error(
-                    f"初始化 Genie 連線 {connection_name} 失敗: {e}", exc_info=True
-                )
-                # 繼續處理其他連線，而不是完全失敗
-                continue
-
-        if not self._genies:
-            error_msg = "所有 Genie 連線初始化失敗"
-            logger.error(error_msg)
-            raise RuntimeError(error_msg)
-
-        return self._genies
+        executor = ThreadPoolExecutor(
+            max_workers=len(self._connection_names) + 1,
+            thread_name_prefix="genie-init",
+        )
+        # 預先取得 token，之後由 token_manager 在到期前於背景更新
+        token_future = executor.submit(token_manager.get_token, entra_id_audience_scope)
+        futures = [token_future]
+        for connection_name in self._connection_names:
+            future = executor.submit(self._init_connection, connection_name)
+            future.add_done_callback(
+                partial(self._on_initial_connection_done, connection_name)
+            )
+            futures.append(future)
+        executor.shutdown(wait=False)
 
-    def ask_genie(self, connection_name: str, question: str) -> str:
-        """向指定的 Genie 提問
+        _, not_done = wait(futures, timeout=startup_timeout)
+
+        if token_future.done() and token_future.exception() is not None:
+            logger.warning(
+                f"預先取得 Databricks token 失敗: {token_future.exception()}"
+            )
+
+        pending = [name for name in self._connection_names if name not in self._genies]
+        if pending:
+            logger.warning(
+                f"{len(pending)} 個 Genie 連線尚未就緒，將於背景重試或在第一次使用時初始化: {pending}"
+            )
+        if not_done:
+            logger.warning(f"Genie 初始化超過 {startup_timeout} 秒，略過等待")
+
+        return dict(self._genies)
+
+    def warm_up(self) -> None:
+        """預先建立平行查詢執行緒並確認 Databricks token 已快取"""
+        # warm_up 在預設執行緒池執行，等待自己的執行緒池不會卡死
+        wait(prestart_threads(self._executor, self.max_workers))
+        if self._token_manager is not None and self._entra_id_audience_scope:
+            self._token_manager.get_token(self._entra_id_audience_scope)
+
+    @INIT_CONNECTION_STAGE
+    def _init_connection(self, connection_name: str) -> Genie:
+        """初始化單一 Genie 連線 (已初始化則直接回傳)
 
         Args:
             connection_name: Genie 連線名稱
-            question: 要詢問的問題
 
         Returns:
-            JSON 格式的回應，包含 connection_name, query, result, description 或 error
+            Genie 物件
         """
+        with self._get_init_lock(connection_name):
+            genie = self._genies.get(connection_name)
+            if genie is not None:
+                return genie
+
+            logger.info(f"正在取得連線: {connection_name}")
+            connection = self._project_client.connections.get(connection_name)
+            genie_space_id = connection.metadata.get("genie_space_id")
+            if not genie_space_id:
+                logger.error(f"連線 {connection_name} 缺少 genie_space_id metadata")
+                raise ValueError(f"連線 {connection_name} 缺少 genie_space_id")
+
+            self._connections[connection_name] = {
+                "target": connection.target,
+                "genie_space_id": genie_space_id,
+            }
+
+            databricks_client = WorkspaceClient(
+                host=connection.target,
+                credentials_strategy=TraceparentCredentialsStrategy(
+                    self._token_manager.credentials_strategy(
+                        self._entra_id_audience_scope
+                    )
+                ),
+            )
+            genie = Genie(genie_space_id, client=databricks_client)
+            self._genies[connection_name] = genie
+            self._retry_attempts.pop(connection_name, None)
+            logger.info(
+                f"Genie 初始化完成,Connection: {connection_name}, Space ID: {genie_space_id}"
+            )
+            return genie
+
+    def _get_init_lock(self, connection_name: str) -> threading.Lock:
+        with self._semaphores_lock:
+            init_lock = self._init_locks.get(connection_name)
+            if init_lock is None:
+                init_lock = threading.Lock()
+                self._init_locks[connection_name] = init_lock
+            return init_lock
+
+    def _on_initial_connection_done(self, connection_name: str, future: Future) -> None:
+        """啟動時的初始化結束 (可能已超過 startup_timeout)，失敗則排程背景重試"""
+        error = future.exception()
+        if error is not None:
+            logger.error(f"初始化 Genie 連線 {connection_name} 失敗: {error}")
+            self._schedule_retry(connection_name)
+
+    def _schedule_retry(self, connection_name: str) -> None:
+        """以指數退避排程背景重試初始化"""
+        attempt = self._retry_attempts.get(connection_name, 0) + 1
+        self._retry_attempts[connection_name] = attempt
+        delay = min(
+            self.init_retry_max_delay, self.init_retry_base_delay * 2 ** (attempt - 1)
+        )
+        logger.info(f"將於 {delay} 秒後重試初始化 Genie 連線 {connection_name}")
+
+        timer = threading.Timer(delay, self._retry_connection, args=(connection_name,))
+        timer.daemon = True
+        timer.start()
+
+    def _retry_connection(self, connection_name: str) -> None:
+        if connection_name in self._genies:
+            return
         try:
-            if connection_name not in self._genies:
-                available = ", ".join(self._genies.keys())
-                logger.warning(
-                    f"無效的 connection_name: {connection_name}。可用選項: {available}"
-                )
-                return json.dumps(
-                    {
-                        "error": f"無效的 connection_name: {connection_name}。可用的選項: {available}"
-                    }
-                )
+            self._init_connection(connection_name)
+        except Exception as e:
+            logger.warning(f"重試初始化 Genie 連線 {connection_name} 失敗: {e}")
+            self._schedule_retry(connection_name)
+
+    def _get_genie(self, connection_name: str) -> Genie:
+        """取得 Genie 物件，尚未初始化的連線會在此延遲初始化
+
+        Raises:
+            ValueError: connection_name 不在設定的連線列表中
+        """
+        genie = self._genies.get(connection_name)
+        if genie is not None:
+            return genie
+
+        if connection_name not in self._connection_names:
+            available = ", ".join(self._connection_names)
+            logger.warning(
+                f"無效的 connection_name: {connection_name}。可用選項: {available}"
+            )
+            raise ValueError(
+                f"無效的 connection_name: {connection_name}。可用的選項: {available}"
+            )
+
+        logger.info(f"Genie 連線 {connection_name} 尚未就緒，立即初始化")
+        return self._init_connection(connection_name)
+
+    def _get_space_semaphore(self, connection_name: str) -> threading.BoundedSemaphore:
+        """取得指定連線的並行上限 semaphore"""
+        with self._semaphores_lock:
+            semaphore = self._space_semaphores.get(connection_name)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.max_concurrency_per_space)
+                self._space_semaphores[connection_name] = semaphore
+            return semaphore
 
+    def _query_genie(
+        self, connection_name: str, question: str, deadline: Optional[float] = None
+    ) -> dict:
+        """向指定的 Genie 提問 (受每個 space 的並行上限控制)
+
+        Args:
+            connection_name: Genie 連線名稱
+            question: 要詢問的問題
+            deadline: time.monotonic() 截止時間，None 表示只受 space_wait_timeout 限制
+
+        Returns:
+            包含 connection_name, query, result, description 的字典
+
+        Raises:
+            ValueError: connection_name 無效時
+            TimeoutError: 截止時間前無法取得執行名額時
+        """
+        genie = self._get_genie(connection_name)
+
+        semaphore = self._get_space_semaphore(connection_name)
+        timeout = self.space_wait_timeout
+        if deadline is not None:
+            timeout = min(timeout, max(0.0, deadline - time.monotonic()))
+        with SPACE_WAIT_STAGE.track():
+            acquired = semaphore.acquire(timeout=timeout)
+        if not acquired:
+            SPACE_WAIT_STAGE.record_error()
+            GENIE_SPACE_REJECTED.labels(connection_name).inc()
+            raise TimeoutError(f"Genie [{connection_name}] 忙碌中，等待執行逾時")
+
+        try:
             logger.info(f"使用 Genie [{connection_name}] 處理問題: {question}")
 
-            try:
-                response = self._genies[connection_name].ask_question(question)
-            except Exception as e:
-                # Token過期時自動重建客戶端並重試
-                if "401" in str(e) or "Token is expired" in str(e):
-                    logger.warning(f"Token已過期,重新建立客戶端: {connection_name}")
-                    conn_info = self._connections[connection_name]
-                    if not self._credential or not self._entra_id_audience_scope:
-                        raise RuntimeError(
-                            "GenieManager 尚未 initialize，無法重新取得 token"
+            with ASK_QUESTION_STAGE.track():
+                tracing.set_attribute("genie.connection_name", connection_name)
+                try:
+                    response = genie.ask_question(question)
+                except Exception as e:
+                    # token 由 TokenManager 在背景更新，此處僅作為撤銷等例外情況的保險
+                    if "401" in str(e) or "Token is expired" in str(e):
+                        logger.warning(f"Token 無效,強制更新後重試: {connection_name}")
+                        if not self._token_manager or not self._entra_id_audience_scope:
+                            raise RuntimeError(
+                                "GenieManager 尚未 initialize，無法重新取得 token"
+                            )
+
+                        self._token_manager.refresh(
+                            self._entra_id_audience_scope, force=True
                         )
+                        response = genie.ask_question(question)
+                    else:
+                        raise e
+        finally:
+            semaphore.release()
 
-                    token = self._credential.get_token(
-                        self._entra_id_audience_scope
-                    ).token
-                    self._genies[connection_name] = Genie(
-                        conn_info["genie_space_id"],
-                        client=WorkspaceClient(host=conn_info["target"], token=token),
-                    )
-                    response = self._genies[connection_name].ask_question(question)
-                else:
-                    raise e
-
-            result = {
-                "connection_name": connection_name,
-                "query": response.query,
-                "result": response.result,
-                "description": response.description,
-            }
-            logger.info(f"Genie [{connection_name}] 回應成功")
-            return json.dumps(result)
+        logger.info(f"Genie [{connection_name}] 回應成功")
+        return {
+            "connection_name": connection_name,
+            "query": response.query,
+            "result": response.result,
+            "description": response.description,
+        }
+
+    def ask_genie(self, connection_name: str, question: str) -> str:
+        """向指定的 Genie 提問
+
+        Args:
+            connection_name: Genie 連線名稱
+            question: 要詢問的問題
 
+        Returns:
+            JSON 格式的回應，包含 connection_name, query, result, description 或 error
+        """
+        try:
+            return json.dumps(self._query_genie(connection_name, question))
         except Exception as e:
             logger.error(f"Genie [{connection_name}] 提問失敗: {e}", exc_info=True)
             return json.dumps({"error": str(e)})
+
+    @FANOUT_STAGE
+    def ask_genies(self, connection_names: List[str], questions: List[str]) -> str:
+        """同時向多個 Genie 提問
+
+        connection_names 與 questions 依索引配對，所有查詢平行執行，
+        總等待時間受 fanout_timeout 限制，逾時或失敗的查詢以 error 欄位回傳。
+
+        Args:
+            connection_names: Genie 連線名稱列表
+            questions: 要詢問的問題列表，長度需與 connection_names 相同
+
+        Returns:
+            JSON 格式的回應，results 為每組查詢的結果 (包含 query, result, description 或 error)
+        """
+        if len(connection_names) != len(questions):
+            return json.dumps(
+                {"error": "connection_names 與 questions 長度不一致"},
+            )
+
+        logger.info(f"平行查詢 {len(questions)} 個 Genie: {connection_names}")
+        deadline = time.monotonic() + self.fanout_timeout
+
+        futures = [
+            self._executor.submit(self._query_genie, name, question, deadline)
+            for name, question in zip(connection_names, questions)
+        ]
+        wait(futures, timeout=self.fanout_timeout)
+
+        results = []
+        for name, question, future in zip(connection_names, questions, futures):
+            entry = {"connection_name": name, "question": question}
+            if not future.done():
+                future.cancel()
+                logger.warning(f"Genie [{name}] 查詢逾時")
+                entry["error"] = f"查詢逾時 (超過 {self.fanout_timeout} 秒)"
+            elif future.exception() is not None:
+                logger.error(f"Genie [{name}] 提問失敗: {future.exception()}")
+                entry["error"] = str(future.exception())
+            else:
+                entry.update(future.result())
+            results.append(entry)
+
+        return json.dumps({"results": results})
@@ -0,0 +1,129 @@
+"""
+回合回覆緩衝模組
+
+收集回合中的狀態訊息 (例如檔案接收結果)，在送出正式回覆時合併到
+同一個 activity (Adaptive Card 或文字訊息)，沒有正式回覆時於回合結束
+以一次 send_activities 送出，減少 Bot Connector 往返與 rate limit 壓力。
+"""
+
+from typing import Callable, List, Optional, Union
+
+from botbuilder.core import MessageFactory, TurnContext
+from botbuilder.schema import Activity, ActivityTypes, ResourceResponse
+
+from src.core.logger_config import get_logger
+from src.utils.card_builder import create_text_card
+
+logger = get_logger(__name__)
+
+ADAPTIVE_CARD_CONTENT_TYPE = "application/vnd.microsoft.card.adaptive"
+
+
+class OutboundBuffer:
+    """單一回合的回覆緩衝區"""
+
+    TURN_STATE_KEY = "OutboundBuffer"
+
+    def __init__(self, turn_context: TurnContext):
+        """
+        Args:
+            turn_context: 對話上下文
+        """
+        self.turn_context = turn_context
+        self._status_lines: List[str] = []
+        self._activities: List[Activity] = []
+        turn_context.on_send_activities(self._merge_on_send)
+
+    @classmethod
+    def for_turn(cls, turn_context: TurnContext) -> "OutboundBuffer":
+        """取得目前回合的緩衝區 (不存在時建立)
+
+        Args:
+            turn_context: 對話上下文
+
+        Returns:
+            綁定在 turn_state 的 OutboundBuffer
+        """
+        buffer: Optional[OutboundBuffer] = turn_context.turn_state.get(
+            cls.TURN_STATE_KEY
+        )
+        if buffer is None:
+            buffer = cls(turn_context)
+            turn_context.turn_state[cls.TURN_STATE_KEY] = buffer
+        return buffer
+
+    def add_status(self, text: str) -> None:
+        """加入狀態訊息，會合併到下一個送出的回覆"""
+        self._status_lines.append(text)
+
+    def add_activity(self, activity: Union[str, Activity]) -> None:
+        """加入待送出的 activity，會與下一個回覆一起送出"""
+        if isinstance(activity, str):
+            activity = MessageFactory.text(activity)
+        self._activities.append(activity)
+
+    async def flush(self) -> None:
+        """以一次 send_activities 送出尚未合併的狀態訊息與 activity"""
+        activities = self._take_pending()
+        if activities:
+            await self.turn_context.send_activities(activities)
+
+    def _take_pending(self) -> List[Activity]:
+        """取出並清空緩衝內容，狀態訊息合併為一則文字訊息"""
+        activities = []
+        if self._status_lines:
+            activities.append(MessageFactory.text("\n\n".join(self._status_lines)))
+        activities.extend(self._activities)
+        self._status_lines = []
+        self._activities = []
+        return activities
+
+    def _merge_into(self, activity: Activity) -> bool:
+        """將狀態訊息合併到指定回覆，成功時回傳 True"""
+        for attachment in activity.attachments or []:
+            if attachment.content_type == ADAPTIVE_CARD_CONTENT_TYPE and isinstance(
+                attachment.content, dict
+            ):
+                body = attachment.content.setdefault("body", [])
+                body[:0] = create_text_card("\n\n".join(self._status_lines))
+                return True
+
+        if not activity.attachments and activity.text:
+            activity.text = "\n\n".join(self._status_lines + [activity.text])
+            return True
+        return False
+
+    async def _merge_on_send(
+        self,
+        context: TurnContext,
+        activities: List[Activity],
+        next_send: Callable,
+    ) -> List[ResourceResponse]:
+        """送出正式回覆時，將緩衝內容合併到同一次送出"""
+        if not self._status_lines and not self._activities:
+            return await next_send()
+
+        index = next(
+            (
+                i
+                for i, activity in enumerate(activities)
+                if activity.type == ActivityTypes.message
+            ),
+            None,
+        )
+        if index is None:
+            # typing 等非訊息 activity 不合併
+            return await next_send()
+
+        if self._status_lines and self._merge_into(activities[index]):
+            self._status_lines = []
+
+        pending = self._take_pending()
+        if pending:
+            reference = TurnContext.get_conversation_reference(context.activity)
+            # send_activities 已在呼叫 hook 前套用 conversation reference
+            activities[index:index] = [
+                TurnContext.apply_conversation_reference(activity, reference)
+                for activity in pending
+            ]
+        return await next_send()
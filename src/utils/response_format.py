@@ -3,12 +3,15 @@
 適用：Microsoft Foundry Agent Service
 """
 
+from functools import lru_cache
+
 from azure.ai.agents.models import (
     ResponseFormatJsonSchemaType,
     ResponseFormatJsonSchema,
 )
 
 
+@lru_cache(maxsize=1)
 def get_agent_response_format() -> ResponseFormatJsonSchemaType:
     """取得 Genie Agent 的回應格式定義
 
@@ -18,6 +21,8 @@ def get_agent_response_format() -> ResponseFormatJsonSchemaType:
     3. card_type=text, card_type=sql: 純文字或 SQL 查詢回應
     4. card_type=link: 超連結回應 (檔案下載連結)
 
+    schema 固定不變，建構一次後快取重複使用。
+
     Returns:
         ResponseFormatJsonSchemaType: Azure AI Agents 的回應格式物件
     """
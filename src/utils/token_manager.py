@@ -0,0 +1,209 @@
+"""
+Entra ID token 管理模組
+
+依 scope 快取 access token，並由背景執行緒在 expires_on 之前主動更新，
+讓所有 Databricks 客戶端透過同一個 credentials strategy 取得有效 token，
+使用者請求不會因 token 過期而多一次失敗的往返。
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from azure.core.credentials import TokenCredential
+from databricks.sdk.config import Config
+from databricks.sdk.credentials_provider import CredentialsProvider, CredentialsStrategy
+
+from src.core.logger_config import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class _CachedToken:
+    """快取的 token
+
+    Attributes:
+        token: access token 字串
+        expires_on: 到期時間 (epoch 秒)
+        fetched_at: 取得時間 (epoch 秒)
+    """
+
+    token: str
+    expires_on: int
+    fetched_at: float
+
+
+class TokenManager:
+    """依 scope 快取並在背景主動更新 Entra ID token"""
+
+    def __init__(
+        self,
+        credential: TokenCredential,
+        refresh_margin: int = 300,
+        retry_interval: int = 30,
+    ):
+        """
+        Args:
+            credential: Azure 認證
+            refresh_margin: 在到期前多少秒進行更新
+            retry_interval: 背景更新失敗後的重試間隔秒數
+        """
+        self._credential = credential
+        self.refresh_margin = refresh_margin
+        self.retry_interval = retry_interval
+
+        self._tokens: Dict[str, _CachedToken] = {}
+        self._lock = threading.Lock()
+        self._scope_locks: Dict[str, threading.Lock] = {}
+        self._failed_scopes: Dict[str, float] = {}
+
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """啟動背景更新執行緒 (重複呼叫不會建立多個執行緒)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped.clear()
+            self._thread = threading.Thread(
+                target=self._refresh_loop, name="token-refresher", daemon=True
+            )
+            self._thread.start()
+        logger.info("Token 背景更新執行緒已啟動")
+
+    def stop(self) -> None:
+        """停止背景更新執行緒"""
+        self._stopped.set()
+        self._wakeup.set()
+
+    def get_token(self, scope: str) -> str:
+        """取得指定 scope 的 access token
+
+        快取中的 token 仍有效時直接回傳；只有在首次取得或背景更新失敗導致
+        token 已過期時，才會在呼叫端同步取得新 token。
+
+        Args:
+            scope: Entra ID scope
+
+        Returns:
+            access token 字串
+        """
+        cached = self._tokens.get(scope)
+        if cached is not None and cached.expires_on - time.time() > 60:
+            return cached.token
+        return self.refresh(scope).token
+
+    def refresh(self, scope: str, force: bool = False) -> _CachedToken:
+        """同步更新指定 scope 的 token
+
+        Args:
+            scope: Entra ID scope
+            force: 是否忽略快取強制重新取得
+
+        Returns:
+            更新後的快取 token
+        """
+        with self._get_scope_lock(scope):
+            cached = self._tokens.get(scope)
+            # 其他執行緒可能已在等待鎖的期間完成更新
+            if (
+                not force
+                and cached is not None
+                and cached.expires_on - time.time() > self.refresh_margin
+            ):
+                return cached
+
+            access_token = self._credential.get_token(scope)
+            cached = _CachedToken(
+                access_token.token, access_token.expires_on, time.time()
+            )
+            self._tokens[scope] = cached
+            self._failed_scopes.pop(scope, None)
+
+        logger.info(
+            f"已更新 token (scope: {scope})，"
+            f"{int(cached.expires_on - time.time())} 秒後到期"
+        )
+        # 通知背景執行緒重新計算下一次更新時間
+        self._wakeup.set()
+        return cached
+
+    def credentials_strategy(self, scope: str) -> CredentialsStrategy:
+        """建立供 Databricks WorkspaceClient 使用的 credentials strategy
+
+        Args:
+            scope: Entra ID scope
+
+        Returns:
+            每次請求都從此管理器取得最新 token 的 CredentialsStrategy
+        """
+        return _TokenManagerCredentialsStrategy(self, scope)
+
+    def _get_scope_lock(self, scope: str) -> threading.Lock:
+        with self._lock:
+            scope_lock = self._scope_locks.get(scope)
+            if scope_lock is None:
+                scope_lock = threading.Lock()
+                self._scope_locks[scope] = scope_lock
+            return scope_lock
+
+    def _next_refresh_at(self, scope: str, cached: _CachedToken) -> float:
+        """計算指定 scope 下一次應更新的時間 (epoch 秒)"""
+        failed_at = self._failed_scopes.get(scope)
+        if failed_at is not None:
+            return failed_at + self.retry_interval
+        # 避免有效期短於 refresh_margin 的 token 造成連續更新
+        return max(
+            cached.expires_on - self.refresh_margin,
+            cached.fetched_at + self.retry_interval,
+        )
+
+    def _refresh_loop(self) -> None:
+        """背景更新迴圈：在最早到期的 token 到期前進行更新"""
+        while not self._stopped.is_set():
+            now = time.time()
+            due_scopes = []
+            next_wakeup = now + 3600
+
+            for scope, cached in list(self._tokens.items()):
+                refresh_at = self._next_refresh_at(scope, cached)
+                if refresh_at <= now:
+                    due_scopes.append(scope)
+                else:
+                    next_wakeup = min(next_wakeup, refresh_at)
+
+            for scope in due_scopes:
+                try:
+                    self.refresh(scope, force=True)
+                except Exception as e:
+                    self._failed_scopes[scope] = time.time()
+                    logger.warning(f"背景更新 token 失敗 (scope: {scope}): {e}")
+
+            if due_scopes:
+                # 重新計算下一次更新時間
+                continue
+
+            self._wakeup.wait(timeout=max(0.0, next_wakeup - time.time()))
+            self._wakeup.clear()
+
+
+class _TokenManagerCredentialsStrategy(CredentialsStrategy):
+    """從 TokenManager 取得 token 的 Databricks credentials strategy"""
+
+    def __init__(self, token_manager: TokenManager, scope: str):
+        self._token_manager = token_manager
+        self._scope = scope
+
+    def auth_type(self) -> str:
+        return "entra-token-manager"
+
+    def __call__(self, cfg: Config) -> CredentialsProvider:
+        def header_factory() -> Dict[str, str]:
+            token = self._token_manager.get_token(self._scope)
+            return {"Authorization": f"Bearer {token}"}
+
+        return header_factory
@@ -0,0 +1,125 @@
+"""
+每位使用者的對話回合排程器
+
+確保同一使用者（同一對話）同時間只有一個回合在執行，
+執行期間收到的後續訊息會合併成下一個回合一次處理，
+避免在同一個 thread 上重複建立 run。
+"""
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List
+
+from src.core.logger_config import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class _TurnState:
+    """單一使用者的回合狀態
+
+    Attributes:
+        lock: 序列化回合執行的鎖
+        pending: 尚未處理的訊息
+        has_waiter: 是否已有等待中的回合負責處理 pending 訊息
+    """
+
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    pending: List[str] = field(default_factory=list)
+    has_waiter: bool = False
+
+
+class TurnScheduler:
+    """依使用者序列化並合併對話回合
+
+    - 沒有執行中的回合：立即執行
+    - 有執行中的回合：第一則後續訊息會排隊等待，之後的訊息併入同一個等待中的回合
+    """
+
+    def __init__(self, coalesce_window: float = 0.0, separator: str = "\n\n"):
+        """
+        Args:
+            coalesce_window: 取得執行權後額外等待的秒數，用於收集連續快速送出的訊息
+            separator: 合併多則訊息時使用的分隔字串
+        """
+        self.coalesce_window = coalesce_window
+        self.separator = separator
+        self._states: Dict[str, _TurnState] = {}
+
+    def is_busy(self, key: str) -> bool:
+        """檢查指定使用者是否有執行中的回合"""
+        state = self._states.get(key)
+        return state is not None and state.lock.locked()
+
+    def discard_pending(self, key: str) -> int:
+        """捨棄指定使用者尚未處理的訊息（例如重置對話時）
+
+        Returns:
+            被捨棄的訊息數量
+        """
+        state = self._states.get(key)
+        if state is None:
+            return 0
+        discarded = len(state.pending)
+        state.pending.clear()
+        if discarded:
+            logger.info(f"已捨棄使用者 {key} 的 {discarded} 則待處理訊息")
+        return discarded
+
+    async def submit(
+        self,
+        key: str,
+        message: str,
+        handler: Callable[[str], Awaitable[None]],
+    ) -> bool:
+        """提交一則訊息
+
+        Args:
+            key: 序列化依據（通常為使用者 ID）
+            message: 使用者訊息內容
+            handler: 實際執行回合的協程函式，參數為合併後的訊息
+
+        Returns:
+            bool: True 表示由此呼叫執行了回合，False 表示訊息已併入其他回合
+        """
+        state = self._states.setdefault(key, _TurnState())
+        state.pending.append(message)
+
+        if state.lock.locked():
+            if state.has_waiter:
+                logger.info(f"使用者 {key} 的訊息已併入等待中的回合")
+                return False
+            state.has_waiter = True
+
+        try:
+            await state.lock.acquire()
+        except asyncio.CancelledError:
+            state.has_waiter = False
+            raise
+
+        try:
+            state.has_waiter = False
+
+            if self.coalesce_window > 0:
+                await asyncio.sleep(self.coalesce_window)
+
+            messages, state.pending = state.pending, []
+            if not messages:
+                # 訊息已被捨棄（例如使用者重置對話）
+                return False
+
+            if len(messages) > 1:
+                logger.info(f"使用者 {key} 合併 {len(messages)} 則訊息為同一回合")
+
+            await handler(self.separator.join(messages))
+            return True
+        finally:
+            state.lock.release()
+            if (
+                not state.lock.locked()
+                and not state.pending
+                and not state.has_waiter
+                and self._states.get(key) is state
+            ):
+                del self._states[key]
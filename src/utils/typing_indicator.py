@@ -0,0 +1,76 @@
+"""
+打字指示器心跳模組
+
+在背景 task 以固定間隔送出 typing activity，讓後端呼叫不必等待
+Bot Connector 的往返，長時間的回合也能持續顯示「正在輸入」。
+送出正式回覆時心跳會自動停止，避免回覆後又出現打字指示器。
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, List
+
+from botbuilder.core import TurnContext
+from botbuilder.schema import Activity, ActivityTypes, ResourceResponse
+
+from src.core.logger_config import get_logger
+
+logger = get_logger(__name__)
+
+
+async def _typing_loop(turn_context: TurnContext, interval: float) -> None:
+    """持續送出 typing activity 直到被取消"""
+    while True:
+        try:
+            await turn_context.send_activity(Activity(type=ActivityTypes.typing))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # 打字指示器失敗不影響回合本身
+            logger.warning(f"送出打字指示器失敗: {e}")
+            return
+        await asyncio.sleep(interval)
+
+
+@asynccontextmanager
+async def typing_heartbeat(
+    turn_context: TurnContext, interval: float = 3.0
+) -> AsyncIterator[None]:
+    """在 context 期間於背景定期送出打字指示器
+
+    Args:
+        turn_context: 對話上下文
+        interval: 送出打字指示器的間隔秒數
+
+    Example:
+        async with typing_heartbeat(turn_context):
+            result = await call_backend()
+        await turn_context.send_activity(reply)
+    """
+    task = asyncio.create_task(_typing_loop(turn_context, interval))
+
+    async def stop_on_reply(
+        context: TurnContext,
+        activities: List[Activity],
+        next_send: Callable,
+    ) -> List[ResourceResponse]:
+        # 送出非 typing 的回覆時停止心跳
+        if any(activity.type != ActivityTypes.typing for activity in activities):
+            task.cancel()
+        return await next_send()
+
+    turn_context.on_send_activities(stop_on_reply)
+    try:
+        yield
+    finally:
+        task.cancel()
+        # TurnContext 沒有移除 handler 的 API，直接自清單移除，
+        # 同一個回合之後送出的訊息不再經過已結束的心跳
+        try:
+            turn_context._on_send_activities.remove(stop_on_reply)
+        except ValueError:
+            pass
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
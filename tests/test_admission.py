@@ -0,0 +1,206 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.bot.base_bot import BaseBot
+from src.core.admission import AdmissionController, AdmissionRejected
+from src.utils.turn_scheduler import TurnScheduler
+
+
+async def wait_until(predicate, timeout=2.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not predicate():
+        assert loop.time() < deadline, "condition not reached"
+        await asyncio.sleep(0.001)
+
+
+async def hold(controller, user_id, release, fair_key=None):
+    async with controller.admit(user_id, fair_key):
+        await release.wait()
+
+
+def test_per_user_limit_rejects_immediately():
+    async def main():
+        controller = AdmissionController(max_in_flight=4, max_per_user=1)
+        release = asyncio.Event()
+        holder = asyncio.create_task(hold(controller, "user-1", release))
+        await wait_until(lambda: controller._in_flight == 1)
+        with pytest.raises(AdmissionRejected) as excinfo:
+            async with controller.admit("user-1"):
+                pass
+        # 其他使用者不受影響
+        async with controller.admit("user-2"):
+            pass
+        release.set()
+        await holder
+        return controller, excinfo.value
+
+    controller, error = asyncio.run(main())
+    assert error.reason == "user_limit"
+    assert controller._in_flight == 0
+    assert dict(controller._user_counts) == {}
+
+
+def test_full_queue_rejects():
+    async def main():
+        controller = AdmissionController(max_in_flight=1, max_queue=1)
+        release = asyncio.Event()
+        holder = asyncio.create_task(hold(controller, "user-1", release))
+        await wait_until(lambda: controller._in_flight == 1)
+        waiter = asyncio.create_task(hold(controller, "user-2", release))
+        await wait_until(lambda: len(controller._waiters) == 1)
+        with pytest.raises(AdmissionRejected) as excinfo:
+            async with controller.admit("user-3"):
+                pass
+        release.set()
+        await asyncio.gather(holder, waiter)
+        return controller, excinfo.value
+
+    controller, error = asyncio.run(main())
+    assert error.reason == "queue_full"
+    assert controller._in_flight == 0
+
+
+def test_wait_timeout_rejects_and_leaves_queue():
+    async def main():
+        controller = AdmissionController(max_in_flight=1, queue_timeout=0.05)
+        release = asyncio.Event()
+        holder = asyncio.create_task(hold(controller, "user-1", release))
+        await wait_until(lambda: controller._in_flight == 1)
+        with pytest.raises(AdmissionRejected) as excinfo:
+            async with controller.admit("user-2"):
+                pass
+        waiting_after_timeout = len(controller._waiters)
+        release.set()
+        await holder
+        return controller, excinfo.value, waiting_after_timeout
+
+    controller, error, waiting = asyncio.run(main())
+    assert error.reason == "timeout"
+    assert waiting == 0
+    assert controller._in_flight == 0
+    assert dict(controller._user_counts) == {}
+
+
+def test_released_slot_is_handed_to_waiter():
+    async def main():
+        controller = AdmissionController(max_in_flight=1)
+        release = asyncio.Event()
+        holder = asyncio.create_task(hold(controller, "user-1", release))
+        await wait_until(lambda: controller._in_flight == 1)
+
+        admitted = asyncio.Event()
+        done = asyncio.Event()
+
+        async def waiting_turn():
+            async with controller.admit("user-2"):
+                admitted.set()
+                await done.wait()
+
+        waiter = asyncio.create_task(waiting_turn())
+        await wait_until(lambda: len(controller._waiters) == 1)
+        assert not admitted.is_set()
+
+        release.set()
+        await holder
+        await asyncio.wait_for(admitted.wait(), 1)
+        # 名額直接移交，執行中數量不變
+        in_flight_after_handoff = controller._in_flight
+        done.set()
+        await waiter
+        return controller, in_flight_after_handoff
+
+    controller, in_flight_after_handoff = asyncio.run(main())
+    assert in_flight_after_handoff == 1
+    assert controller._in_flight == 0
+
+
+def test_cancelled_waiter_does_not_leak_slot():
+    async def main():
+        controller = AdmissionController(max_in_flight=1)
+        release = asyncio.Event()
+        holder = asyncio.create_task(hold(controller, "user-1", release))
+        await wait_until(lambda: controller._in_flight == 1)
+        waiter = asyncio.create_task(hold(controller, "user-2", release))
+        await wait_until(lambda: len(controller._waiters) == 1)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        release.set()
+        await holder
+        return controller
+
+    controller = asyncio.run(main())
+    assert controller._in_flight == 0
+    assert len(controller._waiters) == 0
+    assert dict(controller._user_counts) == {}
+
+
+def make_bot(admission):
+    bot = BaseBot.__new__(BaseBot)
+    bot.settings = SimpleNamespace(app={"fair_key": "user"})
+    bot.admission = admission
+    bot.turn_scheduler = TurnScheduler()
+    return bot
+
+
+def test_parked_follow_up_does_not_hold_a_slot():
+    async def main():
+        controller = AdmissionController(max_in_flight=2, max_per_user=3)
+        bot = make_bot(controller)
+        release = asyncio.Event()
+        turns = []
+
+        async def process_turn(turn_context, user_id, message):
+            turns.append(message)
+            await release.wait()
+
+        bot._process_turn = process_turn
+        turn_context = SimpleNamespace(
+            activity=SimpleNamespace(from_property=SimpleNamespace(id="user-1"))
+        )
+        first = asyncio.create_task(bot.submit_turn(turn_context, "user-1", "a"))
+        await wait_until(lambda: turns)
+        parked = asyncio.create_task(bot.submit_turn(turn_context, "user-1", "b"))
+        await asyncio.sleep(0.01)
+
+        # 等待前一個回合的後續訊息不佔用執行名額
+        in_flight_while_parked = controller._in_flight
+        release.set()
+        await asyncio.gather(first, parked)
+        return controller, turns, in_flight_while_parked
+
+    controller, turns, in_flight_while_parked = asyncio.run(main())
+    assert in_flight_while_parked == 1
+    assert turns == ["a", "b"]
+    assert controller._in_flight == 0
+
+
+def test_rejected_turn_replies_busy():
+    async def main():
+        controller = AdmissionController(max_in_flight=1, max_queue=0)
+        bot = make_bot(controller)
+        sent = []
+
+        async def send_activity(text):
+            sent.append(text)
+
+        async def process_turn(turn_context, user_id, message):
+            raise AssertionError("rejected turn must not run")
+
+        bot._process_turn = process_turn
+        turn_context = SimpleNamespace(
+            activity=SimpleNamespace(from_property=SimpleNamespace(id="user-2")),
+            send_activity=send_activity,
+        )
+        release = asyncio.Event()
+        holder = asyncio.create_task(hold(controller, "user-1", release))
+        await wait_until(lambda: controller._in_flight == 1)
+        await bot.submit_turn(turn_context, "user-2", "a")
+        release.set()
+        await holder
+        return sent
+
+    assert asyncio.run(main()) == ["系統忙碌中，請稍後再試。"]
@@ -0,0 +1,182 @@
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+from azure.ai.agents.models import (
+    RequiredFunctionToolCall,
+    RequiredFunctionToolCallDetails,
+    RequiredToolCall,
+    RunStatus,
+    SubmitToolOutputsAction,
+    SubmitToolOutputsDetails,
+)
+
+from src.utils.agent_runner import AgentRunner
+
+
+def function_call(call_id, name, arguments="{}"):
+    return RequiredFunctionToolCall(
+        id=call_id,
+        function=RequiredFunctionToolCallDetails(name=name, arguments=arguments),
+    )
+
+
+def make_run(status, tool_calls=None):
+    required_action = None
+    if tool_calls is not None:
+        required_action = SubmitToolOutputsAction(
+            submit_tool_outputs=SubmitToolOutputsDetails(tool_calls=tool_calls)
+        )
+    return SimpleNamespace(
+        id="run-1", status=status, required_action=required_action, usage=None
+    )
+
+
+class FakeRuns:
+    """依序回傳預先排好的 run 狀態，並記錄送出的工具輸出"""
+
+    def __init__(self, *statuses, submit_error=None):
+        self._statuses = list(statuses)
+        self.submitted = []
+        self.cancelled = False
+        self.submit_error = submit_error
+
+    def create(self, thread_id, agent_id, response_format=None):
+        return make_run(RunStatus.QUEUED)
+
+    def get(self, thread_id, run_id):
+        return self._statuses.pop(0)
+
+    def submit_tool_outputs(self, thread_id, run_id, tool_outputs):
+        self.submitted.append(tool_outputs)
+        if self.submit_error:
+            raise self.submit_error
+        return make_run(RunStatus.IN_PROGRESS)
+
+    def cancel(self, thread_id, run_id):
+        self.cancelled = True
+        return make_run(RunStatus.CANCELLING)
+
+
+def make_runner(runs, functions, max_workers=4):
+    client = SimpleNamespace(agents=SimpleNamespace(runs=runs))
+    return AgentRunner(client, functions, max_workers=max_workers, polling_interval=0)
+
+
+def outputs_by_id(tool_outputs):
+    return {output.tool_call_id: json.loads(output.output) for output in tool_outputs}
+
+
+def test_tool_calls_in_one_step_run_concurrently():
+    barrier = threading.Barrier(2, timeout=5)
+
+    def ask_genie(connection_name, question):
+        # 兩個呼叫都抵達 barrier 才會返回，循序執行時會逾時
+        barrier.wait()
+        return json.dumps({"answer": f"{connection_name}:{question}"})
+
+    runs = FakeRuns(
+        make_run(
+            RunStatus.REQUIRES_ACTION,
+            [
+                function_call(
+                    "c1", "ask_genie", '{"connection_name": "a", "question": "q1"}'
+                ),
+                function_call(
+                    "c2", "ask_genie", '{"connection_name": "b", "question": "q2"}'
+                ),
+            ],
+        ),
+        make_run(RunStatus.COMPLETED),
+    )
+    result = make_runner(runs, [ask_genie]).run("thread-1", "agent-1")
+
+    assert result.run.status == RunStatus.COMPLETED
+    assert result.tool_calls == 2
+    [tool_outputs] = runs.submitted
+    # 輸出順序與工具呼叫順序相同
+    assert [output.tool_call_id for output in tool_outputs] == ["c1", "c2"]
+    assert outputs_by_id(tool_outputs) == {
+        "c1": {"answer": "a:q1"},
+        "c2": {"answer": "b:q2"},
+    }
+    assert result.tool_output_chars == sum(len(o.output) for o in tool_outputs)
+
+
+def test_every_tool_call_id_is_answered():
+    def broken():
+        raise RuntimeError("boom")
+
+    tool_calls = [
+        function_call("c1", "broken"),
+        function_call("c2", "missing_tool"),
+        function_call("c3", "broken", "not json"),
+        RequiredToolCall(id="c4", type="code_interpreter"),
+    ]
+    runs = FakeRuns(
+        make_run(RunStatus.REQUIRES_ACTION, tool_calls),
+        make_run(RunStatus.COMPLETED),
+    )
+    make_runner(runs, [broken]).run("thread-1", "agent-1")
+
+    [tool_outputs] = runs.submitted
+    outputs = outputs_by_id(tool_outputs)
+    assert list(outputs) == ["c1", "c2", "c3", "c4"]
+    assert outputs["c1"] == {"error": "boom"}
+    assert outputs["c2"] == {"error": "未知的工具: missing_tool"}
+    assert "error" in outputs["c3"]
+    assert outputs["c4"] == {"error": "不支援的工具呼叫類型: code_interpreter"}
+
+
+@pytest.mark.parametrize(
+    "status", [RunStatus.CANCELLED, RunStatus.FAILED, RunStatus.EXPIRED]
+)
+def test_terminal_statuses_end_the_run(status):
+    runs = FakeRuns(make_run(RunStatus.IN_PROGRESS), make_run(status))
+    result = make_runner(runs, []).run("thread-1", "agent-1")
+
+    assert result.run.status == status
+    assert result.tool_calls == 0
+    assert runs.submitted == []
+
+
+def test_cancelling_is_polled_until_cancelled():
+    runs = FakeRuns(make_run(RunStatus.CANCELLING), make_run(RunStatus.CANCELLED))
+    result = make_runner(runs, []).run("thread-1", "agent-1")
+
+    assert result.run.status == RunStatus.CANCELLED
+    assert runs._statuses == []
+
+
+def test_requires_action_without_tool_calls_cancels_run():
+    runs = FakeRuns(
+        make_run(RunStatus.REQUIRES_ACTION, []), make_run(RunStatus.CANCELLED)
+    )
+    result = make_runner(runs, []).run("thread-1", "agent-1")
+
+    assert runs.cancelled
+    assert result.run.status == RunStatus.CANCELLED
+
+
+def test_submit_failure_refreshes_run_status():
+    def noop():
+        return "{}"
+
+    # run 在工具執行期間被取消，送出工具輸出失敗後以最新狀態結束
+    runs = FakeRuns(
+        make_run(RunStatus.REQUIRES_ACTION, [function_call("c1", "noop")]),
+        make_run(RunStatus.CANCELLED),
+        submit_error=RuntimeError("run is cancelled"),
+    )
+    result = make_runner(runs, [noop]).run("thread-1", "agent-1")
+
+    assert len(runs.submitted) == 1
+    assert result.run.status == RunStatus.CANCELLED
+
+
+def test_warm_up_starts_tool_threads():
+    runner = make_runner(FakeRuns(), [], max_workers=3)
+    runner.warm_up()
+
+    assert len(runner._executor._threads) == 3
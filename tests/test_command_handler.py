@@ -0,0 +1,150 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+from azure.ai.agents.models import RunStatus
+
+from src.bot.foundry_bot import FoundryBot
+from src.core.turn_telemetry import TurnTelemetry
+from src.utils.agent_runner import AgentRunResult
+from src.utils.command_handler import CommandHandler
+from src.utils.turn_scheduler import TurnScheduler
+
+
+class FakeTurnContext:
+    def __init__(self):
+        self.sent = []
+        self._on_send_activities = []
+
+    def on_send_activities(self, handler):
+        self._on_send_activities.append(handler)
+        return self
+
+    async def send_activity(self, activity):
+        # 只記錄文字回覆 (略過打字指示器)
+        if isinstance(activity, str):
+            self.sent.append(activity)
+
+
+class FakeAgents:
+    """記錄呼叫並模擬單一 run 的狀態"""
+
+    def __init__(self):
+        self.run = SimpleNamespace(
+            id="run-1", status=RunStatus.IN_PROGRESS, usage=None, last_error=None
+        )
+        self.deleted = []
+        self.calling_threads = set()
+        self.threads = SimpleNamespace(
+            create=lambda: SimpleNamespace(id="thread-1"), delete=self._delete
+        )
+        self.messages = SimpleNamespace(create=lambda **kwargs: None)
+        self.runs = SimpleNamespace(list=self._list, cancel=self._cancel)
+
+    def _record_thread(self):
+        self.calling_threads.add(threading.current_thread().name)
+
+    def _list(self, thread_id, limit):
+        self._record_thread()
+        return [self.run]
+
+    def _cancel(self, thread_id, run_id):
+        self._record_thread()
+        self.run.status = RunStatus.CANCELLING
+
+    def _delete(self, thread_id):
+        self._record_thread()
+        self.deleted.append(thread_id)
+
+
+class FakeRunner:
+    """輪詢 run 直到結束；執行緒被刪除時如同 SDK 拋出錯誤"""
+
+    def __init__(self, agents: FakeAgents):
+        self.agents = agents
+        self.started = threading.Event()
+
+    def run(self, thread_id, agent_id, response_format):
+        self.started.set()
+        while self.agents.run.status != RunStatus.CANCELLED:
+            if thread_id in self.agents.deleted:
+                raise RuntimeError("thread not found")
+            if self.agents.run.status == RunStatus.CANCELLING:
+                self.agents.run.status = RunStatus.CANCELLED
+            threading.Event().wait(0.01)
+        return AgentRunResult(run=self.agents.run)
+
+
+def make_bot(agents: FakeAgents) -> FoundryBot:
+    bot = FoundryBot.__new__(FoundryBot)
+    bot.settings = SimpleNamespace(app={"typing_interval": 60})
+    bot.project_client = SimpleNamespace(agents=agents)
+    bot.agent_runner = FakeRunner(agents)
+    bot.agent_id = "agent-1"
+    bot.turn_telemetry = TurnTelemetry("off")
+    bot.turn_scheduler = TurnScheduler()
+    bot.command_handler = CommandHandler(bot_mode="foundry")
+    bot.thread_dict = {}
+    bot.thread_last_used = {}
+    return bot
+
+
+def test_reset_during_run_cancels_then_turn_deletes_thread():
+    agents = FakeAgents()
+    bot = make_bot(agents)
+    turn_context = FakeTurnContext()
+    reset_context = FakeTurnContext()
+
+    async def main():
+        turn = asyncio.create_task(
+            bot.turn_scheduler.submit(
+                "user-1",
+                "question",
+                lambda content: bot._process_turn(turn_context, "user-1", content),
+            )
+        )
+        await asyncio.to_thread(bot.agent_runner.started.wait, 5)
+
+        await bot.command_handler.handle_special_command(
+            "reset",
+            reset_context,
+            "user-1",
+            bot.thread_dict,
+            bot.project_client,
+            bot.turn_scheduler,
+        )
+        # run 尚在輪詢時不可刪除執行緒
+        deleted_during_run = list(agents.deleted)
+        await asyncio.wait_for(turn, 5)
+        return deleted_during_run
+
+    deleted_during_run = asyncio.run(main())
+
+    assert deleted_during_run == []
+    assert agents.deleted == ["thread-1"]
+    assert bot.thread_dict["user-1"] is None
+    assert turn_context.sent == ["先前的問題已取消。"]
+    assert reset_context.sent == ["對話已重新開始！請問您有什麼問題？"]
+    # SDK 呼叫不在事件迴圈執行緒上執行
+    assert "MainThread" not in agents.calling_threads
+
+
+def test_reset_without_running_turn_deletes_thread():
+    agents = FakeAgents()
+    agents.run.status = RunStatus.COMPLETED
+    thread_dict = {"user-1": "thread-1"}
+
+    asyncio.run(
+        CommandHandler._handle_reset_command(
+            FakeTurnContext(),
+            "user-1",
+            thread_dict,
+            SimpleNamespace(agents=agents),
+            TurnScheduler(),
+        )
+    )
+
+    assert agents.deleted == ["thread-1"]
+    assert agents.run.status == RunStatus.COMPLETED
+    assert thread_dict["user-1"] is None
+    assert "MainThread" not in agents.calling_threads
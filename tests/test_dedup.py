@@ -0,0 +1,86 @@
+import asyncio
+
+from botbuilder.core import MemoryStorage
+from botbuilder.schema import Activity, ConversationAccount
+
+from src.core import dedup
+from src.core.dedup import ActivityDeduplicator
+
+
+def make_activity(activity_id, conversation_id="conv-1"):
+    return Activity(
+        id=activity_id, conversation=ConversationAccount(id=conversation_id)
+    )
+
+
+def test_marks_and_suppresses_duplicates():
+    async def main():
+        deduplicator = ActivityDeduplicator()
+        return [
+            await deduplicator.check_and_mark(make_activity("a1")),
+            await deduplicator.check_and_mark(make_activity("a1")),
+            # 同一個 activity ID 在不同對話中不是重複投遞
+            await deduplicator.check_and_mark(make_activity("a1", "conv-2")),
+            await deduplicator.check_and_mark(make_activity(None)),
+            await deduplicator.check_and_mark(make_activity(None)),
+        ]
+
+    assert asyncio.run(main()) == [False, True, False, False, False]
+
+
+def test_forget_allows_redelivery_after_failure():
+    async def main():
+        deduplicator = ActivityDeduplicator()
+        activity = make_activity("a1")
+        await deduplicator.check_and_mark(activity)
+        await deduplicator.forget(activity)
+        return await deduplicator.check_and_mark(activity)
+
+    assert asyncio.run(main()) is False
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(dedup.time, "monotonic", lambda: now[0])
+
+    async def main():
+        deduplicator = ActivityDeduplicator(ttl=10)
+        activity = make_activity("a1")
+        await deduplicator.check_and_mark(activity)
+        now[0] += 5
+        within_ttl = await deduplicator.check_and_mark(activity)
+        now[0] += 6
+        after_ttl = await deduplicator.check_and_mark(activity)
+        return within_ttl, after_ttl, len(deduplicator._seen)
+
+    assert asyncio.run(main()) == (True, False, 1)
+
+
+def test_max_entries_evicts_oldest():
+    async def main():
+        deduplicator = ActivityDeduplicator(max_entries=2)
+        for activity_id in ("a1", "a2", "a3", "a4"):
+            await deduplicator.check_and_mark(make_activity(activity_id))
+        return [
+            await deduplicator.check_and_mark(make_activity("a4")),
+            await deduplicator.check_and_mark(make_activity("a1")),
+        ]
+
+    # 最新的記錄保留，最舊的記錄被移除
+    assert asyncio.run(main()) == [True, False]
+
+
+def test_shared_storage_across_workers():
+    async def main():
+        storage = MemoryStorage()
+        worker_a = ActivityDeduplicator(storage=storage)
+        worker_b = ActivityDeduplicator(storage=storage)
+        activity = make_activity("a1")
+        first = await worker_a.check_and_mark(activity)
+        other_worker = await worker_b.check_and_mark(activity)
+        await worker_a.forget(activity)
+        worker_c = ActivityDeduplicator(storage=storage)
+        after_forget = await worker_c.check_and_mark(activity)
+        return first, other_worker, after_forget
+
+    assert asyncio.run(main()) == (False, True, False)
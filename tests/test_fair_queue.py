@@ -0,0 +1,35 @@
+import pytest
+
+from src.core.fair_queue import DeficitRoundRobin, parse_weights
+
+
+@pytest.mark.parametrize("value", ["tenantA:0", "tenantA:-1", "tenantA:2,tenantB:0"])
+def test_parse_weights_rejects_non_positive(value):
+    with pytest.raises(ValueError):
+        parse_weights(value)
+
+
+def test_parse_weights():
+    assert parse_weights("tenantA:2, tenantB:0.5") == {"tenantA": 2.0, "tenantB": 0.5}
+    assert parse_weights("") == {}
+
+
+@pytest.mark.parametrize("weights", [{"tenantA": 0}, {"tenantA": -1}])
+def test_drr_rejects_non_positive_weight(weights):
+    with pytest.raises(ValueError):
+        DeficitRoundRobin(weights=weights)
+
+
+def test_drr_rejects_non_positive_quantum():
+    with pytest.raises(ValueError):
+        DeficitRoundRobin(quantum=0)
+
+
+def test_drr_weighted_order():
+    queue = DeficitRoundRobin(weights={"heavy": 2})
+    for i in range(4):
+        queue.push("heavy", f"h{i}")
+        queue.push("light", f"l{i}")
+    # 權重 2 的分組每一輪取出兩個項目
+    assert [queue.pop() for _ in range(6)] == ["h0", "h1", "l0", "h2", "h3", "l1"]
+
@@ -0,0 +1,18 @@
+import pytest
+
+from src.core import json_codec
+
+
+def test_loads_activity_bytes():
+    body = '{"type": "message", "text": "你好", "value": {"n": 1}}'.encode("utf-8")
+    assert json_codec.loads(body) == {
+        "type": "message",
+        "text": "你好",
+        "value": {"n": 1},
+    }
+
+
+@pytest.mark.parametrize("body", [b"", b"{", b'{"type": }', b"\xff\xfe"])
+def test_invalid_body_raises_value_error(body):
+    with pytest.raises(ValueError):
+        json_codec.loads(body)
@@ -0,0 +1,61 @@
+import json
+import logging
+import queue
+import sys
+import threading
+
+from src.core.logger_config import (
+    JsonFormatter,
+    NonBlockingQueueHandler,
+    TEXT_FORMAT,
+    create_queue_handler,
+)
+
+
+class BlockingHandler(logging.Handler):
+    """在 unblock 之前卡住背景執行緒，模擬輸出跟不上"""
+
+    def __init__(self):
+        super().__init__()
+        self.unblock = threading.Event()
+        self.records = []
+
+    def emit(self, record):
+        self.unblock.wait(5)
+        self.records.append(record)
+
+
+def make_record(msg="message", exc_info=None):
+    return logging.LogRecord("test", logging.ERROR, __file__, 1, msg, None, exc_info)
+
+
+def test_full_queue_drops_and_counts():
+    handler = BlockingHandler()
+    queue_handler, listener = create_queue_handler([handler], max_size=2)
+    try:
+        for i in range(10):
+            queue_handler.handle(make_record(f"m{i}"))
+        # 背景執行緒最多取走 1 筆並卡住，佇列另外保留 2 筆
+        assert queue_handler.dropped >= 7
+        assert queue_handler.queue.qsize() <= 2
+    finally:
+        handler.unblock.set()
+        listener.stop()
+    assert len(handler.records) + queue_handler.dropped == 10
+
+
+def test_exception_is_formatted_before_crossing_threads():
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = make_record(exc_info=sys.exc_info())
+
+    queue_handler = NonBlockingQueueHandler(queue.Queue())
+    prepared = queue_handler.prepare(record)
+
+    # traceback (與其 frame) 不放入佇列，只傳遞格式化後的文字
+    assert prepared.exc_info is None
+    assert "ValueError: boom" in prepared.exc_text
+    assert "ValueError: boom" in logging.Formatter(TEXT_FORMAT).format(prepared)
+    entry = json.loads(JsonFormatter().format(prepared))
+    assert entry["exception"] == prepared.exc_text
@@ -0,0 +1,77 @@
+import asyncio
+import time
+
+import pytest
+import uvloop
+
+from src.core.loop_monitor import LoopMonitor
+
+
+def blocking_callback():
+    time.sleep(0.2)
+
+
+async def blocking_report():
+    time.sleep(0.2)
+
+
+async def run_with_monitor(block):
+    monitor = LoopMonitor(interval=0.02, stall_threshold=0.05)
+    monitor.start()
+    await asyncio.sleep(0.1)
+    await block()
+    # 等待量測 task 醒來並記錄這次阻塞
+    await asyncio.sleep(0.1)
+    await monitor.stop()
+    return monitor
+
+
+async def block_in_named_task():
+    await asyncio.create_task(blocking_report(), name="report-export")
+
+
+async def block_in_callback():
+    done = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    loop.call_soon(lambda: (blocking_callback(), done.set()))
+    await done.wait()
+
+
+@pytest.mark.parametrize("run", [asyncio.run, uvloop.run], ids=["asyncio", "uvloop"])
+def test_stall_attributed_to_named_task(run):
+    monitor = run(run_with_monitor(block_in_named_task))
+
+    [event] = monitor.slow_callbacks()
+    assert event["callback"] == "report-export"
+    assert event["duration_ms"] >= 150
+    assert any("blocking_report" in frame for frame in event["stack"])
+    assert monitor.stats()["stalls"] == 1
+    assert "blocking_report" in monitor.stall_stacks()
+
+
+@pytest.mark.parametrize("run", [asyncio.run, uvloop.run], ids=["asyncio", "uvloop"])
+def test_stall_attributed_to_plain_callback(run):
+    monitor = run(run_with_monitor(block_in_callback))
+
+    [event] = monitor.slow_callbacks()
+    assert event["callback"] == "block_in_callback.<locals>.<lambda>"
+
+
+async def short_block():
+    time.sleep(0.07)
+
+
+async def block_briefly_several_times():
+    for _ in range(5):
+        await asyncio.create_task(short_block(), name="short-block")
+        await asyncio.sleep(0.05)
+
+
+@pytest.mark.parametrize("run", [asyncio.run, uvloop.run], ids=["asyncio", "uvloop"])
+def test_stalls_near_threshold_are_attributed(run):
+    # 只比門檻長一點的阻塞也要在結束前取樣到，不可歸因為 unknown
+    monitor = run(run_with_monitor(block_briefly_several_times))
+
+    callbacks = [event["callback"] for event in monitor.slow_callbacks()]
+    assert callbacks
+    assert set(callbacks) == {"short-block"}
@@ -0,0 +1,37 @@
+import pytest
+
+from src.core import payload_log
+from src.core.payload_log import parse_sample_rates
+
+
+@pytest.fixture(autouse=True)
+def reset_rates():
+    yield
+    payload_log.configure()
+
+
+def test_parse_sample_rates_allows_zero():
+    assert parse_sample_rates("src.bot:0, src.utils:0.1") == {
+        "src.bot": 0.0,
+        "src.utils": 0.1,
+    }
+    assert parse_sample_rates("") == {}
+
+
+@pytest.mark.parametrize("value", ["src.bot:1.5", "src.bot:-0.1"])
+def test_parse_sample_rates_rejects_out_of_range(value):
+    with pytest.raises(ValueError):
+        parse_sample_rates(value)
+
+
+def test_zero_rate_disables_logger_prefix():
+    payload_log.configure(rates=parse_sample_rates("src.bot:0"))
+    assert not payload_log._should_sample("src.bot.genie_bot")
+    assert payload_log._should_sample("src.utils.card_builder")
+
+
+def test_fractional_rate_samples_evenly():
+    payload_log.configure(rates={"src.utils": 0.25})
+    sampled = [payload_log._should_sample("src.utils") for _ in range(8)]
+    # 第一次一定記錄，之後每 4 次記錄 1 次
+    assert sampled == [True, False, False, False, True, False, False, False]
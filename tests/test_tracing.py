@@ -0,0 +1,155 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from azure.core.credentials import AccessToken, AccessTokenInfo
+from azure.core.pipeline.transport import HttpTransport
+from azure.ai.projects import AIProjectClient
+from databricks.sdk import WorkspaceClient
+from databricks.sdk.credentials_provider import DefaultCredentials
+
+from src.core import tracing
+from src.core.connector_pool import _TraceparentPolicy
+from src.core.trace_propagation import (
+    TraceparentCredentialsStrategy,
+    TraceparentPolicy,
+)
+
+
+class RecordingExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+
+@pytest.fixture
+def exporter(monkeypatch):
+    recording = RecordingExporter()
+    monkeypatch.setattr(tracing, "_exporter", recording)
+    return recording
+
+
+def test_error_marks_span_failed(exporter):
+    with pytest.raises(ValueError):
+        with tracing.start_span("turn"):
+            raise ValueError("boom")
+
+    [span] = exporter.spans
+    assert span.status_code == tracing.STATUS_ERROR
+    assert span.status_message == "ValueError: boom"
+
+
+def test_cancellation_is_not_an_error(exporter):
+    async def turn(started):
+        with tracing.start_span("turn"):
+            started.set()
+            await asyncio.sleep(10)
+
+    async def main():
+        started = asyncio.Event()
+        task = asyncio.create_task(turn(started))
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    [span] = exporter.spans
+    assert span.status_code == tracing.STATUS_UNSET
+    assert span.attributes["cancelled"] is True
+
+
+def test_closed_generator_is_not_an_error(exporter):
+    def stream():
+        with tracing.start_span("stream"):
+            yield 1
+            yield 2
+
+    chunks = stream()
+    next(chunks)
+    chunks.close()
+
+    [span] = exporter.spans
+    assert span.status_code == tracing.STATUS_UNSET
+
+
+def test_inject_traceparent_without_span_is_noop():
+    headers = {}
+    tracing.inject_traceparent(headers)
+    assert headers == {}
+
+
+def test_connector_policy_adds_traceparent(exporter):
+    request = SimpleNamespace(http_request=SimpleNamespace(headers={}))
+    with tracing.start_span("reply") as span:
+        _TraceparentPolicy().on_request(request)
+
+    assert request.http_request.headers == {"traceparent": span.traceparent}
+
+
+class StopTransport(HttpTransport):
+    """記錄送出的標頭後中止請求，不連線外部服務"""
+
+    def __init__(self):
+        self.headers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def send(self, request, **kwargs):
+        self.headers.append(dict(request.headers))
+        raise RuntimeError("stop")
+
+
+class StaticCredential:
+    def get_token(self, *scopes, **kwargs):
+        return AccessToken("token", 9999999999)
+
+    def get_token_info(self, *scopes, **kwargs):
+        return AccessTokenInfo("token", 9999999999)
+
+
+def test_foundry_agents_requests_carry_traceparent(exporter):
+    transport = StopTransport()
+    client = AIProjectClient(
+        "https://example.services.ai.azure.com/api/projects/p",
+        StaticCredential(),
+        per_call_policies=[TraceparentPolicy()],
+        transport=transport,
+        retry_total=0,
+    )
+    with tracing.start_span("agent_run") as span:
+        with pytest.raises(RuntimeError):
+            client.agents.threads.delete("thread-1")
+
+    [headers] = transport.headers
+    assert headers["traceparent"] == span.traceparent
+
+
+def test_databricks_headers_carry_traceparent(exporter):
+    client = WorkspaceClient(
+        host="https://example.cloud.databricks.com",
+        token="dapi-test",
+        credentials_strategy=TraceparentCredentialsStrategy(DefaultCredentials()),
+    )
+    assert client.config.auth_type == "pat"
+    assert client.config.authenticate() == {"Authorization": "Bearer dapi-test"}
+
+    with tracing.start_span("ask_genie") as span:
+        headers = client.config.authenticate()
+
+    assert headers == {
+        "Authorization": "Bearer dapi-test",
+        "traceparent": span.traceparent,
+    }
@@ -0,0 +1,148 @@
+import asyncio
+
+from src.core.turn_queue import TurnQueue
+from src.utils.turn_scheduler import TurnScheduler
+
+
+async def wait_until(predicate, timeout=2.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not predicate():
+        assert loop.time() < deadline, "condition not reached"
+        await asyncio.sleep(0.001)
+
+
+class FakeBot:
+    """以 TurnScheduler 序列化回合，模擬 bot 的 submit_turn"""
+
+    def __init__(self, coalesce_window=0.0):
+        self.scheduler = TurnScheduler(coalesce_window=coalesce_window)
+        self.turns = []
+        self.releases = {}
+
+    def job(self, user_id, message):
+        async def run():
+            await self.scheduler.submit(user_id, message, self.handle(user_id))
+
+        return run
+
+    def handle(self, user_id):
+        async def handler(content):
+            self.turns.append((user_id, content))
+            await self.releases.setdefault(user_id, asyncio.Event()).wait()
+
+        return handler
+
+
+def test_follow_up_does_not_take_a_worker():
+    async def main():
+        queue = TurnQueue(workers=2)
+        queue.start()
+        bot = FakeBot()
+        queue.submit(bot.job("user-1", "a"), "user-1", "user-1")
+        await wait_until(lambda: bot.turns)
+        queue.submit(bot.job("user-1", "b"), "user-1", "user-1")
+        queue.submit(bot.job("user-2", "x"), "user-2", "user-2")
+        # 第二個 worker 沒有被等待 user-1 回合鎖的後續訊息佔住
+        await wait_until(lambda: ("user-2", "x") in bot.turns)
+        turns_while_busy = list(bot.turns)
+        queued_while_busy = queue.qsize()
+
+        bot.releases["user-2"].set()
+        bot.releases["user-1"].set()
+        await wait_until(lambda: len(bot.turns) == 3 and queue.qsize() == 0)
+        await wait_until(lambda: not queue._active_keys)
+        await queue.stop()
+        return bot.turns, turns_while_busy, queued_while_busy
+
+    turns, turns_while_busy, queued_while_busy = asyncio.run(main())
+    assert turns_while_busy == [("user-1", "a"), ("user-2", "x")]
+    assert queued_while_busy == 1
+    assert turns[-1] == ("user-1", "b")
+
+
+def test_parked_follow_ups_are_released_together():
+    async def main():
+        queue = TurnQueue(workers=2)
+        queue.start()
+        bot = FakeBot(coalesce_window=0.01)
+        queue.submit(bot.job("user-1", "a"), "user-1", "user-1")
+        await wait_until(lambda: bot.turns)
+        queue.submit(bot.job("user-1", "b"), "user-1", "user-1")
+        queue.submit(bot.job("user-1", "c"), "user-1", "user-1")
+        await asyncio.sleep(0.02)
+        turns_while_busy = list(bot.turns)
+
+        bot.releases["user-1"].set()
+        await wait_until(lambda: len(bot.turns) == 2)
+        await wait_until(lambda: not queue._active_keys)
+        await queue.stop()
+        return bot.turns, turns_while_busy, queue
+
+    turns, turns_while_busy, queue = asyncio.run(main())
+    assert turns_while_busy == [("user-1", "a")]
+    # 暫存的後續訊息一起交給 TurnScheduler，在合併視窗內併為同一回合
+    assert turns == [("user-1", "a"), ("user-1", "b\n\nc")]
+    assert queue._parked == {}
+
+
+def test_unserialized_job_runs_while_user_is_busy():
+    async def main():
+        queue = TurnQueue(workers=2)
+        queue.start()
+        bot = FakeBot()
+        queue.submit(bot.job("user-1", "a"), "user-1", "user-1")
+        await wait_until(lambda: bot.turns)
+        ran = asyncio.Event()
+
+        async def command():
+            ran.set()
+
+        # 指令 (例如重置) 不加入序列，在回合執行中立即處理
+        queue.submit(command, "user-1")
+        await asyncio.wait_for(ran.wait(), 1)
+        bot.releases["user-1"].set()
+        await wait_until(lambda: not queue._active_keys)
+        await queue.stop()
+
+    asyncio.run(main())
+
+
+def test_parked_jobs_count_toward_max_size():
+    async def main():
+        queue = TurnQueue(workers=1, max_size=2)
+        queue.start()
+        bot = FakeBot()
+        accepted = [queue.submit(bot.job("user-1", "a"), "user-1", "user-1")]
+        await wait_until(lambda: bot.turns)
+        for message in ("b", "c", "d"):
+            accepted.append(
+                queue.submit(bot.job("user-1", message), "user-1", "user-1")
+            )
+        bot.releases["user-1"].set()
+        await wait_until(lambda: not queue._active_keys)
+        await queue.stop()
+        return accepted
+
+    assert asyncio.run(main()) == [True, True, True, False]
+
+
+def test_failed_job_releases_serial_key():
+    async def main():
+        queue = TurnQueue(workers=1)
+        queue.start()
+        ran = asyncio.Event()
+
+        async def broken():
+            raise RuntimeError("boom")
+
+        async def follow_up():
+            ran.set()
+
+        queue.submit(broken, "user-1", "user-1")
+        queue.submit(follow_up, "user-1", "user-1")
+        await asyncio.wait_for(ran.wait(), 1)
+        await wait_until(lambda: not queue._active_keys)
+        await queue.stop()
+
+    asyncio.run(main())
@@ -0,0 +1,126 @@
+import asyncio
+
+from src.utils.turn_scheduler import TurnScheduler
+
+
+async def wait_until(predicate, timeout=2.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not predicate():
+        assert loop.time() < deadline, "condition not reached"
+        await asyncio.sleep(0.001)
+
+
+class RecordingHandler:
+    """記錄回合內容與同時執行數，第一個回合停在 release 之前"""
+
+    def __init__(self):
+        self.turns = []
+        self.running = 0
+        self.max_running = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self, content):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        self.turns.append(content)
+        try:
+            await self.release.wait()
+        finally:
+            self.running -= 1
+
+
+def test_follow_ups_are_serialized_and_coalesced():
+    async def main():
+        scheduler = TurnScheduler()
+        handler = RecordingHandler()
+        first = asyncio.create_task(scheduler.submit("user-1", "a", handler))
+        await wait_until(lambda: handler.turns)
+        assert scheduler.is_busy("user-1")
+
+        waiter = asyncio.create_task(scheduler.submit("user-1", "b", handler))
+        await asyncio.sleep(0)
+        # 已有等待中的回合，之後的訊息直接併入並立即返回
+        merged = await scheduler.submit("user-1", "c", handler)
+
+        handler.release.set()
+        results = await asyncio.gather(first, waiter)
+        return scheduler, handler, merged, results
+
+    scheduler, handler, merged, results = asyncio.run(main())
+    assert merged is False
+    assert results == [True, True]
+    assert handler.turns == ["a", "b\n\nc"]
+    assert handler.max_running == 1
+    assert not scheduler.is_busy("user-1")
+    assert scheduler._states == {}
+
+
+def test_users_run_concurrently():
+    async def main():
+        scheduler = TurnScheduler()
+        handler = RecordingHandler()
+        tasks = [
+            asyncio.create_task(scheduler.submit(user, "q", handler))
+            for user in ("user-1", "user-2")
+        ]
+        await wait_until(lambda: handler.running == 2)
+        handler.release.set()
+        await asyncio.gather(*tasks)
+        return handler
+
+    assert asyncio.run(main()).max_running == 2
+
+
+def test_discard_pending_drops_waiting_turn():
+    async def main():
+        scheduler = TurnScheduler()
+        handler = RecordingHandler()
+        first = asyncio.create_task(scheduler.submit("user-1", "a", handler))
+        await wait_until(lambda: handler.turns)
+        waiter = asyncio.create_task(scheduler.submit("user-1", "b", handler))
+        await asyncio.sleep(0)
+
+        discarded = scheduler.discard_pending("user-1")
+        handler.release.set()
+        results = await asyncio.gather(first, waiter)
+        return scheduler, handler, discarded, results
+
+    scheduler, handler, discarded, results = asyncio.run(main())
+    assert discarded == 1
+    assert results == [True, False]
+    assert handler.turns == ["a"]
+    assert scheduler._states == {}
+
+
+def test_coalesce_window_collects_rapid_messages():
+    async def main():
+        scheduler = TurnScheduler(coalesce_window=0.05)
+        handler = RecordingHandler()
+        handler.release.set()
+        first = asyncio.create_task(scheduler.submit("user-1", "a", handler))
+        await asyncio.sleep(0)
+        merged = await scheduler.submit("user-1", "b", handler)
+        return handler, merged, await first
+
+    handler, merged, ran = asyncio.run(main())
+    assert merged is False
+    assert ran is True
+    assert handler.turns == ["a\n\nb"]
+
+
+def test_handler_error_releases_lock():
+    async def failing(content):
+        raise RuntimeError("boom")
+
+    async def main():
+        scheduler = TurnScheduler()
+        try:
+            await scheduler.submit("user-1", "a", failing)
+        except RuntimeError:
+            pass
+        return scheduler
+
+    scheduler = asyncio.run(main())
+    assert not scheduler.is_busy("user-1")
+    assert scheduler._states == {}
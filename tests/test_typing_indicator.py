@@ -0,0 +1,63 @@
+import asyncio
+
+from botbuilder.core import TurnContext
+from botbuilder.core.adapters import TestAdapter
+from botbuilder.schema import Activity, ActivityTypes
+
+from src.utils.typing_indicator import typing_heartbeat
+
+
+def make_turn_context():
+    adapter = TestAdapter()
+    activity = Activity(
+        type=ActivityTypes.message,
+        text="hi",
+        conversation=adapter.template.conversation,
+        from_property=adapter.template.from_property,
+        recipient=adapter.template.recipient,
+        channel_id=adapter.template.channel_id,
+        service_url=adapter.template.service_url,
+    )
+    return adapter, TurnContext(adapter, activity)
+
+
+def test_heartbeat_sends_typing_until_reply():
+    async def main():
+        adapter, turn_context = make_turn_context()
+        async with typing_heartbeat(turn_context, interval=0.01):
+            await asyncio.sleep(0.05)
+            await turn_context.send_activity("answer")
+            # 回覆之後不再送出打字指示器
+            await asyncio.sleep(0.05)
+        return [activity.type for activity in adapter.activity_buffer]
+
+    types = asyncio.run(main())
+    assert types[0] == ActivityTypes.typing
+    assert types[-1] == ActivityTypes.message
+    assert types.count(ActivityTypes.message) == 1
+
+
+def test_send_hook_is_removed_after_exit():
+    async def main():
+        _, turn_context = make_turn_context()
+        before = list(turn_context._on_send_activities)
+        for _ in range(3):
+            async with typing_heartbeat(turn_context, interval=0.01):
+                await asyncio.sleep(0)
+        return before, turn_context._on_send_activities
+
+    before, after = asyncio.run(main())
+    assert after == before
+
+
+def test_hook_is_removed_when_body_raises():
+    async def main():
+        _, turn_context = make_turn_context()
+        try:
+            async with typing_heartbeat(turn_context):
+                raise RuntimeError("boom")
+        except RuntimeError:
+            pass
+        return turn_context._on_send_activities
+
+    assert asyncio.run(main()) == []
@@ -0,0 +1,38 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from src.core.warmup import WarmupManager, prestart_executor
+
+
+def test_prestart_single_worker_executor():
+    # executor_workers=1：預熱工作不可在唯一的執行緒中等待同一個執行緒池
+    async def main():
+        executor = ThreadPoolExecutor(max_workers=1)
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(executor)
+        manager = WarmupManager(timeout=5)
+        manager.add("default_executor", prestart_executor(executor, 1))
+        await manager.run()
+        # 預熱後執行緒池仍可使用
+        result = await asyncio.wait_for(loop.run_in_executor(None, sum, [1, 2]), 5)
+        return manager.status(), result
+
+    status, result = asyncio.run(main())
+    assert status["ready"] is True
+    assert status["tasks"] == {"default_executor": "ok"}
+    assert result == 3
+
+
+def test_sync_and_failing_tasks():
+    def broken():
+        raise RuntimeError("boom")
+
+    async def main():
+        manager = WarmupManager(timeout=5)
+        manager.add("sync", lambda: None)
+        manager.add("broken", broken)
+        await manager.run()
+        return manager.status()
+
+    status = asyncio.run(main())
+    assert status["tasks"] == {"sync": "ok", "broken": "failed: boom"}